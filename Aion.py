@@ -3,11 +3,23 @@ import os
 import json
 import inspect
 import pathlib
-from typing import Callable, Dict, Any, get_type_hints, List
+import datetime
+import re
+import bisect
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Any, get_type_hints, List, Optional, Tuple
 from dotenv import load_dotenv
 import tools  # Your custom tools module
+from data_version import data_versions
+from token_budget import budget_for, pack_messages, truncate_to_tokens
+from chat_summary import prompt_history, schedule_fold
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from notification_broker import format_sse
 
 # Load environment variables
 load_dotenv(override=True)
@@ -16,91 +28,178 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 app = Flask(__name__)
 
 # === Chat History Management ===
+# Messages loaded from the end of a history file at startup; enough for any context window
+TAIL_MESSAGES = int(os.getenv("AION_CHAT_TAIL_MESSAGES", "200"))
+# Older in-memory messages are dropped past this (they stay on disk)
+MAX_MEMORY_MESSAGES = TAIL_MESSAGES * 2
+
+_TAIL_BLOCK = 64 * 1024
+
+
+def read_tail_records(path: str, count: int) -> List[Tuple[int, str]]:
+    """
+    Last `count` non-empty lines of a file with the byte offset just past each one,
+    reading backwards in blocks (O(count), not O(file))
+    """
+    if count <= 0 or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        buffer = b""
+        while pos > 0 and buffer.count(b"\n") <= count:
+            step = min(_TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buffer = f.read(step) + buffer
+    records = []
+    offset = pos
+    for i, line in enumerate(buffer.split(b"\n")):
+        offset += len(line) + 1
+        # The first line is partial unless the read reached the start of the file
+        if (i == 0 and pos > 0) or not line.strip():
+            continue
+        records.append((min(offset, pos + len(buffer)), line.decode("utf-8", errors="replace")))
+    return records[-count:]
+
+
+def read_tail_lines(path: str, count: int) -> List[str]:
+    """Last `count` non-empty lines of a file"""
+    return [line for _, line in read_tail_records(path, count)]
+
+
+def _parse_records(records: List[Tuple[int, str]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    messages, ends = [], []
+    for end, line in records:
+        try:
+            messages.append(json.loads(line))
+        except json.JSONDecodeError:
+            # Torn write from a crash mid-append
+            continue
+        ends.append(end)
+    return messages, ends
+
+
+def _parse_lines(lines: List[str]) -> List[Dict[str, Any]]:
+    return _parse_records([(0, line) for line in lines])[0]
+
+
 class ChatHistory:
-    def __init__(self, history_file: str = "./db/chat_history.json"):
+    """
+    One conversation, persisted as JSONL: one message per line, appended on save.
+
+    Startup reads only the last TAIL_MESSAGES lines; older messages stay on disk and
+    are read back only by last(k) when k reaches past what is in memory. `ends` holds,
+    for each saved message in memory, the file offset just past its line: a stable
+    position that survives restarts and trimming (None until the message is saved).
+    """
+
+    def __init__(self, history_file: str = "./db/chat_history.jsonl"):
         self.history_file = history_file
         self.messages: List[Dict[str, Any]] = []
+        self.pending: List[Dict[str, Any]] = []   # added since the last save
+        self.ends: List[Optional[int]] = []
+        self.generation = 0   # bumped when the file is rewritten, invalidating derived state
+        self.lock = threading.RLock()
         self.load_history()
     
+    def _migrate_legacy_json(self):
+        legacy = os.path.splitext(self.history_file)[0] + ".json"
+        if os.path.exists(self.history_file) or not os.path.exists(legacy):
+            return
+        with open(legacy, 'r', encoding='utf-8') as f:
+            messages = json.load(f)
+        self._rewrite(messages)
+        os.remove(legacy)
+        print(f"✅ Migrated chat history {legacy} to JSONL ({len(messages)} messages)")
+
     def load_history(self):
         try:
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    self.messages = json.load(f)
-                self.clean_corrupted_history()
+            self._migrate_legacy_json()
+            # Orphaned tool messages are skipped when the prompt is packed
+            self.messages, self.ends = _parse_records(read_tail_records(self.history_file, TAIL_MESSAGES))
+            self.pending = []
         except Exception as e:
             print(f"⚠️ Error loading chat history: {e}")
             self.messages = []
+            self.ends = []
     
     def save_history(self):
+        """Append the messages added since the last save"""
+        if not self.pending:
+            return
         try:
             os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.messages, f, ensure_ascii=False, indent=2)
+            lines = [(json.dumps(m, ensure_ascii=False) + "\n").encode("utf-8") for m in self.pending]
+            with open(self.history_file, 'a+b') as f:
+                offset = f.seek(0, os.SEEK_END)
+                # Terminate a torn last line so it cannot swallow the first new message
+                if offset > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        lines[0] = b"\n" + lines[0]
+                f.write(b"".join(lines))
+            first = len(self.messages) - len(self.pending)
+            for i, line in enumerate(lines):
+                offset += len(line)
+                self.ends[first + i] = offset
+            self.pending = []
         except Exception as e:
             print(f"⚠️ Error saving chat history: {e}")
-    
+        if len(self.messages) > MAX_MEMORY_MESSAGES:
+            dropped = len(self.messages) - TAIL_MESSAGES
+            del self.messages[:dropped]
+            del self.ends[:dropped]
+
+    def _rewrite(self, messages: List[Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+        tmp_path = f"{self.history_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for m in messages:
+                f.write(json.dumps(m, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.history_file)
+
+    def _append(self, message: Dict[str, Any]):
+        self.messages.append(message)
+        self.ends.append(None)
+        self.pending.append(message)
+
+    def index_after(self, offset: int) -> int:
+        """Index in messages of the first message saved past file offset `offset` (0 if it is older than memory)"""
+        saved = len(self.messages) - len(self.pending)
+        return bisect.bisect_right(self.ends, offset, 0, saved)
+
     def add_message(self, role: str, content: str, tool_calls: List[Dict] = None):
         message = {"role": role, "content": content}
         if tool_calls:
             message["tool_calls"] = tool_calls
-        self.messages.append(message)
+        self._append(message)
     
     def add_tool_message(self, tool_call_id: str, name: str, content: str):
-        self.messages.append({
+        self._append({
             "role": "tool",
             "tool_call_id": tool_call_id,
             "name": name,
             "content": content
         })
+
+    def last(self, k: int) -> List[Dict[str, Any]]:
+        """The last k messages, from memory when it holds them, otherwise from the file tail"""
+        if k <= 0:
+            return []
+        if k <= len(self.messages):
+            return self.messages[-k:]
+        self.save_history()
+        return _parse_lines(read_tail_lines(self.history_file, k))
     
-    def get_recent_messages(self, max_tokens: int = 4000) -> List[Dict]:
-        token_count = 0
-        recent_messages = []
-        for message in reversed(self.messages):
-            message_tokens = len(str(message)) // 4
-            if token_count + message_tokens > max_tokens:
-                break
-            recent_messages.insert(0, message)
-            token_count += message_tokens
-        
-        # Validate messages and remove orphaned tool calls
-        validated_messages = []
-        expecting_tool_responses = []
-        
-        for msg in recent_messages:
-            if msg["role"] == "assistant" and msg.get("tool_calls"):
-                # For assistant messages with tool calls, we need to check if all tool responses exist
-                tool_call_ids = [tc["id"] for tc in msg["tool_calls"]]
-                
-                # Look ahead to see if all tool responses exist
-                found_responses = set()
-                for future_msg in recent_messages[recent_messages.index(msg)+1:]:
-                    if future_msg["role"] == "tool" and future_msg.get("tool_call_id") in tool_call_ids:
-                        found_responses.add(future_msg.get("tool_call_id"))
-                
-                # Only include if ALL tool calls have responses
-                if len(found_responses) == len(tool_call_ids):
-                    expecting_tool_responses.extend(tool_call_ids)
-                    validated_messages.append(msg)
-                else:
-                    print(f"🧹 Skipping orphaned assistant message with {len(tool_call_ids)} tool calls, {len(found_responses)} responses found")
-                    
-            elif msg["role"] == "tool":
-                if msg.get("tool_call_id") in expecting_tool_responses:
-                    validated_messages.append(msg)
-                    expecting_tool_responses.remove(msg.get("tool_call_id"))
-                else:
-                    print(f"🧹 Skipping orphaned tool message: {msg.get('name', 'unknown')}")
-            else:
-                validated_messages.append(msg)
-        
-        return validated_messages
-    
-    def clean_corrupted_history(self):
+    def get_recent_messages(self, max_tokens: int = None) -> List[Dict]:
+        """Latest messages within the history share of the prompt budget, tool-call groups kept whole"""
+        return pack_messages(self.messages, budget_for("history") if max_tokens is None else max_tokens)
+
+    def _drop_orphans(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         cleaned_messages = []
         expecting_tool_responses = []
-        for msg in self.messages:
+        for msg in messages:
             if msg["role"] == "assistant" and msg.get("tool_calls"):
                 expecting_tool_responses.extend([tc["id"] for tc in msg["tool_calls"]])
                 cleaned_messages.append(msg)
@@ -114,15 +213,126 @@ class ChatHistory:
                 cleaned_messages.append(msg)
         if expecting_tool_responses:
             print(f"🧹 Found {len(expecting_tool_responses)} unfulfilled tool calls")
-        self.messages = cleaned_messages
+        return cleaned_messages
+
+    def clean_corrupted_history(self):
+        """Rewrite the whole file without orphaned tool messages (the /clean_history endpoint)"""
         self.save_history()
-        print(f"✅ Chat history cleaned. Kept {len(cleaned_messages)} valid messages.")
+        if os.path.exists(self.history_file):
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                everything = _parse_lines(f.readlines())
+            self._rewrite(self._drop_orphans(everything))
+        self.generation += 1
+        self.load_history()
+        print(f"✅ Chat history cleaned. Kept {len(self.messages)} valid messages.")
+
+    @property
+    def summary_file(self) -> str:
+        """Running conversation summary stored next to the history (see chat_summary)"""
+        return os.path.splitext(self.history_file)[0] + ".summary.json"
 
     def clear_history(self):
         self.messages = []
-        self.save_history()
+        self.pending = []
+        self.ends = []
+        self.generation += 1
+        self._rewrite([])
+        if os.path.exists(self.summary_file):
+            os.remove(self.summary_file)
+
+
+# === Per-user Chat Sessions ===
+CHAT_SESSIONS_DIR = "./db/chat_sessions"
+MAX_ACTIVE_SESSIONS = int(os.getenv("AION_CHAT_MAX_SESSIONS", "64"))
+DEFAULT_CONVERSATION = "default"
+
+
+def _session_key_part(value: str, fallback: str) -> str:
+    """
+    File-safe, collision-free name for a username / conversation id. Safe values up to
+    64 characters are used as-is (so existing session files keep their names); anything
+    else gets a sanitized prefix plus '~' and a hash of the raw value, and '~' never
+    appears in a value used as-is.
+    """
+    raw = value or ""
+    if not raw.strip():
+        return fallback
+    if len(raw) <= 64 and re.fullmatch(r"[A-Za-z0-9_@-][A-Za-z0-9_.@-]*", raw) and not raw.endswith("."):
+        return raw
+    prefix = re.sub(r"[^A-Za-z0-9_.@-]", "_", raw)[:48].strip(".")
+    return f"{prefix}~{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]}"
+
+
+class ChatSessions:
+    """
+    Chat histories keyed by (username, conversation id), each persisted to its own file
+    under db/chat_sessions/<user>/<conversation>.jsonl.
+
+    Only the most recently used sessions stay in memory (LRU, MAX_ACTIVE_SESSIONS);
+    an evicted session is saved and reloaded from its file on next use. Each session has
+    a lock so concurrent turns of the same conversation run one after another.
+    """
+
+    def __init__(self, base_dir: str = CHAT_SESSIONS_DIR, max_sessions: int = MAX_ACTIVE_SESSIONS):
+        self.base_dir = base_dir
+        self.max_sessions = max(1, max_sessions)
+        self.lock = threading.Lock()
+        self.sessions: "OrderedDict[tuple, ChatHistory]" = OrderedDict()
+        self.evictions = 0
+
+    def key(self, username: str, conversation_id: str = None) -> tuple:
+        return (_session_key_part(username, "anonymous"),
+                _session_key_part(conversation_id, DEFAULT_CONVERSATION))
+
+    def get(self, username: str, conversation_id: str = None) -> ChatHistory:
+        key = self.key(username, conversation_id)
+        with self.lock:
+            session = self.sessions.get(key)
+            if session is not None:
+                self.sessions.move_to_end(key)
+                return session
+        # Load outside the registry lock; a concurrent load of the same key keeps the first
+        loaded = ChatHistory(os.path.join(self.base_dir, key[0], f"{key[1]}.jsonl"))
+        with self.lock:
+            session = self.sessions.setdefault(key, loaded)
+            self.sessions.move_to_end(key)
+            self._evict()
+        return session
+
+    def _evict(self):
+        # Sessions with a turn in progress are skipped; they are evicted on a later pass
+        for key in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            session = self.sessions[key]
+            if not session.lock.acquire(blocking=False):
+                continue
+            try:
+                session.save_history()
+                del self.sessions[key]
+                self.evictions += 1
+            finally:
+                session.lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "active": len(self.sessions),
+                "max_active": self.max_sessions,
+                "evictions": self.evictions,
+                "sessions": [f"{user}/{conv}" for user, conv in self.sessions],
+            }
+
+
+chat_sessions = ChatSessions()
+
 
-chat_history = ChatHistory()
+def request_session() -> ChatHistory:
+    """Chat session of the current request: username cookie plus conversation_id (body, query or cookie)"""
+    body = request.get_json(silent=True) or {}
+    conversation_id = (body.get("conversation_id") or request.args.get("conversation_id")
+                       or request.cookies.get("conversation_id"))
+    return chat_sessions.get(request.cookies.get("username", ""), conversation_id)
 
 def python_type_to_openai_type(python_type: type) -> str:
     return {
@@ -148,7 +358,8 @@ def function_to_tool_schema(fn: Callable) -> Dict[str, Any]:
             "parameters": {
                 "type": "object",
                 "properties": params,
-                "required": list(sig.parameters.keys())
+                # Parameters with a default are optional for the model
+                "required": [name for name, p in sig.parameters.items() if p.default is inspect.Parameter.empty]
             } if params else {"type": "object", "properties": {}}
         }
     }
@@ -160,15 +371,201 @@ function_map = {
     if callable(obj)
     and inspect.isfunction(obj)
     and inspect.getmodule(obj).__name__ == "tools"
+    and not name.startswith("_")
 }
 
 
 tools_schema = [function_to_tool_schema(fn) for fn in function_map.values()]
 
-def chat_with_bot(user_input: str, system_prompt: str = None, user_context: Dict[str, str] = None):
-    from data import fetch_all_db_data
-    # Fetch all DB data using the new function
-    db_context = fetch_all_db_data()
+# === Tool Execution ===
+# Tool calls of one model response run concurrently, bounded across all chat turns
+TOOL_WORKERS = int(os.getenv("AION_TOOL_WORKERS", "4"))
+# Seconds a chat turn waits for a tool call; overrides per tool: "create_hiring_trend_chart=60,run_sql=5"
+TOOL_TIMEOUT = float(os.getenv("AION_TOOL_TIMEOUT", "30"))
+
+
+def parse_tool_timeouts(spec: str) -> Dict[str, float]:
+    timeouts = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            timeouts[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return timeouts
+
+
+TOOL_TIMEOUTS = parse_tool_timeouts(os.getenv("AION_TOOL_TIMEOUTS", ""))
+
+# Global tool pool
+tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="aion-tool")
+# Calls that missed their deadline but still hold a pool worker; removed when they return
+_overdue_tools = set()
+_overdue_lock = threading.Lock()
+
+
+def _mark_overdue(future):
+    with _overdue_lock:
+        _overdue_tools.add(future)
+    future.add_done_callback(_clear_overdue)
+
+
+def _clear_overdue(future):
+    with _overdue_lock:
+        _overdue_tools.discard(future)
+
+
+def tool_pool_saturated() -> bool:
+    """True while every pool worker is held by an overdue call, so new calls could never start"""
+    with _overdue_lock:
+        return len(_overdue_tools) >= TOOL_WORKERS
+
+
+def _run_tool(tool_name: str, arguments: str, user_context: Dict[str, str] = None):
+    from chat_context import chat_user_context
+    args = json.loads(arguments or "{}")
+    # Tools that scope data by role (run_sql) read the chatting user from here
+    token = chat_user_context.set(user_context)
+    try:
+        return function_map[tool_name](**args)
+    finally:
+        chat_user_context.reset(token)
+
+
+def _tool_call_events(tool_calls: List[Dict[str, Any]], user_context: Dict[str, str] = None):
+    """
+    Run the tool calls of one model response in tool_pool. Yields ("tool", {"name", "status"})
+    as calls start and finish, then ("results", [(result, ok), ...]) in tool_calls order.
+
+    A call that misses its deadline (counted from submission, so time queued for a worker
+    counts) gets a timeout marker as its result. Python threads cannot be interrupted: a
+    call that already started keeps its worker until it returns, and its result is dropped.
+    While overdue calls hold every worker, new calls are not queued behind them but
+    answered at once with a "busy" marker.
+    """
+    results = [None] * len(tool_calls)
+    pending = {}
+    submitted = time.monotonic()
+    for i, tool_call in enumerate(tool_calls):
+        tool_name = tool_call["function"]["name"]
+        if tool_name not in function_map:
+            results[i] = (f"❌ Unknown tool `{tool_name}`", False)
+            continue
+        if tool_pool_saturated():
+            print(f"⚠️ Tool {tool_name} not run: all tool workers are held by overdue calls")
+            results[i] = (f"⏳ Tool `{tool_name}` could not run because the system is busy. "
+                          f"Answer with the other results, or ask the user to retry shortly.", False)
+            yield "tool", {"name": tool_name, "status": "busy"}
+            continue
+        future = tool_pool.submit(_run_tool, tool_name, tool_call["function"].get("arguments"), user_context)
+        pending[future] = (i, tool_name, submitted + TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT))
+        yield "tool", {"name": tool_name, "status": "running"}
+
+    while pending:
+        next_deadline = min(deadline for _, _, deadline in pending.values())
+        done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        for future in done:
+            i, tool_name, _ = pending.pop(future)
+            try:
+                results[i] = (future.result(), True)
+                status = "done"
+            except Exception as e:
+                print(f"[Tool Error] {tool_name}: {e}")
+                results[i] = (f"⚠️ Error running tool `{tool_name}`: {e}", False)
+                status = "error"
+            yield "tool", {"name": tool_name, "status": status}
+        now = time.monotonic()
+        for future, (i, tool_name, deadline) in list(pending.items()):
+            if deadline > now:
+                continue
+            del pending[future]
+            # Still queued: never runs. Already running: holds its worker until it returns
+            if not future.cancel():
+                _mark_overdue(future)
+            timeout = TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT)
+            print(f"⚠️ Tool {tool_name} timed out after {timeout:g}s")
+            results[i] = (f"⏱️ Tool `{tool_name}` timed out after {timeout:g}s and returned no result. "
+                          f"Answer with the other results, or suggest a narrower request.", False)
+            yield "tool", {"name": tool_name, "status": "timeout"}
+    yield "results", results
+
+def chat_with_bot(user_input: str, system_prompt: str = None, user_context: Dict[str, str] = None,
+                  chat_history: ChatHistory = None):
+    if chat_history is None:
+        chat_history = chat_sessions.get((user_context or {}).get('username', ''))
+    with chat_history.lock:
+        reply = _chat_turn(chat_history, user_input, system_prompt, user_context)
+    # Opt-in (AION_CHAT_SUMMARY=1): fold older turns into the running summary
+    schedule_fold(chat_history)
+    return reply
+
+
+def chat_with_bot_stream(user_input: str, system_prompt: str = None, user_context: Dict[str, str] = None,
+                         chat_history: ChatHistory = None):
+    """
+    Streaming variant of chat_with_bot. Yields (event, data) pairs:
+      ("tool", {"name", "status"})  a tool call started ("running") or finished ("done" / "error" / "timeout" / "busy")
+      ("token", text)               a piece of the model's answer as it is generated
+      ("reply", text)               the complete reply, as saved to the history (always last)
+    The session stays locked until the generator finishes or is closed.
+    """
+    if chat_history is None:
+        chat_history = chat_sessions.get((user_context or {}).get('username', ''))
+    with chat_history.lock:
+        yield from _chat_turn_events(chat_history, user_input, system_prompt, user_context, stream=True)
+    schedule_fold(chat_history)
+
+
+def _chat_turn(chat_history: ChatHistory, user_input: str, system_prompt: str = None, user_context: Dict[str, str] = None):
+    reply = None
+    for event, data in _chat_turn_events(chat_history, user_input, system_prompt, user_context):
+        if event == "reply":
+            reply = data
+    return reply
+
+
+def _completion_events(stream: bool = False, **kwargs):
+    """
+    Run one ChatCompletion. With stream=True yields ("token", text) for each content delta
+    as it arrives; always ends with ("message", message) holding the assembled content and
+    tool_calls in the shape of a non-streamed response message.
+    """
+    if not stream:
+        response = openai.ChatCompletion.create(**kwargs)
+        yield "message", response["choices"][0]["message"]
+        return
+    content = []
+    calls = {}
+    for chunk in openai.ChatCompletion.create(stream=True, **kwargs):
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        delta = choices[0].get("delta") or {}
+        if delta.get("content"):
+            content.append(delta["content"])
+            yield "token", delta["content"]
+        # Tool calls arrive as fragments keyed by index; names and arguments are concatenated
+        for part in delta.get("tool_calls") or []:
+            call = calls.setdefault(part.get("index", 0), {"id": "", "type": "function", "function": {"name": "", "arguments": ""}})
+            if part.get("id"):
+                call["id"] = part["id"]
+            function = part.get("function") or {}
+            call["function"]["name"] += function.get("name") or ""
+            call["function"]["arguments"] += function.get("arguments") or ""
+    message = {"role": "assistant", "content": "".join(content)}
+    if calls:
+        message["tool_calls"] = [calls[i] for i in sorted(calls)]
+    yield "message", message
+
+
+def _chat_turn_events(chat_history: ChatHistory, user_input: str, system_prompt: str = None,
+                      user_context: Dict[str, str] = None, stream: bool = False):
+    from chat_context import build_db_context
+    # Only the records relevant to this question and the recent conversation (AION_CHAT_CONTEXT=full sends everything)
+    recent_messages = prompt_history(chat_history, budget_for("history"))
+    db_context = build_db_context(user_input, history=recent_messages, user_context=user_context)
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
@@ -181,54 +578,45 @@ def chat_with_bot(user_input: str, system_prompt: str = None, user_context: Dict
         messages.append({"role": "system", "content": context_info})
     
     # Add DB context as a system message
-    messages.append({"role": "system", "content": f"DB_CONTEXT: {json.dumps(db_context, ensure_ascii=False)}"})
-    messages.extend(chat_history.get_recent_messages())
+    messages.append({"role": "system", "content": f"DB_CONTEXT: {json.dumps(db_context, ensure_ascii=False, separators=(',', ':'))}"})
+    messages.extend(recent_messages)
     messages.append({"role": "user", "content": user_input})
     chat_history.add_message("user", user_input)
     
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=messages,
-            tools=tools_schema,
-            tool_choice="auto"
-        )
-        message = response["choices"][0]["message"]
+        for event, data in _completion_events(stream, model="gpt-4o", messages=messages,
+                                              tools=tools_schema, tool_choice="auto"):
+            if event == "message":
+                message = data
+            else:
+                yield event, data
     except Exception as e:
         print(f"[OpenAI API Error] {e}")
         error_response = "I apologize, but I'm experiencing some technical difficulties right now. Please try again in a moment."
         chat_history.add_message("assistant", error_response)
         chat_history.save_history()
-        return error_response
+        yield "reply", error_response
+        return
     # ...existing code...
     # Otherwise, use normal OpenAI response logic
     if message.get("tool_calls"):
         chat_history.add_message("assistant", message.get("content", ""), message.get("tool_calls"))
-        tool_results = []
-        all_tools_successful = True
-        for tool_call in message["tool_calls"]:
-            tool_name = tool_call["function"]["name"]
-            args = json.loads(tool_call["function"]["arguments"])
-            if tool_name in function_map:
-                try:
-                    result = function_map[tool_name](**args)
-                except Exception as e:
-                    print(f"[Tool Error] {tool_name}: {e}")
-                    result = f"⚠️ Error running tool `{tool_name}`: {e}"
-                    all_tools_successful = False
-                tool_results.append({
-                    "tool_call": tool_call,
-                    "result": result
-                })
-                chat_history.add_tool_message(tool_call["id"], tool_name, str(result))
+        # Tool results share the tools part of the prompt budget
+        result_budget = budget_for("tools") // max(1, len(message["tool_calls"]))
+        for event, data in _tool_call_events(message["tool_calls"], user_context):
+            if event == "results":
+                results = data
             else:
-                error_msg = f"❌ Unknown tool `{tool_name}`"
-                tool_results.append({
-                    "tool_call": tool_call,
-                    "result": error_msg
-                })
-                chat_history.add_tool_message(tool_call["id"], tool_name, error_msg)
-                all_tools_successful = False
+                yield event, data
+        tool_results = []
+        all_tools_successful = all(ok for _, ok in results)
+        for tool_call, (result, _) in zip(message["tool_calls"], results):
+            result = truncate_to_tokens(str(result), result_budget)
+            tool_results.append({
+                "tool_call": tool_call,
+                "result": result
+            })
+            chat_history.add_tool_message(tool_call["id"], tool_call["function"]["name"], result)
         messages.append({"role": "assistant", "tool_calls": message["tool_calls"]})
         for tool_result in tool_results:
             messages.append({
@@ -238,24 +626,24 @@ def chat_with_bot(user_input: str, system_prompt: str = None, user_context: Dict
                 "content": str(tool_result["result"])
             })
         try:
-            followup = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=messages
-            )
-            final_response = followup["choices"][0]["message"]["content"]
+            for event, data in _completion_events(stream, model="gpt-4o", messages=messages):
+                if event == "message":
+                    final_response = data["content"]
+                else:
+                    yield event, data
             chat_history.add_message("assistant", final_response)
             chat_history.save_history()
-            return final_response
+            yield "reply", final_response
         except Exception as e:
             print(f"[Followup Error] {e}")
             fallback = "Sorry, I couldn't complete your request due to an internal error. Please try again or rephrase your question."
             chat_history.add_message("assistant", fallback)
             chat_history.save_history()
-            return fallback
+            yield "reply", fallback
     else:
         chat_history.add_message("assistant", message["content"])
         chat_history.save_history()
-        return message["content"]
+        yield "reply", message["content"]
 
 SYSTEM_PROMPT = """
 You are a highly intelligent, friendly HR assistant with advanced data analytics capabilities. Always provide clear, helpful, and positive replies to the user, as if you are a real assistant.
@@ -346,6 +734,7 @@ When users ask about analytics, trends, gaps, comparisons, or data-driven insigh
 - "Onboarding insights" OR "ids and ict allocation slow" → MUST use `get_enhanced_onboarding_insights()`
 - "Probation insights" OR "mechanical discipline needs improvement" → MUST use `get_enhanced_probation_insights()`
 - "Market salary comparison" OR "our salary vs market" → MUST use `get_enhanced_market_salary_comparison()`
+- Looking up candidates by name, email, skill, experience or interview content → use `search_candidates(query)`
 
 For every user query, always:
 - Search, extract, and infer all relevant information from the available data, even if it is unstructured or indirect.
@@ -356,6 +745,7 @@ For every user query, always:
 - **For analytical questions: MANDATORY - ALWAYS use tools to analyze data and create visualizations. Use `comprehensive_hiring_analysis()` for complete hiring analysis. NEVER give generic responses without data analysis first. Keep responses CONCISE (3-4 sentences max)**
 - **For user information requests: Always check permissions using get_user_information or get_salary_information tools before sharing any personal/professional details**
 - **CRITICAL: When asked about gaps, performance, trends, or analytics - you MUST call analysis tools first. Do not provide business advice without data.**
+- **For specific candidates, jobs, interviews or counts that are not in DB_CONTEXT, call get_candidate, filter_candidates, list_upcoming_interviews, get_job_details or count_by instead of guessing.**
 
 You have access to chat history and can remember previous conversations. Your goal is to always sound like a helpful, positive, and professional HR assistant with strong analytical capabilities, never exposing technical or backend details to the user.
 """
@@ -364,10 +754,101 @@ You have access to chat history and can remember previous conversations. Your go
 def index():
     return render_template("chatbot.html")
 
-@app.route("/chat", methods=["POST"])
-def chat():
-    import re
-    data = request.get_json()
+def format_reply(text: str) -> str:
+    """Chat reply markdown -> HTML: images, *bold*, bullet / numbered lists and line breaks"""
+    # Replace markdown image links with HTML <img> tags
+    def image_replacer(match):
+        alt_text = match.group(1)
+        img_path = match.group(2)
+        # Only allow .png, .jpg, .jpeg, .gif for safety
+        if img_path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
+            # If path starts with ./db/ or db/, convert to /db/ for browser access
+            if img_path.startswith('./db/'):
+                web_path = img_path[1:]  # remove leading .
+            elif img_path.startswith('db/'):
+                web_path = '/' + img_path
+            elif img_path.startswith('./static/'):
+                web_path = img_path[1:]
+            elif img_path.startswith('static/'):
+                web_path = '/' + img_path
+            else:
+                # For bare filenames, assume they're in the db directory
+                # Check if file exists in db directory
+                db_file_path = pathlib.Path(__file__).parent / 'db' / img_path
+                if db_file_path.exists():
+                    web_path = f'/db/{img_path}'
+                else:
+                    web_path = img_path
+            return f'<div style="margin:8px 0;"><img src="{web_path}" alt="{alt_text}" style="max-width: 100%; max-height: 320px; border:1px solid #ccc; border-radius:6px; box-shadow:0 2px 8px #0001;"><div style="font-size:12px;color:#555;">{alt_text}</div></div>'
+        return match.group(0)
+    text = re.sub(r'!\[(.*?)\]\((.*?)\)', image_replacer, text)
+    # Bold for *text*
+    text = re.sub(r'\*(.*?)\*', r'<b>\1</b>', text)
+    # Lists: lines starting with - or number.
+    lines = text.split('\n')
+    formatted_lines = []
+    in_ul = False
+    for line in lines:
+        if re.match(r'^\s*- ', line):
+            if not in_ul:
+                formatted_lines.append('<ul style="margin:4px 0 4px 18px; padding:0;">')
+                in_ul = True
+            formatted_lines.append(f'<li style="margin:2px 0;">{line.lstrip("- ")}</li>')
+        elif re.match(r'^\s*\d+\. ', line):
+            if not in_ul:
+                formatted_lines.append('<ul style="margin:4px 0 4px 18px; padding:0;">')
+                in_ul = True
+            formatted_lines.append(f'<li style="margin:2px 0;">{re.sub(r"^\s*\d+\. ", "", line)}</li>')
+        else:
+            if in_ul:
+                formatted_lines.append('</ul>')
+                in_ul = False
+            # Add <br> for blank lines to create spacing between blocks
+            if line.strip():
+                formatted_lines.append(line)
+            else:
+                formatted_lines.append('<br>')
+    if in_ul:
+        formatted_lines.append('</ul>')
+    # Join with <br> for newlines, but not between list items
+    html = ''
+    for i, part in enumerate(formatted_lines):
+        if part.startswith('<ul') or part.startswith('</ul>') or part.startswith('<li') or part.startswith('<div style="margin:8px 0;">'):
+            html += part
+        else:
+            html += part + '<br>'
+    return html.rstrip('<br>')
+
+
+class ReplyStreamFormatter:
+    """
+    Incremental format_reply for streamed answers. Completed lines are re-rendered as
+    HTML whenever a newline arrives (lists and images only format correctly on whole
+    lines); the unfinished last line is passed through as plain text.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.lines_end = 0
+
+    def feed(self, token: str) -> Dict[str, str]:
+        self.text += token
+        delta = {}
+        if "\n" in token:
+            self.lines_end = self.text.rindex("\n")
+            delta["html"] = format_reply(self.text[:self.lines_end])
+        delta["tail"] = self.text[self.lines_end:].lstrip("\n")
+        return delta
+
+    def reset(self) -> Dict[str, str]:
+        self.text = ""
+        self.lines_end = 0
+        return {"html": "", "tail": ""}
+
+
+def _chat_request():
+    """Message and cookie user context of a /chat request; logs the chat activity"""
+    data = request.get_json(silent=True) or {}
     user_input = data.get("message", "")
     
     # Get user context from cookies for role-based access control
@@ -384,102 +865,71 @@ def chat():
         log_chat_activity(user_context.get('username', 'unknown'), user_input)
     except Exception as e:
         print(f"⚠️ Could not log chat activity: {e}")
-    
-    reply = chat_with_bot(user_input, system_prompt=SYSTEM_PROMPT, user_context=user_context)
-    # HTML bold for *text*
-    # Format job list if detected
-    import re
-    def format_reply(text):
-        import re
-        # Replace markdown image links with HTML <img> tags
-        def image_replacer(match):
-            alt_text = match.group(1)
-            img_path = match.group(2)
-            # Only allow .png, .jpg, .jpeg, .gif for safety
-            if img_path.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                # If path starts with ./db/ or db/, convert to /db/ for browser access
-                if img_path.startswith('./db/'):
-                    web_path = img_path[1:]  # remove leading .
-                elif img_path.startswith('db/'):
-                    web_path = '/' + img_path
-                elif img_path.startswith('./static/'):
-                    web_path = img_path[1:]
-                elif img_path.startswith('static/'):
-                    web_path = '/' + img_path
-                else:
-                    # For bare filenames, assume they're in the db directory
-                    # Check if file exists in db directory
-                    db_file_path = pathlib.Path(__file__).parent / 'db' / img_path
-                    if db_file_path.exists():
-                        web_path = f'/db/{img_path}'
-                    else:
-                        web_path = img_path
-                return f'<div style="margin:8px 0;"><img src="{web_path}" alt="{alt_text}" style="max-width: 100%; max-height: 320px; border:1px solid #ccc; border-radius:6px; box-shadow:0 2px 8px #0001;"><div style="font-size:12px;color:#555;">{alt_text}</div></div>'
-            return match.group(0)
-        text = re.sub(r'!\[(.*?)\]\((.*?)\)', image_replacer, text)
-        # Bold for *text*
-        text = re.sub(r'\*(.*?)\*', r'<b>\1</b>', text)
-        # Lists: lines starting with - or number.
-        lines = text.split('\n')
-        formatted_lines = []
-        in_ul = False
-        for line in lines:
-            if re.match(r'^\s*- ', line):
-                if not in_ul:
-                    formatted_lines.append('<ul style="margin:4px 0 4px 18px; padding:0;">')
-                    in_ul = True
-                formatted_lines.append(f'<li style="margin:2px 0;">{line.lstrip("- ")}</li>')
-            elif re.match(r'^\s*\d+\. ', line):
-                if not in_ul:
-                    formatted_lines.append('<ul style="margin:4px 0 4px 18px; padding:0;">')
-                    in_ul = True
-                formatted_lines.append(f'<li style="margin:2px 0;">{re.sub(r"^\s*\d+\. ", "", line)}</li>')
-            else:
-                if in_ul:
-                    formatted_lines.append('</ul>')
-                    in_ul = False
-                # Add <br> for blank lines to create spacing between blocks
-                if line.strip():
-                    formatted_lines.append(line)
-                else:
-                    formatted_lines.append('<br>')
-        if in_ul:
-            formatted_lines.append('</ul>')
-        # Join with <br> for newlines, but not between list items
-        html = ''
-        for i, part in enumerate(formatted_lines):
-            if part.startswith('<ul') or part.startswith('</ul>') or part.startswith('<li') or part.startswith('<div style="margin:8px 0;">'):
-                html += part
-            else:
-                html += part + '<br>'
-        return html.rstrip('<br>')
+    return user_input, user_context
 
-    reply_html = format_reply(reply)
+
+def _reply_payload(reply: str) -> Dict[str, str]:
     # Remove * and # for plain text
-    reply_plain = reply.replace('*', '').replace('#', '')
-    return jsonify({
-        "reply": reply_html,
-        "reply_plain": reply_plain
-    })
+    return {"reply": format_reply(reply), "reply_plain": reply.replace('*', '').replace('#', '')}
+
+
+@app.route("/chat", methods=["POST"])
+def chat():
+    user_input, user_context = _chat_request()
+    reply = chat_with_bot(user_input, system_prompt=SYSTEM_PROMPT, user_context=user_context,
+                          chat_history=request_session())
+    return jsonify(_reply_payload(reply))
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """Server-Sent Events variant of /chat (same request body).
+    Events:
+      tool   {name, status}  a tool call is running / finished ("done", "error", "timeout" or "busy")
+      delta  {html?, tail}   answer so far: html of the completed lines (when a line completed)
+                             and the unfinished last line as plain text
+      done   {reply, reply_plain}  the final formatted reply, same shape as the /chat response
+    """
+    user_input, user_context = _chat_request()
+    events = chat_with_bot_stream(user_input, system_prompt=SYSTEM_PROMPT, user_context=user_context,
+                                  chat_history=request_session())
+
+    def generate():
+        formatter = ReplyStreamFormatter()
+        for event, data in events:
+            if event == "token":
+                yield format_sse("delta", formatter.feed(data))
+            elif event == "tool":
+                # Text streamed before the model decided to call tools is not part of the answer
+                if formatter.text:
+                    yield format_sse("delta", formatter.reset())
+                yield format_sse("tool", data)
+            elif event == "reply":
+                yield format_sse("done", _reply_payload(data))
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
 
 @app.route("/clear_history", methods=["POST"])
 def clear_history():
-    chat_history.clear_history()
+    request_session().clear_history()
     return jsonify({"status": "success"})
 
 @app.route("/clean_history", methods=["POST"])
 def clean_history():
-    chat_history.clean_corrupted_history()
+    request_session().clean_corrupted_history()
     return jsonify({"status": "success"})
 
 @app.route("/show_history", methods=["GET"])
 def show_history():
     import re
-    messages = chat_history.get_recent_messages(1000)
     history = []
-    for msg in messages[-5:]:
+    for msg in request_session().last(5):
         role = msg["role"].title()
-        content = msg.get("content", "")
+        content = msg.get("content") or ""
         # HTML bold for *text*
         content_html = re.sub(r'\*(.*?)\*', r'<b>\1</b>', content)
         # Remove * and # for plain text
@@ -574,9 +1024,15 @@ def recent_activities():
             }
         }), 500
 
+# Last analytics summary and the candidates / jobs versions (plus date) it was built from
+_analytics_summary_cache = {"key": None, "data": None}
+
 @app.route("/analytics_summary", methods=["GET"])
 def get_analytics_summary():
     """Get summary of all HR analytics for quick action buttons"""
+    cache_key = data_versions.snapshot("candidates", "jobs") + (datetime.date.today().isoformat(),)
+    if _analytics_summary_cache["key"] == cache_key:
+        return jsonify({"status": "success", "data": _analytics_summary_cache["data"]})
     try:
         # Import analytics functions
         from tools import (
@@ -868,6 +1324,7 @@ def get_analytics_summary():
         except:
             analytics_data["market"] = "🏪 Market salary analysis available"
         
+        _analytics_summary_cache.update(key=cache_key, data=analytics_data)
         return jsonify({"status": "success", "data": analytics_data})
     
     except Exception as e:
@@ -0,0 +1,179 @@
+"""
+Derived Activity Feed for AION HR System
+Activities derived from candidate and job records, kept per entity and updated from change events
+"""
+
+import datetime
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from change_events import change_events, CANDIDATES_SAVED, JOBS_SAVED
+
+
+# Candidate fields the derived activities depend on; a candidate is re-derived only when one changes
+CANDIDATE_FIELDS = ['id', 'name', 'email', 'applied_date', 'updated_at', 'updated_by', 'status',
+                    'interview_date', 'interview_time']
+JOB_FIELDS = ['id', 'job_title', 'job_posted_by', 'posted_at']
+
+
+def candidate_activities(c: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Activities implied by one candidate record (application, last update)"""
+    out = []
+    candidate_name = c.get('name', '')
+    candidate_id = c.get('id', '')
+    if c.get('applied_date'):
+        out.append({
+            'date': c.get('applied_date'),
+            'description': f"Candidate {candidate_name} (ID: {candidate_id}) applied",
+            'user': c.get('email', ''),
+            'type': 'candidate_applied',
+            'entity_type': 'candidate',
+            'entity_id': candidate_id
+        })
+    if c.get('updated_at') and c.get('updated_by'):
+        user_val = c.get('updated_by', c.get('email', ''))
+        date_val = c.get('updated_at')
+        if c.get('status'):
+            out.append({
+                'date': date_val,
+                'description': f"Candidate {candidate_name} (ID: {candidate_id}) status changed to {c.get('status', '')}",
+                'user': user_val,
+                'type': 'candidate_status_updated',
+                'entity_type': 'candidate',
+                'entity_id': candidate_id
+            })
+        if c.get('interview_date') and c.get('interview_time'):
+            out.append({
+                'date': date_val,
+                'description': f"Interview scheduled for {candidate_name} (ID: {candidate_id}) on {c.get('interview_date', '')} at {c.get('interview_time', '')}",
+                'user': user_val,
+                'type': 'interview_scheduled',
+                'entity_type': 'interview',
+                'entity_id': candidate_id
+            })
+        if c.get('onboarding'):
+            out.append({
+                'date': date_val,
+                'description': f"Onboarding updated for {candidate_name} (ID: {candidate_id})",
+                'user': user_val,
+                'type': 'onboarding_updated',
+                'entity_type': 'onboarding',
+                'entity_id': candidate_id
+            })
+    return out
+
+
+def job_activities(job: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{
+        'date': job.get('posted_at', ''),
+        'description': f"Job posted: {job.get('job_title', '')}",
+        'user': job.get('job_posted_by', ''),
+        'type': 'job_posted',
+        'entity_type': 'job',
+        'entity_id': job.get('id', '')
+    }]
+
+
+class ActivityFeed:
+    """
+    Per-entity derived activities.
+
+    Candidate / job writes arrive as change events with the saved list; only records whose
+    relevant fields changed are re-derived. Writes from other processes are picked up by
+    the usual file signature check.
+    """
+
+    def __init__(self, db_folder: Optional[str] = None):
+        self.db_folder = db_folder or os.path.join(os.path.dirname(__file__), 'db')
+        self.candidate_file = os.path.join(self.db_folder, 'candidates.json')
+        self.job_file = os.path.join(self.db_folder, 'jobs.json')
+        self.lock = threading.RLock()
+        self.by_candidate: Dict[Any, Tuple[tuple, List[Dict]]] = {}
+        self.by_job: Dict[Any, Tuple[tuple, List[Dict]]] = {}
+        self._candidate_sig = None
+        self._job_sig = None
+
+    @staticmethod
+    def _file_sig(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read(path) -> List[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return []
+
+    @staticmethod
+    def _sync(index: Dict, records: List[Dict], fields: List[str], derive) -> int:
+        changed = 0
+        seen = set()
+        for pos, r in enumerate(records):
+            # Jobs have no stable 'id'; fall back to job_id / position
+            key = r.get('id', r.get('job_id', pos))
+            seen.add(key)
+            sig = tuple(r.get(f) for f in fields) + (bool(r.get('onboarding')),)
+            old = index.get(key)
+            if old is None or old[0] != sig:
+                index[key] = (sig, derive(r))
+                changed += 1
+        for key in [k for k in index if k not in seen]:
+            del index[key]
+        return changed
+
+    def sync_candidates(self, candidates: List[Dict]) -> int:
+        with self.lock:
+            changed = self._sync(self.by_candidate, candidates, CANDIDATE_FIELDS, candidate_activities)
+            self._candidate_sig = self._file_sig(self.candidate_file)
+            return changed
+
+    def sync_jobs(self, jobs: List[Dict]) -> int:
+        with self.lock:
+            changed = self._sync(self.by_job, jobs, JOB_FIELDS, job_activities)
+            self._job_sig = self._file_sig(self.job_file)
+            return changed
+
+    def refresh(self):
+        with self.lock:
+            if self._file_sig(self.candidate_file) != self._candidate_sig:
+                self.sync_candidates(self._read(self.candidate_file))
+            if self._file_sig(self.job_file) != self._job_sig:
+                self.sync_jobs(self._read(self.job_file))
+
+    def activities(self) -> List[Dict[str, Any]]:
+        """All derived activities (copies; 'user' is the raw email / username)"""
+        self.refresh()
+        with self.lock:
+            out = [dict(a) for _, items in self.by_candidate.values() for a in items]
+            out += [dict(a) for _, items in self.by_job.values() for a in items]
+            return out
+
+    def on_date(self, day: datetime.date) -> List[Dict[str, Any]]:
+        """Derived activities dated `day` (application / job dates as YYYY-MM-DD, updates with a time)"""
+        out = []
+        for a in self.activities():
+            fmt = '%Y-%m-%d %H:%M:%S' if a['type'] in ('candidate_status_updated', 'interview_scheduled', 'onboarding_updated') else '%Y-%m-%d'
+            try:
+                if datetime.datetime.strptime(a.get('date') or '', fmt).date() == day:
+                    out.append(a)
+            except ValueError:
+                continue
+        return out
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'candidates': len(self.by_candidate), 'jobs': len(self.by_job)}
+
+
+# Global activity feed instance
+activity_feed = ActivityFeed()
+
+change_events.subscribe(CANDIDATES_SAVED, lambda e: activity_feed.sync_candidates(e.data['candidates']))
+change_events.subscribe(JOBS_SAVED, lambda e: activity_feed.sync_jobs(e.data['jobs']))
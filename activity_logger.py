@@ -3,18 +3,38 @@ Enhanced Activity Logger for AION HR System
 Tracks all user activities across the application
 """
 
+import atexit
 import json
 import os
 import datetime
 from typing import Dict, List, Any, Optional
 import threading
 
+from change_events import change_events, CANDIDATE_STATUS_CHANGED, JOB_POSTED, CV_ANALYZED, INTERVIEW_ANALYZED
+
+
+# Activities kept in the log file
+MAX_ACTIVITIES = 1000
+
 
 class ActivityLogger:
+    """
+    Activity log in activity_log.json.
+
+    log_activity only queues the entry; a background writer appends everything queued
+    since its last pass in one read / rewrite of the file, so a burst of events (a bulk
+    status change) costs one write instead of one per event and never blocks the caller.
+    Reads include queued entries that are not on disk yet.
+    """
+
     def __init__(self, db_folder: str = "./db"):
         self.db_folder = db_folder
         self.activity_file = os.path.join(db_folder, "activity_log.json")
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()         # guards self.pending
+        self.write_lock = threading.Lock()   # guards the file
+        self.pending: List[Dict] = []
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
         
         # Ensure the db folder exists
         os.makedirs(db_folder, exist_ok=True)
@@ -26,13 +46,14 @@ class ActivityLogger:
     def _write_activities(self, activities: List[Dict]):
         """Write activities to file with error handling"""
         try:
-            with open(self.activity_file, 'w', encoding='utf-8') as f:
+            tmp_path = f"{self.activity_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(activities, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.activity_file)
         except Exception as e:
             print(f"Error writing activities: {e}")
     
-    def _read_activities(self) -> List[Dict]:
-        """Read activities from file with error handling"""
+    def _read_file(self) -> List[Dict]:
         try:
             if os.path.exists(self.activity_file):
                 with open(self.activity_file, 'r', encoding='utf-8') as f:
@@ -40,6 +61,32 @@ class ActivityLogger:
         except Exception as e:
             print(f"Error reading activities: {e}")
         return []
+
+    def _read_activities(self) -> List[Dict]:
+        """Activities on disk followed by those still queued for the writer"""
+        with self.write_lock:
+            activities = self._read_file()
+            with self.lock:
+                activities.extend(self.pending)
+        return activities[-MAX_ACTIVITIES:]
+
+    def flush(self):
+        """Append all queued activities to the file in one write"""
+        with self.write_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return
+            activities = self._read_file()
+            activities.extend(batch)
+            # Keep only the last MAX_ACTIVITIES to prevent the file from growing too large
+            self._write_activities(activities[-MAX_ACTIVITIES:])
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
     
     def log_activity(self, 
                     activity_type: str,
@@ -72,16 +119,13 @@ class ActivityLogger:
             "time": datetime.datetime.now().strftime('%H:%M:%S')
         }
         
-        # Thread-safe writing
+        # Written by the background writer together with anything else queued meanwhile
         with self.lock:
-            activities = self._read_activities()
-            activities.append(activity)
-            
-            # Keep only last 1000 activities to prevent file from growing too large
-            if len(activities) > 1000:
-                activities = activities[-1000:]
-            
-            self._write_activities(activities)
+            self.pending.append(activity)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='activity-writer', daemon=True)
+                self._writer.start()
+        self._wake.set()
     
     def get_recent_activities(self, limit: int = 50, days: int = 7) -> List[Dict]:
         """Get recent activities within specified days"""
@@ -134,6 +178,8 @@ class ActivityLogger:
 
 # Global activity logger instance
 activity_logger = ActivityLogger()
+# Queued activities are written before the process exits
+atexit.register(activity_logger.flush)
 
 
 # Convenience functions for common activities
@@ -230,6 +276,55 @@ def log_analytics_activity(user: str, analysis_type: str, details: Dict = None):
     )
 
 
+# ---------------- Change event subscriptions ----------------
+def _log_status_changed(event):
+    d = event.data
+    activity_logger.log_activity(
+        activity_type="candidate_status_updated",
+        description=f"Candidate {d.get('candidate_name')} (ID: {d.get('candidate_id')}) status changed to {d.get('status')}",
+        user=d.get('updated_by') or "system",
+        entity_id=d.get('candidate_id'),
+        entity_type="candidate",
+        details={"from_status": d.get('previous_status'), "to_status": d.get('status'), "update_type": d.get('update_type')}
+    )
+
+
+def _log_job_posted(event):
+    job = event.data['job']
+    log_job_activity("posted", job.get('job_id'), job.get('job_title', ''), job.get('job_posted_by', 'system'),
+                     details={"department": job.get('department')})
+
+
+def _log_cv_analyzed(event):
+    d = event.data
+    activity_logger.log_activity(
+        activity_type="candidate_cv_analyzed",
+        description=f"CV analyzed for {d.get('candidate_name')} (ID: {d.get('candidate_id')}): match score {d.get('match_score')}%",
+        user=d.get('uploaded_by') or "system",
+        entity_id=d.get('candidate_id'),
+        entity_type="candidate",
+        details={"job_id": d.get('job_id'), "match_score": d.get('match_score')}
+    )
+
+
+def _log_interview_analyzed(event):
+    d = event.data
+    activity_logger.log_activity(
+        activity_type="interview_analyzed",
+        description=f"Interview {d.get('round_name') or 'round'} analyzed for {d.get('candidate_name')} (ID: {d.get('candidate_id')})",
+        user="system",
+        entity_id=d.get('candidate_id'),
+        entity_type="interview",
+        details={"round_index": d.get('round_index'), "performance_score": d.get('performance_score')}
+    )
+
+
+change_events.subscribe(CANDIDATE_STATUS_CHANGED, _log_status_changed)
+change_events.subscribe(JOB_POSTED, _log_job_posted)
+change_events.subscribe(CV_ANALYZED, _log_cv_analyzed)
+change_events.subscribe(INTERVIEW_ANALYZED, _log_interview_analyzed)
+
+
 # Migration function to populate activities from existing data
 def migrate_existing_activities():
     """Migrate existing candidate and job data to activity log"""
@@ -282,6 +377,7 @@ def migrate_existing_activities():
                         details={"migrated": True, "department": job.get('department')}
                     )
         
+        activity_logger.flush()
         print("✅ Activity migration completed successfully")
         
     except Exception as e:
@@ -1,14 +1,26 @@
 
 # ...existing code...
 from backend import get_dashboard_data, save_job_post
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, Response, stream_with_context
 from urllib.parse import urlparse, urljoin
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from backend import analyze_cv_with_jd_and_update_candidate
+from search_index import search_index
+from facet_index import facet_index
+from notification_broker import notification_broker
+from notification_store import notification_store, notification_matches, is_unread, base_role
+from reminder_scheduler import DueTimeScheduler
+from teams_outbox import teams_outbox, TEAMS_CHANNEL
+import notification_archive
+from unit_of_work import unit_of_work, unit_of_work_scope, current_unit_of_work
+from change_events import change_events, CANDIDATES_SAVED, NOTIFICATIONS_SAVED, CANDIDATE_STATUS_CHANGED, INTERVIEW_ANALYZED
+from data_version import data_versions
+from activity_logger import activity_logger
+from activity_feed import activity_feed
+from exports import EXPORT_FORMATS, CANDIDATE_COLUMNS, JOB_COLUMNS, resolve_columns, iter_candidate_rows, iter_job_rows, export_stream
 import json
 import os
-import urllib.request
-import urllib.error
+import threading
 import hmac
 import hashlib
 from dotenv import load_dotenv
@@ -36,69 +48,43 @@ def verify_link_token(path: str, username: str, token: str):
     expected = generate_link_token(path, username)
     return hmac.compare_digest(expected, token)
 
+def teams_card_item(notification: dict) -> dict:
+    """Card content (title, message, facts, deep link) for one notification."""
+    cid = notification.get('candidate_id')
+    # Embed signed token link if we have a specific receiver
+    receiver = notification.get('receiver_username') or ''
+    if cid and receiver:
+        path = f"/candidate/{cid}"
+        token = generate_link_token(path, receiver)
+        view_url = f"{APP_BASE_URL}/candidate_link/{cid}?user={receiver}&token={token}"
+    else:
+        view_url = f"{APP_BASE_URL}/candidate/{cid}" if cid else APP_BASE_URL
+    return {
+        'title': notification.get('type', 'Notification').replace('_', ' ').title(),
+        'message': notification.get('message') or '',
+        'facts': [
+            {"title": "Candidate", "value": notification.get('candidate_name') or 'Unknown'},
+            {"title": "Position", "value": notification.get('position') or 'N/A'},
+            {"title": "Priority", "value": notification.get('priority', 'normal')},
+            {"title": "Action Required", "value": 'Yes' if notification.get('action_required') else 'No'}
+        ],
+        'url': view_url,
+    }
+
 def send_teams_notification(notification: dict):
-    """Post a notification to a Microsoft Teams channel via Incoming Webhook (if configured).
+    """Queue a notification for the Microsoft Teams channel via Incoming Webhook (if configured).
 
-    Expects TEAMS_WEBHOOK_URL env variable. Silently no-ops if missing or errors occur.
-    Uses an Adaptive Card (fallback simple text if card fails) with candidate context & deep link.
+    Expects TEAMS_WEBHOOK_URL env variable. Silently no-ops if missing. The card is written to
+    the Teams outbox and posted by its background worker (digests, retries, circuit breaker),
+    so callers never wait on the webhook.
     """
     if not TEAMS_WEBHOOK_URL:
         return  # integration not enabled
     try:
-        title = notification.get('type', 'Notification').replace('_', ' ').title()
-        candidate_name = notification.get('candidate_name') or 'Unknown'
-        position = notification.get('position') or 'N/A'
-        message = notification.get('message') or ''
-        cid = notification.get('candidate_id')
-        # Embed signed token link if we have a specific receiver
-        receiver = notification.get('receiver_username') or ''
-        if cid and receiver:
-            path = f"/candidate/{cid}"
-            token = generate_link_token(path, receiver)
-            view_url = f"{APP_BASE_URL}/candidate_link/{cid}?user={receiver}&token={token}"
-        else:
-            view_url = f"{APP_BASE_URL}/candidate/{cid}" if cid else APP_BASE_URL
-        # Minimal Adaptive Card payload
-        card = {
-            "type": "message",
-            "attachments": [
-                {
-                    "contentType": "application/vnd.microsoft.card.adaptive",
-                    "contentUrl": None,
-                    "content": {
-                        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-                        "type": "AdaptiveCard",
-                        "version": "1.4",
-                        "msteams": {"width": "Full"},
-                        "body": [
-                            {"type": "TextBlock", "size": "Large", "weight": "Bolder", "text": title},
-                            {"type": "TextBlock", "wrap": True, "text": message},
-                            {
-                                "type": "FactSet",
-                                "facts": [
-                                    {"title": "Candidate", "value": candidate_name},
-                                    {"title": "Position", "value": position},
-                                    {"title": "Priority", "value": notification.get('priority','normal')},
-                                    {"title": "Action Required", "value": 'Yes' if notification.get('action_required') else 'No'}
-                                ]
-                            }
-                        ],
-                        "actions": [
-                            {"type": "Action.OpenUrl", "title": "View Candidate", "url": view_url}
-                        ]
-                    }
-                }
-            ]
-        }
-        data = json.dumps(card).encode('utf-8')
-        req = urllib.request.Request(TEAMS_WEBHOOK_URL, data=data, headers={'Content-Type': 'application/json'})
-        with urllib.request.urlopen(req, timeout=5) as resp:  # nosec B310 (intentional external call)
-            _ = resp.read()
+        teams_outbox.enqueue(TEAMS_CHANNEL, teams_card_item(notification))
+        teams_outbox.start()
     except Exception as e:  # pragma: no cover - non critical
-        try:
-            print('Teams webhook send failed:', e)
-        except Exception:
-            pass
+        print('Teams outbox enqueue failed:', e)
 
 # ---------------- Workflow Reminder Configuration ----------------
 REMINDER_THRESHOLD_HOURS = 24          # Hours until first pending escalation
@@ -114,8 +100,7 @@ def parse_iso(dt_str):
     except Exception:
         return None
 
-def load_candidates():
-    path = os.path.join('db','candidates.json')
+def _read_json_list(path):
     if not os.path.exists(path):
         return []
     try:
@@ -124,10 +109,76 @@ def load_candidates():
     except Exception:
         return []
 
+def _read_candidates():
+    return _read_json_list(os.path.join('db','candidates.json'))
+
+def _write_json_atomic(path, items):
+    # Readers (request threads, the reminder scheduler) never see a half-written file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path,'w',encoding='utf-8') as f:
+        json.dump(items,f,indent=4)
+    os.replace(tmp_path, path)
+
+def _write_candidates(cands):
+    _write_json_atomic(os.path.join('db','candidates.json'), cands)
+    # Search / facet indexes and the activity feed follow candidate writes through the change bus
+    change_events.publish(CANDIDATES_SAVED, candidates=cands)
+
+def _read_jobs():
+    return _read_json_list(os.path.join('db','jobs.json'))
+
+def _read_notifications():
+    notes = _read_json_list(os.path.join('db', 'notifications.json'))
+    # Notifications written before change sequencing start at their id
+    for n in notes:
+        if 'seq' not in n:
+            n['seq'] = n.get('id', 0)
+    return notes
+
+def _write_notifications(items):
+    _write_json_atomic(os.path.join('db', 'notifications.json'), items)
+    change_events.publish(NOTIFICATIONS_SAVED, notifications=items)
+
+# Collections handled by the request unit of work (loader, saver); written in this order
+JSON_STORES = {
+    'candidates': (_read_candidates, _write_candidates),
+    'notifications': (_read_notifications, _write_notifications),
+    'jobs': (_read_jobs, None),
+}
+# Serializes read-modify-write cycles of request units of work and background writers
+store_lock = threading.RLock()
+# Views decorated with this read each collection once and write it once on return
+with_unit_of_work = unit_of_work(JSON_STORES, lock=store_lock)
+
+def store_transaction():
+    """Unit of work over JSON_STORES for one block of a view; store_lock is held only inside it"""
+    return unit_of_work_scope(JSON_STORES, lock=store_lock)
+
+def load_candidates():
+    uow = current_unit_of_work()
+    return uow.load('candidates') if uow else _read_candidates()
+
 def save_candidates(cands):
-    path = os.path.join('db','candidates.json')
-    with open(path,'w',encoding='utf-8') as f:
-        json.dump(cands,f,indent=4)
+    uow = current_unit_of_work()
+    if uow:
+        uow.stage('candidates', cands)
+    else:
+        _write_candidates(cands)
+
+def load_jobs():
+    uow = current_unit_of_work()
+    return uow.load('jobs') if uow else _read_jobs()
+
+def load_notifications():
+    uow = current_unit_of_work()
+    return uow.load('notifications') if uow else _read_notifications()
+
+def save_notifications(items):
+    uow = current_unit_of_work()
+    if uow:
+        uow.stage('notifications', items)
+    else:
+        _write_notifications(items)
 
 # Flask-Login setup
 login_manager = LoginManager()
@@ -245,6 +296,9 @@ def manage_hr_team():
     if os.path.exists(notif_path):
         with open(notif_path, 'r', encoding='utf-8') as f:
             notifications = json.load(f)
+    # Settled notifications past retention live in the archive; audit on demand
+    if request.args.get('include_archived') in ['1', 'true', 'yes']:
+        notifications = notification_archive.query_archive() + notifications
 
     view_filter = request.args.get('filter', 'overall')
 
@@ -567,15 +621,105 @@ def manage_candidates():
     view = request.args.get('view', 'table')
     if view not in ['table', 'card']:
         view = 'table'
+    try:
+        status_counts = facet_index.candidate_counts()['facets']['status']
+    except Exception:
+        status_counts = {}
 
     return render_template(
         'manage_candidates.html',
         candidates_list=candidates,
+        status_counts=status_counts,
         view=view,
         is_logged_in=True,
         username=current_user.username
     )
 
+# ---------------- Candidate Search API ----------------
+@app.route('/api/search')
+@login_required
+def api_search():
+    """Ranked full-text search over candidate profiles and interview transcripts.
+    Query params:
+      q=text (last term is matched as a prefix)
+      limit=int (default 20, max 100)
+    """
+    query = (request.args.get('q') or '').strip()
+    limit = max(1, min(request.args.get('limit', 20, type=int) or 20, 100))
+    results = search_index.search(query, limit=limit) if query else []
+    return jsonify({'query': query, 'count': len(results), 'results': results})
+
+@app.route('/api/search/suggest')
+@login_required
+def api_search_suggest():
+    """Prefix autocomplete over indexed terms.
+    Query params:
+      q=prefix
+      limit=int (default 10, max 50)
+    """
+    prefix = (request.args.get('q') or '').strip()
+    limit = max(1, min(request.args.get('limit', 10, type=int) or 10, 50))
+    suggestions = search_index.autocomplete(prefix, limit=limit) if prefix else []
+    return jsonify({'query': prefix, 'suggestions': suggestions})
+
+# ---------------- Facet Counts API ----------------
+@app.route('/api/facets')
+@login_required
+def api_facets():
+    """Counts per facet value for candidate or job filter UIs.
+    Query params:
+      entity=candidates|jobs (default candidates)
+      <facet>=value (repeatable or comma separated; values OR-ed, facets AND-ed)
+        candidates: status, department, job, seniority_level, match_score_band
+        jobs: status, department, seniority_level, job_type
+    """
+    entity = request.args.get('entity', 'candidates')
+    if entity not in ['candidates', 'jobs']:
+        return jsonify({'error': 'entity must be candidates or jobs'}), 400
+    index = facet_index.jobs if entity == 'jobs' else facet_index.candidates
+    filters = {}
+    for facet in index.facets:
+        values = [v.strip() for raw in request.args.getlist(facet) for v in raw.split(',') if v.strip()]
+        if values:
+            filters[facet] = values
+    counts = facet_index.job_counts(filters) if entity == 'jobs' else facet_index.candidate_counts(filters)
+    return jsonify({'entity': entity, 'filters': filters, **counts})
+
+# ---------------- Streaming Exports ----------------
+@app.route('/export/<entity>.<fmt>')
+@login_required
+def export_data(entity, fmt):
+    """Stream candidates or jobs as CSV / XLSX without materialising the whole file.
+    Path: /export/candidates.csv, /export/jobs.xlsx, ...
+    Query params:
+      fields=a,b,c (column projection; defaults to the standard columns)
+      status=..., department=... (comma separated)
+      candidates only: job_id=..., min_score=float, max_score=float
+    """
+    if entity not in ['candidates', 'jobs']:
+        return jsonify({'error': 'entity must be candidates or jobs'}), 404
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be csv or xlsx'}), 404
+    filters = {
+        'status': request.args.getlist('status'),
+        'department': request.args.getlist('department'),
+    }
+    if entity == 'candidates':
+        columns = resolve_columns(request.args.get('fields'), CANDIDATE_COLUMNS)
+        filters['job_id'] = request.args.getlist('job_id')
+        filters['min_score'] = request.args.get('min_score', type=float)
+        filters['max_score'] = request.args.get('max_score', type=float)
+        rows = iter_candidate_rows(columns, filters)
+    else:
+        columns = resolve_columns(request.args.get('fields'), JOB_COLUMNS)
+        rows = iter_job_rows(columns, filters)
+    filename = f"{entity}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(export_stream(fmt, columns, rows, sheet_name=entity.title())),
+        mimetype=EXPORT_FORMATS[fmt]['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
 @app.route('/job_details/<job_id>')
 @login_required
 def job_details(job_id):
@@ -788,20 +932,16 @@ def milestones_breakup(label):
             c.setdefault('department', job.get('department', 'Unknown'))
             c.setdefault('job_title', job.get('job_title', ''))
 
-    # Basic totals
-    total_applicants = len(candidates)
-    total_hired = sum(1 for c in candidates if str(c.get('status', '')).lower() == 'hired')
-    success_rate = int((total_hired / total_applicants) * 100) if total_applicants else 0
-
-    # Department aggregations
+    # Basic totals and department aggregations from the facet index
     from collections import defaultdict
-    dept_applicants = defaultdict(int)
-    dept_hired = defaultdict(int)
-    for c in candidates:
-        dept = c.get('department') or 'Unknown'
-        dept_applicants[dept] += 1
-        if str(c.get('status', '')).lower() == 'hired':
-            dept_hired[dept] += 1
+    overall = facet_index.candidate_counts()
+    hired_statuses = [s for s in overall['facets']['status'] if s.lower() == 'hired']
+    hired = facet_index.candidate_counts({'status': hired_statuses}) if hired_statuses else {'total': 0, 'facets': {'department': {}}}
+    total_applicants = overall['total']
+    total_hired = hired['total']
+    success_rate = int((total_hired / total_applicants) * 100) if total_applicants else 0
+    dept_applicants = defaultdict(int, overall['facets']['department'])
+    dept_hired = defaultdict(int, hired['facets']['department'])
 
     # For hiring_success_rate: success percentage per dept (avoid division by zero)
     dept_labels = sorted(dept_applicants.keys())
@@ -1031,6 +1171,104 @@ def candidate_profile_link(candidate_id):
 
 
 # ---------------- Candidate Status Update Route ----------------
+# ---------------- Status Transition Helpers ----------------
+# Legacy intermediate statuses normalized on read/write
+LEGACY_STATUS_MAP = {
+    'Approved': 'Selected',
+    'Dept Approved': 'Selected'
+}
+
+STATUS_DATE_FIELDS = {
+    'Shortlisted': 'shortlisted_date',
+    'Interview Scheduled': 'interview_scheduled_date',
+    'Interviewed': 'interviewed_date',
+    'Selected': 'selected_date',
+    'Hired': 'hired_date',
+    'Onboarding': 'onboarding_date',
+}
+
+def normalize_status(status):
+    return LEGACY_STATUS_MAP.get(status, status)
+
+def approval_target_status(role, action, prev_status):
+    """Status an approve/reject decision by `role` moves a candidate to (prev_status if none applies)"""
+    rlow = (role or '').lower()
+    if action == 'reject':
+        return 'Rejected'
+    if action == 'approve':
+        if any(k in rlow for k in ['hr','discipline manager','discipline']) and prev_status in ['New','Applied','Application Submitted','Pending','Review','', None]:
+            return 'Shortlisted'
+        if 'department manager' in rlow and prev_status in ['Shortlisted','Pending Dept Selection']:
+            return 'Selected'
+        if 'operation manager' in rlow and prev_status in ['Selected','Pending Operations Hire']:
+            return 'Hired'
+    return prev_status
+
+def apply_status_change(candidate, prev_status, new_status, actor, actor_role, update_type, now_iso=None):
+    """Set the new status on a candidate in memory, with audit fields, milestone dates and history"""
+    now_iso = now_iso or datetime.datetime.now(datetime.timezone.utc).isoformat()
+    candidate['previous_status'] = prev_status
+    candidate['status'] = new_status
+    candidate['status_updated_by'] = actor
+    candidate['status_updated_by_role'] = actor_role
+    candidate['status_updated_at'] = now_iso
+    df = STATUS_DATE_FIELDS.get(new_status)
+    if df and not candidate.get(df):
+        candidate[df] = now_iso.split('T')[0]
+    # timeline / progress helpers
+    if new_status == 'Hired' and not candidate.get('onboarding_status'):
+        candidate['onboarding_status'] = 'Pending'
+    if new_status == 'Onboarding':
+        candidate['onboarding_status'] = 'In Progress'
+    if new_status == 'Probation':
+        candidate['probation_status'] = 'In Progress'
+    candidate.setdefault('status_history', []).append({
+        'from_status': prev_status,
+        'to_status': new_status,
+        'updated_by': actor,
+        'updated_by_role': actor_role,
+        'updated_at': now_iso,
+        'update_type': update_type
+    })
+    schedule_candidate_reminder(candidate)
+    emit_status_changed(candidate)
+
+def emit_change(event_type, **data):
+    """Publish a change event once the current unit of work has committed (immediately outside one)"""
+    uow = current_unit_of_work()
+    if uow:
+        uow.after_commit(lambda: change_events.publish(event_type, **data))
+        return
+    change_events.publish(event_type, **data)
+
+def emit_status_changed(candidate):
+    last = (candidate.get('status_history') or [{}])[-1]
+    emit_change(
+        CANDIDATE_STATUS_CHANGED,
+        candidate_id=candidate.get('id'),
+        candidate_name=candidate.get('name'),
+        status=candidate.get('status'),
+        previous_status=candidate.get('previous_status'),
+        updated_by=candidate.get('status_updated_by'),
+        updated_at=candidate.get('status_updated_at'),
+        update_type=last.get('update_type'),
+    )
+
+def resolve_related_notifications(notes, candidate_id, role, action, actor, now_iso):
+    """Close open notifications for a candidate addressed to `role` after an approve/reject decision.
+    Returns the notifications that changed."""
+    changed = []
+    for n in notes:
+        if str(n.get('candidate_id')) == str(candidate_id) and n.get('status') not in ['Approved','Rejected'] and (n.get('for_role') == role or role.startswith(n.get('for_role','')) or n.get('for_role','').startswith(role)):
+            n['status'] = 'Approved' if action == 'approve' else 'Rejected'
+            n['approved_by'] = actor
+            n['approved_at'] = now_iso
+            changed.append(n)
+    if changed:
+        stamp_notifications(changed)
+        publish_notification_updates(changed)
+    return changed
+
 @app.route('/update_candidate_status', methods=['POST'])
 @login_required
 def update_candidate_status():
@@ -1039,99 +1277,129 @@ def update_candidate_status():
     if not candidate_id or not new_status:
         flash('Missing candidate or status.', 'danger')
         return redirect(request.referrer or url_for('index'))
-    candidates_path = os.path.join('db', 'candidates.json')
+    # The outcome is flashed only after the commit so a failed write never reports success
+    outcome = ('Candidate not found.', 'danger')
     try:
-        with open(candidates_path, 'r', encoding='utf-8') as f:
-            candidates = json.load(f)
-    except Exception:
-        candidates = []
-    changed = False
-    now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    # Preload jobs for department enrichment
-    jobs = []
-    jobs_path = os.path.join('db', 'jobs.json')
-    if os.path.exists(jobs_path):
-        try:
-            with open(jobs_path, 'r', encoding='utf-8') as jf:
-                jobs = json.load(jf)
-        except Exception:
-            jobs = []
-    job_by_id = {str(j.get('job_id')): j for j in jobs}
-
-    for c in candidates:
-        if str(c.get('id')) == str(candidate_id):
-            prev = c.get('status')
-            # Normalize legacy intermediate statuses
-            legacy_map = {
-                'Approved': 'Selected',
-                'Dept Approved': 'Selected'
-            }
-            if new_status in legacy_map:
-                new_status = legacy_map[new_status]
-            if prev in legacy_map:
-                prev = legacy_map[prev]
-            if prev == new_status:
-                flash('Status unchanged.', 'info')
-                break
-            # Enrich candidate with department from job if missing
-            if not c.get('department'):
-                job = job_by_id.get(str(c.get('job_id')))
-                if job:
-                    c['department'] = job.get('department')
-            c['previous_status'] = prev
-            c['status'] = new_status
-            c['status_updated_by'] = current_user.username
-            c['status_updated_by_role'] = 'User'
-            c['status_updated_at'] = now_iso
-            # date field mapping
-            status_date_fields = {
-                'Shortlisted': 'shortlisted_date',
-                'Interview Scheduled': 'interview_scheduled_date',
-                'Interviewed': 'interviewed_date',
-                'Selected': 'selected_date',
-                'Hired': 'hired_date',
-                'Onboarding': 'onboarding_date',
-            }
-            df = status_date_fields.get(new_status)
-            if df and not c.get(df):
-                c[df] = now_iso.split('T')[0]
-            # timeline / progress helpers
-            if new_status == 'Hired' and not c.get('onboarding_status'):
-                c['onboarding_status'] = 'Pending'
-            if new_status == 'Onboarding':
-                c['onboarding_status'] = 'In Progress'
-            if new_status == 'Probation':
-                c['probation_status'] = 'In Progress'
-            # append history
-            hist_entry = {
-                'from_status': prev,
-                'to_status': new_status,
-                'updated_by': current_user.username,
-                'updated_by_role': 'User',
-                'updated_at': now_iso,
-                'update_type': 'manual_status_update'
-            }
-            c.setdefault('status_history', []).append(hist_entry)
-            changed = True
-            # --- Notification workflow triggers ---
-            try:
-                process_notifications_for_status_change(c, prev, new_status, current_user.username)
-            except Exception as e:
-                # Non-fatal
-                print('Notification workflow error:', e)
-            flash(f'Status updated to {new_status}.', 'success')
-            break
-    if changed:
-        try:
-            with open(candidates_path, 'w', encoding='utf-8') as f:
-                json.dump(candidates, f, indent=4)
-        except Exception as e:
-            flash(f'Error saving status: {e}', 'danger')
-    else:
-        if not any(str(c.get('id')) == str(candidate_id) for c in candidates):
-            flash('Candidate not found.', 'danger')
+        with store_transaction():
+            candidates = load_candidates()
+            now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            # Preload jobs for department enrichment
+            job_by_id = {str(j.get('job_id')): j for j in load_jobs()}
+
+            for c in candidates:
+                if str(c.get('id')) == str(candidate_id):
+                    prev = normalize_status(c.get('status'))
+                    new_status = normalize_status(new_status)
+                    if prev == new_status:
+                        outcome = ('Status unchanged.', 'info')
+                        break
+                    # Enrich candidate with department from job if missing
+                    if not c.get('department'):
+                        job = job_by_id.get(str(c.get('job_id')))
+                        if job:
+                            c['department'] = job.get('department')
+                    apply_status_change(c, prev, new_status, current_user.username, 'User', 'manual_status_update', now_iso)
+                    # --- Notification workflow triggers ---
+                    try:
+                        process_notifications_for_status_change(c, prev, new_status, current_user.username, job_by_id=job_by_id)
+                    except Exception as e:
+                        # Non-fatal
+                        print('Notification workflow error:', e)
+                    save_candidates(candidates)
+                    outcome = (f'Status updated to {new_status}.', 'success')
+                    break
+    except Exception as e:
+        outcome = (f'Error saving status: {e}', 'danger')
+    flash(*outcome)
     return redirect(url_for('candidate_profile', candidate_id=candidate_id))
 
+@app.route('/api/candidates/bulk_status', methods=['POST'])
+@login_required
+def api_bulk_candidate_status():
+    """Approve, reject or move many candidates at once.
+    JSON body:
+      candidate_ids: [id, ...]
+      action: approve|reject|move
+      new_status: target status (required for move)
+    All transitions and notifications are applied in memory; candidates.json and
+    notifications.json are each written once. Returns a result per candidate.
+    """
+    payload = request.get_json(silent=True) or request.form.to_dict(flat=False)
+    action = payload.get('action')
+    if isinstance(action, list):
+        action = action[0] if action else None
+    new_status = payload.get('new_status')
+    if isinstance(new_status, list):
+        new_status = new_status[0] if new_status else None
+    ids = payload.get('candidate_ids') or []
+    if isinstance(ids, (str, int)):
+        ids = [ids]
+    ids = [str(i).strip() for raw in ids for i in str(raw).split(',') if str(i).strip()]
+    if action not in ['approve', 'reject', 'move']:
+        return jsonify({'error': 'action must be approve, reject or move'}), 400
+    if action == 'move' and not new_status:
+        return jsonify({'error': 'new_status is required for move'}), 400
+    if not ids:
+        return jsonify({'error': 'candidate_ids is required'}), 400
+
+    actor = current_user.username
+    role = get_user_role(actor)
+    now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    created = []
+    results = []
+    try:
+        with store_transaction():
+            candidates = load_candidates()
+            by_id = {str(c.get('id')): c for c in candidates}
+            job_by_id = {str(j.get('job_id')): j for j in load_jobs()}
+            notes = load_notifications()
+            notes_changed = False
+            for cid in dict.fromkeys(ids):
+                c = by_id.get(cid)
+                if not c:
+                    results.append({'candidate_id': cid, 'ok': False, 'error': 'Candidate not found'})
+                    continue
+                prev = normalize_status(c.get('status'))
+                if action == 'move':
+                    target = normalize_status(new_status)
+                    update_type, actor_role = 'bulk_status_update', 'User'
+                else:
+                    target = approval_target_status(role, action, prev)
+                    update_type, actor_role = 'approval_decision', role
+                if target == prev:
+                    error = 'Status unchanged' if action != 'approve' else f'No approval step for {role} from status {prev}'
+                    results.append({'candidate_id': c.get('id'), 'ok': False, 'status': prev, 'error': error})
+                    continue
+                if not c.get('department'):
+                    job = job_by_id.get(str(c.get('job_id')))
+                    if job:
+                        c['department'] = job.get('department')
+                apply_status_change(c, prev, target, actor, actor_role, update_type, now_iso)
+                try:
+                    created.extend(process_notifications_for_status_change(c, prev, target, actor, notes=notes, job_by_id=job_by_id))
+                except Exception as e:
+                    print('Bulk notification workflow error:', e)
+                if action in ['approve', 'reject'] and resolve_related_notifications(notes, c.get('id'), role, action, actor, now_iso):
+                    notes_changed = True
+                results.append({'candidate_id': c.get('id'), 'ok': True, 'previous_status': prev, 'status': target})
+
+            updated = sum(1 for r in results if r['ok'])
+            if updated:
+                save_candidates(candidates)
+            if created or notes_changed:
+                save_notifications(notes)
+                dispatch_notifications(created)
+    except Exception as e:
+        # Raised by the commit as well as by the updates; staged changes are discarded
+        return jsonify({'error': f'Error saving candidates: {e}', 'results': results}), 500
+    return jsonify({
+        'action': action,
+        'updated': updated,
+        'failed': len(results) - updated,
+        'notifications_created': len(created),
+        'results': results
+    })
+
 
 # ---------------- Notification Helpers ----------------
 def normalize_dept(s: str):
@@ -1167,24 +1435,22 @@ def get_user_role(username: str):
     rec = users_data.get(username)
     return rec.get('role') if rec else 'User'
 
-def load_notifications():
-    path = os.path.join('db', 'notifications.json')
-    if not os.path.exists(path):
-        return []
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return []
-
-def save_notifications(items):
-    path = os.path.join('db', 'notifications.json')
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(items, f, indent=4)
-
-def add_notification(candidate, notif_type, for_role, message, from_user, status='Pending', priority='normal', action_required=False):
-    notes = load_notifications()
-    new_id = (max([n.get('id', 0) for n in notes]) + 1) if notes else 1
+def stamp_notifications(changed):
+    """Give inserted / changed notifications the next change sequence numbers"""
+    if not changed:
+        return
+    seq = notification_store.allocate_seq(len(changed))
+    for n in changed:
+        n['seq'] = seq
+        seq += 1
+
+def add_notification(candidate, notif_type, for_role, message, from_user, status='Pending', priority='normal', action_required=False, notes=None):
+    """Create a notification. When `notes` is given it is only appended to that list;
+    the caller saves the list and delivers the new items with dispatch_notifications()."""
+    staged = notes is not None
+    if not staged:
+        notes = load_notifications()
+    new_id = notification_store.allocate_id()
     # Resolve a single receiver (optional)
     receiver_username = None
     receiver_user_id = None
@@ -1193,7 +1459,7 @@ def add_notification(candidate, notif_type, for_role, message, from_user, status
         if dm_user:
             receiver_username = dm_user[0]
             receiver_user_id = dm_user[1].get('id')
-    notes.append({
+    notif = {
         'id': new_id,
         'candidate_id': candidate.get('id'),
         'candidate_name': candidate.get('name'),
@@ -1206,32 +1472,64 @@ def add_notification(candidate, notif_type, for_role, message, from_user, status
         'from_role': get_user_role(from_user),
         'from_user': from_user,
         'message': message,
-    'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
         'created_by': from_user,
         'priority': priority,
         'action_required': action_required,
         'notification_type': 'pop_up'
-    })
+    }
+    notes.append(notif)
+    stamp_notifications([notif])
+    if staged:
+        return notif
     save_notifications(notes)
-    # Fire-and-forget Teams integration
-    try:
-        send_teams_notification(notes[-1])
-    except Exception as _e:
-        pass
-    try:
-        print(f"[NOTIF] Created id={new_id} type={notif_type} for_role={for_role} receiver={receiver_username}")
-    except Exception:
-        pass
+    dispatch_notifications([notif])
+    return notif
+
+def dispatch_notifications(items):
+    """Deliver already-saved notifications to external channels (after commit inside a unit of work)"""
+    uow = current_unit_of_work()
+    if uow:
+        items = list(items)
+        uow.after_commit(lambda: _deliver_notifications(items))
+        return
+    _deliver_notifications(items)
+
+def publish_notification_updates(items):
+    """Push status changes of existing notifications to open streams (after commit inside a unit of work)"""
+    items = [dict(n) for n in items]
+    uow = current_unit_of_work()
+    if uow:
+        uow.after_commit(lambda: [notification_broker.publish('notification_updated', n) for n in items])
+        return
+    for n in items:
+        notification_broker.publish('notification_updated', n)
 
-def process_notifications_for_status_change(candidate, prev_status, new_status, actor_username):
+def _deliver_notifications(items):
+    for notif in items:
+        notification_broker.publish('notification', notif)
+        # Fire-and-forget Teams integration
+        try:
+            send_teams_notification(notif)
+        except Exception as _e:
+            pass
+        try:
+            print(f"[NOTIF] Created id={notif.get('id')} type={notif.get('type')} for_role={notif.get('for_role')} receiver={notif.get('receiver_username')}")
+        except Exception:
+            pass
+
+def process_notifications_for_status_change(candidate, prev_status, new_status, actor_username, notes=None, job_by_id=None):
+    """Create the workflow notifications for a status change and return them.
+    Pass `notes` / `job_by_id` to stage notifications in memory (see add_notification)."""
+    created = []
     # Determine job department via candidate (may already have department populated)
     job_department = candidate.get('department') or ''
     if not job_department:
         # attempt enrichment from jobs.json
         try:
-            with open(os.path.join('db','jobs.json'), 'r', encoding='utf-8') as jf:
-                jobs = json.load(jf)
-            job = next((j for j in jobs if str(j.get('job_id')) == str(candidate.get('job_id'))), None)
+            if job_by_id is None:
+                job_by_id = {str(j.get('job_id')): j for j in load_jobs()}
+            job = job_by_id.get(str(candidate.get('job_id')))
             if job:
                 job_department = job.get('department','')
                 candidate['department'] = job_department
@@ -1241,29 +1539,31 @@ def process_notifications_for_status_change(candidate, prev_status, new_status,
     cname = candidate.get('name')
     # HR Shortlists -> notify Department Manager for selection decision
     if new_status == 'Shortlisted' and prev_status != 'Shortlisted':
-        add_notification(
+        created.append(add_notification(
             candidate,
             'shortlist_for_approval',
             dept_manager_role,
         f'HR SHORTLISTED: Candidate {cname} shortlisted. Department Manager to SELECT.',
             actor_username,
             action_required=True,
-            priority='high'
-        )
+            priority='high',
+            notes=notes
+        ))
     # Department Manager selects -> status Selected -> notify Operations Manager for hire
     if new_status == 'Selected' and prev_status != 'Selected':
-        add_notification(
+        created.append(add_notification(
             candidate,
             'candidate_selected',
             'Operation Manager',
         f'DEPT SELECTED: {cname} selected by Department. Operations Manager to HIRE.',
             actor_username,
             action_required=True,
-            priority='high'
-        )
+            priority='high',
+            notes=notes
+        ))
     # Hired -> final approval complete -> notify HR and Dept Manager
     if new_status == 'Hired' and prev_status != 'Hired':
-        add_notification(
+        created.append(add_notification(
             candidate,
             'final_approval_complete',
             'HR',
@@ -1271,9 +1571,10 @@ def process_notifications_for_status_change(candidate, prev_status, new_status,
             actor_username,
             status='Approved',
             action_required=False,
-            priority='high'
-        )
-        add_notification(
+            priority='high',
+            notes=notes
+        ))
+        created.append(add_notification(
             candidate,
             'final_approval_complete',
             dept_manager_role,
@@ -1281,14 +1582,15 @@ def process_notifications_for_status_change(candidate, prev_status, new_status,
             actor_username,
             status='Approved',
             action_required=False,
-            priority='normal'
-        )
+            priority='normal',
+            notes=notes
+        ))
         # Notify all Discipline Managers (same department) as well
         try:
             for uname, u in users_data.items():
                 if (u.get('role','').lower() == 'discipline manager' and
                     (u.get('department') or '').lower() == (candidate.get('department') or '').lower()):
-                    add_notification(
+                    created.append(add_notification(
                         candidate,
                         'final_approval_complete',
                         u.get('role'),
@@ -1296,20 +1598,27 @@ def process_notifications_for_status_change(candidate, prev_status, new_status,
                         actor_username,
                         status='Approved',
                         action_required=False,
-                        priority='low'
-                    )
+                        priority='low',
+                        notes=notes
+                    ))
         except Exception as e:
             print('Discipline manager notify error:', e)
+    return created
+
+def last_reminder_at(candidate_id, notif_type):
+    """Timestamp of the latest reminder of this type sent for a candidate (or None)"""
+    latest = None
+    for n in notification_store.for_candidate(candidate_id):
+        if n.get('type') == notif_type:
+            ts = parse_iso(n.get('timestamp',''))
+            if ts and (latest is None or ts > latest):
+                latest = ts
+    return latest
 
 def recent_reminder_exists(candidate_id, notif_type, hours=REMINDER_REPEAT_HOURS):
-    notes = load_notifications()
+    last = last_reminder_at(candidate_id, notif_type)
     cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=hours)
-    for n in notes:
-        if n.get('candidate_id') == candidate_id and n.get('type') == notif_type:
-            ts = parse_iso(n.get('timestamp',''))
-            if ts and ts > cutoff:
-                return True
-    return False
+    return bool(last and last > cutoff)
 
 def escalate_pending(candidate, pending_status, notif_type, for_role, message):
     prev = candidate.get('status')
@@ -1332,34 +1641,113 @@ def escalate_pending(candidate, pending_status, notif_type, for_role, message):
     add_notification(candidate, notif_type, for_role, message, 'system', action_required=True, priority='high')
     return True
 
-def check_pending_reminders():
+# Statuses that escalate to a pending stage when left untouched:
+# status -> (pending status, reminder notification type)
+REMINDER_STAGES = {
+    'Shortlisted': ('Pending Dept Selection', 'reminder_pending_dept_selection'),
+    'Selected': ('Pending Operations Hire', 'reminder_pending_operations_hire'),
+}
+# Full re-read of candidates.json to catch status edits made outside the app's write paths
+REMINDER_RESYNC_SECONDS = 3600
+_REMINDER_RESYNC_KEY = '__resync__'
+# Notification retention runs on the same scheduler (first run shortly after start, then daily)
+ARCHIVE_INTERVAL_SECONDS = 24 * 3600
+ARCHIVE_FIRST_RUN_SECONDS = 300
+_ARCHIVE_KEY = '__archive__'
+# Roles (base role, lowercase) allowed to run the retention policy on demand
+ARCHIVE_ADMIN_ROLES = {'admin', 'ceo', 'hr manager'}
+# Shortest retention an on-demand run may use without force=1
+MIN_MANUAL_RETENTION_DAYS = 7
+# Archived notifications keep their ids / seqs reserved across restarts
+notification_store.raise_high_water(*notification_archive.read_high_water())
+
+def last_status_change(candidate):
+    """When the candidate entered its current status"""
+    status = candidate.get('status')
+    for ev in reversed(candidate.get('status_history', [])):
+        if ev.get('to_status') == status:
+            ts = parse_iso(ev.get('updated_at'))
+            if ts:
+                return ts
+    return parse_iso(candidate.get('status_updated_at','')) or datetime.datetime.now(datetime.timezone.utc)
+
+def schedule_candidate_reminder(candidate):
+    """(Re)schedule or cancel the pending-stage reminder of a candidate after a status change"""
+    cid = candidate.get('id')
+    if cid is None:
+        return
+    if candidate.get('status') not in REMINDER_STAGES:
+        reminder_scheduler.cancel(cid)
+        return
+    due = last_status_change(candidate) + datetime.timedelta(hours=REMINDER_THRESHOLD_HOURS)
+    reminder_scheduler.schedule(cid, due.timestamp())
+
+def rebuild_reminder_schedule():
+    for c in load_candidates():
+        schedule_candidate_reminder(c)
+    reminder_scheduler.schedule(_REMINDER_RESYNC_KEY, time.time() + REMINDER_RESYNC_SECONDS)
+
+def fire_candidate_reminder(candidate_id):
+    """Scheduler callback: escalate a candidate whose reminder window opened"""
+    if candidate_id == _REMINDER_RESYNC_KEY:
+        rebuild_reminder_schedule()
+        return
+    if candidate_id == _ARCHIVE_KEY:
+        reminder_scheduler.schedule(_ARCHIVE_KEY, time.time() + ARCHIVE_INTERVAL_SECONDS)
+        run_notification_archival()
+        return
+    with store_lock:
+        _escalate_if_due(candidate_id)
+
+def _escalate_if_due(candidate_id):
     candidates = load_candidates()
-    changed = False
+    c = next((x for x in candidates if x.get('id') == candidate_id), None)
+    if not c or c.get('status') not in REMINDER_STAGES:
+        return
     now = datetime.datetime.now(datetime.timezone.utc)
-    for c in candidates:
-        status = c.get('status')
-        # Determine last change time for current status
-        last_change = None
-        for ev in reversed(c.get('status_history', [])):
-            if ev.get('to_status') == status:
-                last_change = parse_iso(ev.get('updated_at'))
-                if last_change:
-                    break
-        if not last_change:
-            last_change = parse_iso(c.get('status_updated_at','')) or now
-        hours_in_state = (now - last_change).total_seconds()/3600 if last_change else 0
-        # Shortlisted waiting on Department Manager
-        if status in ['Shortlisted','Pending Dept Selection'] and hours_in_state >= REMINDER_THRESHOLD_HOURS:
-            if not recent_reminder_exists(c.get('id'), 'reminder_pending_dept_selection'):
-                if escalate_pending(c, 'Pending Dept Selection', 'reminder_pending_dept_selection', find_department_manager_role(c.get('department','') or ''), f"REMINDER: Candidate {c.get('name')} awaiting Department Manager selection."):
-                    changed = True
-        # Selected waiting on Operations Manager
-        if status in ['Selected','Pending Operations Hire'] and hours_in_state >= REMINDER_THRESHOLD_HOURS:
-            if not recent_reminder_exists(c.get('id'), 'reminder_pending_operations_hire'):
-                if escalate_pending(c, 'Pending Operations Hire', 'reminder_pending_operations_hire', 'Operation Manager', f"REMINDER: Candidate {c.get('name')} awaiting Operations Manager hire decision."):
-                    changed = True
-    if changed:
+    due = last_status_change(c) + datetime.timedelta(hours=REMINDER_THRESHOLD_HOURS)
+    pending_status, notif_type = REMINDER_STAGES[c.get('status')]
+    last = last_reminder_at(candidate_id, notif_type)
+    if last:
+        due = max(due, last + datetime.timedelta(hours=REMINDER_REPEAT_HOURS))
+    if due > now:
+        reminder_scheduler.schedule(candidate_id, due.timestamp())
+        return
+    if pending_status == 'Pending Dept Selection':
+        for_role = find_department_manager_role(c.get('department','') or '')
+        message = f"REMINDER: Candidate {c.get('name')} awaiting Department Manager selection."
+    else:
+        for_role = 'Operation Manager'
+        message = f"REMINDER: Candidate {c.get('name')} awaiting Operations Manager hire decision."
+    if escalate_pending(c, pending_status, notif_type, for_role, message):
         save_candidates(candidates)
+        emit_status_changed(c)
+
+def run_notification_archival(retention_days=None):
+    """Move settled notifications past retention into monthly archive segments"""
+    with store_lock:
+        result = notification_archive.archive_notifications(
+            _read_notifications, _write_notifications,
+            retention_days=notification_archive.RETENTION_DAYS if retention_days is None else retention_days)
+    if result['archived']:
+        notification_store.raise_high_water(*notification_archive.read_high_water())
+        print(f"[NOTIF] Archived {result['archived']} notifications into {', '.join(result['segments'])}; {result['kept']} kept")
+    return result
+
+reminder_scheduler = DueTimeScheduler(fire_candidate_reminder, name='reminder-scheduler')
+
+@app.before_request
+def ensure_reminder_scheduler():
+    # Started lazily so only the process that serves requests runs it (not the reloader parent)
+    if not reminder_scheduler.running and reminder_scheduler.start():
+        try:
+            rebuild_reminder_schedule()
+        except Exception as e:
+            print('Reminder schedule build error:', e)
+        reminder_scheduler.schedule(_ARCHIVE_KEY, time.time() + ARCHIVE_FIRST_RUN_SECONDS)
+    # Resume delivery of Teams cards persisted before a restart
+    if TEAMS_WEBHOOK_URL and not teams_outbox.running and teams_outbox.stats()['pending']:
+        teams_outbox.start()
 
 
 # ---------------- Notification API Endpoints ----------------
@@ -1370,177 +1758,290 @@ def api_get_notifications():
     Query params:
       status=All|Unread (default Unread)
       limit=int (optional)
+      since=seq (optional) only items inserted or changed after this cursor; items that
+            are no longer unread come back under 'updated' so clients can drop them
+    Responses carry the current 'cursor' and an ETag; If-None-Match gives 304 when
+    nothing changed.
     """
-    try:
-        check_pending_reminders()
-    except Exception as e:
-        print('Reminder check error (poll):', e)
     role = request.cookies.get('role') or get_user_role(current_user.username)
     status_filter = request.args.get('status', 'Unread')
     limit = request.args.get('limit', type=int)
-    all_notifs = load_notifications()
-    def base_role(r):
-        return (r or '').split('(')[0].strip().lower()
-    role_base = base_role(role)
-    filtered = []
-    auto_updated = False
-    for n in all_notifs:
-        fr = (n.get('for_role') or '')
-        if (fr == role or role.startswith(fr) or fr.startswith(role) or
-            base_role(fr) == role_base or n.get('receiver_username') == current_user.username):
-            filtered.append(n)
-    if status_filter != 'All':
-        # Show only unread / pending action notifications. Final approval only if not yet read.
-        new_list = []
-        for n in filtered:
-            st = n.get('status','Pending')
-            if n.get('type') == 'final_approval_complete':
-                if st not in ['Read','read']:
-                    # auto mark read so it displays only once
-                    if st in ['Approved'] and not n.get('read_at'):
-                        n['status'] = 'Read'
-                        n['read_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-                        auto_updated = True
-                    new_list.append(n)
-            else:
-                if st not in ['Read','read','Approved','Rejected']:
-                    new_list.append(n)
-        filtered = new_list
-    if auto_updated:
-        save_notifications(all_notifs)
+    since = request.args.get('since', type=int)
+    username = current_user.username
+    unread_only = status_filter != 'All'
+    updated = []
+    if since is not None:
+        changed = notification_store.changed_since(since, role, username)
+        filtered = [n for n in changed if not unread_only or is_unread(n)]
+        updated = [n for n in changed if unread_only and not is_unread(n)]
+    else:
+        filtered = notification_store.for_user(role, username, unread_only=unread_only)
+    cursor = notification_store.cursor()
+    # Final approvals are auto marked read so they display only once
+    to_mark = {n['id'] for n in filtered if unread_only and n.get('type') == 'final_approval_complete'
+               and n.get('status') == 'Approved' and not n.get('read_at')}
+    if to_mark:
+        with store_transaction():
+            all_notifs = load_notifications()
+            now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            auto_updated = [n for n in all_notifs if n.get('id') in to_mark]
+            for n in auto_updated:
+                n['status'] = 'Read'
+                n['read_at'] = now_iso
+            stamp_notifications(auto_updated)
+            save_notifications(all_notifs)
+        marked = {n['id']: n for n in auto_updated}
+        filtered = [dict(marked.get(n['id'], n)) for n in filtered]
+        cursor = max([cursor] + [n['seq'] for n in auto_updated])
+    etag = hashlib.sha1(f"{current_user.username}|{role}|{status_filter}|{limit}|{since}|{cursor}".encode('utf-8')).hexdigest()
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+        resp.set_etag(etag)
+        return resp
     # sort newest first
     filtered.sort(key=lambda n: n.get('timestamp',''), reverse=True)
     if limit:
         filtered = filtered[:limit]
-    return jsonify({'role': role, 'count': len(filtered), 'notifications': filtered})
+    body = {'role': role, 'count': len(filtered), 'cursor': cursor, 'notifications': filtered}
+    if since is not None:
+        body['since'] = since
+        body['updated'] = updated
+    resp = jsonify(body)
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
 
 
 @app.route('/api/notifications/<int:notif_id>/mark_read', methods=['POST'])
 @login_required
+@with_unit_of_work
 def api_mark_notification(notif_id):
-    all_notifs = load_notifications()
     role = request.cookies.get('role') or get_user_role(current_user.username)
-    updated = False
-    def base_role(r):
-        return (r or '').split('(')[0].strip().lower()
-    role_base = base_role(role)
+    target = notification_store.get(notif_id)
+    if not target or not notification_matches(target, role, current_user.username):
+        return jsonify({'ok': False, 'error': 'Not found'}), 404
+    all_notifs = load_notifications()
+    updated = None
     for n in all_notifs:
-        fr = (n.get('for_role') or '')
-        if n.get('id') == notif_id and (fr == role or role.startswith(fr) or fr.startswith(role) or base_role(fr)==role_base or n.get('receiver_username') == current_user.username):
+        if n.get('id') == notif_id:
             n['status'] = 'Read'
             n['read_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-            updated = True
+            updated = n
             break
     if updated:
+        stamp_notifications([updated])
         save_notifications(all_notifs)
+        publish_notification_updates([updated])
         return jsonify({'ok': True})
     return jsonify({'ok': False, 'error': 'Not found'}), 404
 
+@app.route('/api/notifications/count')
+@login_required
+def api_notification_count():
+    """Badge counts for the logged-in user: unread notifications and decisions pending."""
+    role = request.cookies.get('role') or get_user_role(current_user.username)
+    counts = notification_store.counts(role, current_user.username)
+    return jsonify({'role': role, 'cursor': notification_store.cursor(), **counts})
+
+def _push_notification_counts(role, username, counts):
+    if username:
+        notification_broker.publish_user(username, 'counts', {'role': role, **counts})
+
+notification_store.on_counts_changed(_push_notification_counts)
+def _push_candidate_status(event):
+    """Candidate status events go to the users the candidate's notifications are routed to and to whoever changed it"""
+    notes = notification_store.for_candidate(event.data.get('candidate_id'))
+    notification_broker.publish_routed(
+        'candidate_status', event.data,
+        for_roles=[n.get('for_role') for n in notes],
+        usernames=[n.get('receiver_username') for n in notes] + [event.data.get('updated_by')])
+
+# Live pages (approvals, candidate profile) patch themselves from candidate status events
+change_events.subscribe(CANDIDATE_STATUS_CHANGED, _push_candidate_status)
+
+@app.route('/api/notifications/stream')
+@login_required
+def api_notification_stream():
+    """Server-Sent Events stream of notifications for the logged-in user.
+    Events:
+      notification          a new notification addressed to the user's role / username
+      notification_updated  an existing notification changed status (read, approved, rejected)
+      counts                unread / pending badge counts (sent on connect and whenever they change)
+      candidate_status      a candidate changed status (broadcast; live approvals / profile pages patch themselves)
+      resync                events were dropped; the client should refetch /api/notifications
+    Event ids are notification seqs, so a reconnect with Last-Event-ID replays missed items.
+    """
+    role = request.cookies.get('role') or get_user_role(current_user.username)
+    sub = notification_broker.subscribe(current_user.username, role)
+    # Event ids are notification seqs; replay what a reconnecting client missed
+    backlog = [{'event': 'counts', 'data': {'role': role, **notification_store.counts(role, current_user.username)}}]
+    last_seq = request.headers.get('Last-Event-ID', type=int)
+    if last_seq is not None:
+        backlog += [
+            {'event': 'notification' if is_unread(n) else 'notification_updated', 'data': n}
+            for n in notification_store.changed_since(last_seq, role, current_user.username)
+        ]
+    return Response(
+        notification_broker.stream(sub, backlog=backlog),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
 @app.route('/api/debug/all_notifications')
 @login_required
 def api_debug_all_notifications():
+    """All notifications in the hot store.
+    Query params:
+      archived=1 also return archived notifications (month=YYYY-MM to read one segment,
+                 candidate_id=... to filter, limit=int)
+    """
     role = request.cookies.get('role') or get_user_role(current_user.username)
-    return jsonify({'current_role': role, 'all': load_notifications()})
+    body = {'current_role': role, 'all': load_notifications()}
+    if request.args.get('archived') in ['1', 'true', 'yes']:
+        candidate_id = request.args.get('candidate_id')
+        predicate = (lambda n: str(n.get('candidate_id')) == candidate_id) if candidate_id else None
+        body['archived'] = notification_archive.query_archive(
+            predicate, month=request.args.get('month'), limit=request.args.get('limit', type=int))
+        body['segments'] = notification_archive.list_segments()
+    return jsonify(body)
+
+@app.route('/api/notifications/archive', methods=['GET', 'POST'])
+@login_required
+def api_notification_archive():
+    """GET: list archive segments. POST (Admin / CEO / HR Manager only): run the retention
+    policy now. Optional retention_days overrides NOTIFICATION_RETENTION_DAYS; values below
+    MIN_MANUAL_RETENTION_DAYS also need force=1."""
+    if request.method == 'POST':
+        if base_role(get_user_role(current_user.username)) not in ARCHIVE_ADMIN_ROLES:
+            return jsonify({'error': 'Only Admin, CEO or HR Manager can run notification archival'}), 403
+        retention_days = request.values.get('retention_days', type=int)
+        if retention_days is not None and retention_days < 0:
+            return jsonify({'error': 'retention_days must be >= 0'}), 400
+        force = request.values.get('force') in ['1', 'true', 'yes']
+        if retention_days is not None and retention_days < MIN_MANUAL_RETENTION_DAYS and not force:
+            return jsonify({'error': f'retention_days below {MIN_MANUAL_RETENTION_DAYS} requires force=1'}), 400
+        return jsonify(run_notification_archival(retention_days))
+    return jsonify({
+        'retention_days': notification_archive.RETENTION_DAYS,
+        'segments': notification_archive.list_segments(),
+        'hot_notifications': notification_store.stats()['notifications'],
+    })
+
+@app.route('/api/debug/teams_outbox')
+@login_required
+def api_debug_teams_outbox():
+    """Teams outbox state (Admin / CEO / HR Manager only): pending / dead-lettered cards, sent count, breaker state per channel."""
+    if base_role(get_user_role(current_user.username)) not in ARCHIVE_ADMIN_ROLES:
+        return jsonify({'error': 'Only Admin, CEO or HR Manager can inspect the Teams outbox'}), 403
+    return jsonify({'enabled': bool(TEAMS_WEBHOOK_URL), **teams_outbox.stats()})
+
+@app.route('/api/debug/change_events')
+@login_required
+def api_debug_change_events():
+    """Change bus subscribers / published counts, data versions, derived structure sizes and the latest logged activities."""
+    return jsonify({
+        'bus': change_events.stats(),
+        'data_versions': {'shared': data_versions.shared, **data_versions.all()},
+        'activity_feed': activity_feed.stats(),
+        'recent_activities': activity_logger.get_recent_activities(limit=request.args.get('limit', 10, type=int)),
+    })
 
 
 # ---------------- Approvals Pages & Actions ----------------
 @app.route('/my_approvals')
 @login_required
 def my_approvals():
-    try:
-        check_pending_reminders()
-    except Exception as e:
-        print('Reminder check error (approvals):', e)
     role = get_user_role(current_user.username)
-    notes = load_notifications()
-    # Load candidates for status reconciliation
-    cand_list = load_candidates()
-    cand_status = {str(c.get('id')): c.get('status') for c in cand_list}
-    auto_changed = False
-    now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    # Auto-complete notifications whose candidate already progressed
-    for n in notes:
-        if not n.get('action_required'):
-            continue
-        if n.get('status') in ['Approved','Rejected']:
-            continue
-        cid = str(n.get('candidate_id'))
-        c_status = cand_status.get(cid)
-        if not c_status:
-            continue
-        t = n.get('type')
-        # Define progression sets
-        if t == 'shortlist_for_approval' and c_status in ['Selected','Hired','Pending Operations Hire']:
-            n['status'] = 'Approved'
-            n['auto_completed_at'] = now_iso
-            if not n.get('approved_by'):
-                n['approved_by'] = 'System'
-            auto_changed = True
-        elif t == 'candidate_selected' and c_status in ['Hired']:
-            n['status'] = 'Approved'
-            n['auto_completed_at'] = now_iso
-            if not n.get('approved_by'):
-                n['approved_by'] = 'System'
-            auto_changed = True
-        elif t.startswith('reminder_pending_'):
-            # If reminder and stage progressed beyond its pending counterpart
-            if t == 'reminder_pending_dept_selection' and c_status in ['Selected','Hired','Pending Operations Hire']:
+    # Reconciliation writes happen under store_lock; filtering and rendering do not
+    with store_transaction():
+        notes = load_notifications()
+        # Load candidates for status reconciliation
+        cand_list = load_candidates()
+        cand_status = {str(c.get('id')): c.get('status') for c in cand_list}
+        auto_changed = []
+        now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        # Auto-complete notifications whose candidate already progressed
+        for n in notes:
+            if not n.get('action_required'):
+                continue
+            if n.get('status') in ['Approved','Rejected']:
+                continue
+            cid = str(n.get('candidate_id'))
+            c_status = cand_status.get(cid)
+            if not c_status:
+                continue
+            t = n.get('type')
+            # Define progression sets
+            if t == 'shortlist_for_approval' and c_status in ['Selected','Hired','Pending Operations Hire']:
                 n['status'] = 'Approved'
                 n['auto_completed_at'] = now_iso
                 if not n.get('approved_by'):
                     n['approved_by'] = 'System'
-                auto_changed = True
-            if t == 'reminder_pending_operations_hire' and c_status in ['Hired']:
+                auto_changed.append(n)
+            elif t == 'candidate_selected' and c_status in ['Hired']:
                 n['status'] = 'Approved'
                 n['auto_completed_at'] = now_iso
                 if not n.get('approved_by'):
                     n['approved_by'] = 'System'
-                auto_changed = True
-    if auto_changed:
-        save_notifications(notes)
-    def base_role(r):
-        return (r or '').split('(')[0].strip().lower()
-    role_base = base_role(role)
-    def matches(n):
-        fr = n.get('for_role','')
-        return (fr == role or role.startswith(fr) or fr.startswith(role) or base_role(fr)==role_base)
-    # Pending approvals: action_required and not final decision (Approved/Rejected)
-    pending = [n for n in notes if matches(n) and n.get('action_required') and n.get('status') not in ['Approved','Rejected']]
-    # Build decision attribution from candidate history
-    history_decisions = {}
-    for c in cand_list:
-        cid = str(c.get('id'))
-        for ev in c.get('status_history', [])[-10:]:  # recent events
-            to_status = ev.get('to_status')
-            if to_status in ['Shortlisted','Selected','Hired','Rejected']:
-                history_decisions.setdefault(cid, []).append({
-                    'status': to_status,
-                    'updated_by': ev.get('updated_by'),
-                    'role': ev.get('updated_by_role'),
-                    'updated_at': ev.get('updated_at')
-                })
-    # Ensure notifications missing approved_by get it from history
-    changed_hist = False
-    for n in notes:
-        if n.get('status') in ['Approved','Rejected'] and not n.get('approved_by'):
-            cid = str(n.get('candidate_id'))
-            decs = history_decisions.get(cid, [])
-            # find matching status mapping
-            target_status = None
-            if n.get('type') == 'shortlist_for_approval':
-                target_status = 'Shortlisted'
-            elif n.get('type') == 'candidate_selected':
-                target_status = 'Selected'
-            elif n.get('type') == 'final_approval_complete':
-                target_status = 'Hired'
-            if target_status:
-                match = next((d for d in reversed(decs) if d['status'] == target_status), None)
-                if match:
-                    n['approved_by'] = match['updated_by'] or 'System'
-                    n['approved_at'] = match['updated_at']
-                    changed_hist = True
-    if changed_hist:
-        save_notifications(notes)
+                auto_changed.append(n)
+            elif t.startswith('reminder_pending_'):
+                # If reminder and stage progressed beyond its pending counterpart
+                if t == 'reminder_pending_dept_selection' and c_status in ['Selected','Hired','Pending Operations Hire']:
+                    n['status'] = 'Approved'
+                    n['auto_completed_at'] = now_iso
+                    if not n.get('approved_by'):
+                        n['approved_by'] = 'System'
+                    auto_changed.append(n)
+                if t == 'reminder_pending_operations_hire' and c_status in ['Hired']:
+                    n['status'] = 'Approved'
+                    n['auto_completed_at'] = now_iso
+                    if not n.get('approved_by'):
+                        n['approved_by'] = 'System'
+                    auto_changed.append(n)
+        if auto_changed:
+            stamp_notifications(auto_changed)
+            publish_notification_updates(auto_changed)
+            save_notifications(notes)
+        role_keys = set(notification_store.role_keys(role))
+        def matches(n):
+            return (n.get('for_role') or '') in role_keys
+        # Pending approvals: action_required and not final decision (Approved/Rejected)
+        pending = [n for n in notes if matches(n) and n.get('action_required') and n.get('status') not in ['Approved','Rejected']]
+        # Build decision attribution from candidate history
+        history_decisions = {}
+        for c in cand_list:
+            cid = str(c.get('id'))
+            for ev in c.get('status_history', [])[-10:]:  # recent events
+                to_status = ev.get('to_status')
+                if to_status in ['Shortlisted','Selected','Hired','Rejected']:
+                    history_decisions.setdefault(cid, []).append({
+                        'status': to_status,
+                        'updated_by': ev.get('updated_by'),
+                        'role': ev.get('updated_by_role'),
+                        'updated_at': ev.get('updated_at')
+                    })
+        # Ensure notifications missing approved_by get it from history
+        changed_hist = False
+        for n in notes:
+            if n.get('status') in ['Approved','Rejected'] and not n.get('approved_by'):
+                cid = str(n.get('candidate_id'))
+                decs = history_decisions.get(cid, [])
+                # find matching status mapping
+                target_status = None
+                if n.get('type') == 'shortlist_for_approval':
+                    target_status = 'Shortlisted'
+                elif n.get('type') == 'candidate_selected':
+                    target_status = 'Selected'
+                elif n.get('type') == 'final_approval_complete':
+                    target_status = 'Hired'
+                if target_status:
+                    match = next((d for d in reversed(decs) if d['status'] == target_status), None)
+                    if match:
+                        n['approved_by'] = match['updated_by'] or 'System'
+                        n['approved_at'] = match['updated_at']
+                        changed_hist = True
+        if changed_hist:
+            save_notifications(notes)
     my_completed = [n for n in notes if matches(n) and n.get('status') in ['Approved','Rejected'] and n.get('approved_by') == current_user.username]
     other_completed = [n for n in notes if matches(n) and n.get('status') in ['Approved','Rejected'] and n.get('approved_by') != current_user.username]
     # Include informational final hire notifications (even if no approved_by) in other_completed
@@ -1671,11 +2172,14 @@ def my_approvals():
     # sort aggregated list
     my_timeline_decisions.sort(key=lambda x: x.get('last_time') or '', reverse=True)
     approved_count = len(my_timeline_decisions)
-    return render_template('my_approvals.html', role=role, pending_approvals=pending, completed_approvals=my_completed, other_completed_approvals=other_completed, my_timeline_decisions=my_timeline_decisions, approved_count=approved_count, is_logged_in=True, username=current_user.username)
+    # ?fragment=1: only the live sections, re-fetched by the page when a pushed event concerns it
+    template = '_my_approvals_live.html' if request.args.get('fragment') else 'my_approvals.html'
+    return render_template(template, role=role, pending_approvals=pending, completed_approvals=my_completed, other_completed_approvals=other_completed, my_timeline_decisions=my_timeline_decisions, approved_count=approved_count, is_logged_in=True, username=current_user.username)
 
 
 @app.route('/approve_candidate', methods=['POST'])
 @login_required
+@with_unit_of_work
 def approve_candidate():
     role = get_user_role(current_user.username)
     candidate_id = request.form.get('candidate_id')
@@ -1683,76 +2187,30 @@ def approve_candidate():
     if not candidate_id or action not in ['approve','reject']:
         flash('Invalid approval request', 'danger')
         return redirect(url_for('my_approvals'))
-    # load candidates
-    cand_path = os.path.join('db','candidates.json')
-    try:
-        with open(cand_path,'r',encoding='utf-8') as f:
-            candidates = json.load(f)
-    except Exception:
-        candidates = []
+    candidates = load_candidates()
     candidate = next((c for c in candidates if str(c.get('id')) == str(candidate_id)), None)
     if not candidate:
         flash('Candidate not found','danger')
         return redirect(url_for('my_approvals'))
     prev_status = candidate.get('status')
     now_iso = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    # Decide new status based on role + action
-    new_status = prev_status
-    # Normalize legacy statuses
-    legacy_map = {
-        'Approved': 'Selected',
-        'Dept Approved': 'Selected'
-    }
-    if prev_status in legacy_map:
-        prev_status = legacy_map[prev_status]
-    rlow = role.lower()
-    if action == 'approve':
-        if any(k in rlow for k in ['hr','discipline manager','discipline']) and prev_status in ['New','Applied','Application Submitted','Pending','Review','', None]:
-            new_status = 'Shortlisted'
-        elif 'department manager' in rlow and prev_status in ['Shortlisted','Pending Dept Selection']:
-            new_status = 'Selected'
-        elif 'operation manager' in rlow and prev_status in ['Selected','Pending Operations Hire']:
-            new_status = 'Hired'
-    elif action == 'reject':
-        new_status = 'Rejected'
+    # Decide new status based on role + action (legacy statuses normalized)
+    prev_status = normalize_status(prev_status)
+    new_status = approval_target_status(role, action, prev_status)
     # Update candidate if status changed
     if new_status != prev_status:
-        candidate['previous_status'] = prev_status
-        candidate['status'] = new_status
-        candidate['status_updated_by'] = current_user.username
-        candidate['status_updated_by_role'] = role
-        candidate['status_updated_at'] = now_iso
-        candidate.setdefault('status_history', []).append({
-            'from_status': prev_status,
-            'to_status': new_status,
-            'updated_by': current_user.username,
-            'updated_by_role': role,
-            'updated_at': now_iso,
-            'update_type': 'approval_decision'
-        })
+        apply_status_change(candidate, prev_status, new_status, current_user.username, role, 'approval_decision', now_iso)
         try:
             process_notifications_for_status_change(candidate, prev_status, new_status, current_user.username)
         except Exception as e:
             print('Approval workflow trigger error:', e)
         try:
-            with open(cand_path,'w',encoding='utf-8') as f:
-                json.dump(candidates,f,indent=4)
+            save_candidates(candidates)
         except Exception as e:
             flash(f'Error saving candidate: {e}','danger')
     # Update notifications related to this candidate & role
     notes = load_notifications()
-    changed = False
-    for n in notes:
-        if str(n.get('candidate_id')) == str(candidate_id) and n.get('status') not in ['Approved','Rejected'] and (n.get('for_role') == role or role.startswith(n.get('for_role','')) or n.get('for_role','').startswith(role)):
-            if action == 'approve':
-                # Mark the notification as Approved (notification lifecycle) but candidate status already updated above
-                n['status'] = 'Approved'
-            else:
-                n['status'] = 'Rejected'
-            n['approved_by'] = current_user.username
-            n['approved_at'] = now_iso
-            changed = True
-    if changed:
+    if resolve_related_notifications(notes, candidate_id, role, action, current_user.username, now_iso):
         save_notifications(notes)
     flash(f'Candidate {action}d successfully.', 'success')
     return redirect(url_for('my_approvals'))
@@ -1813,8 +2271,7 @@ def update_onboarding_steps():
             break
     if changed:
         try:
-            with open(candidates_path, 'w', encoding='utf-8') as f:
-                json.dump(candidates, f, indent=4)
+            save_candidates(candidates)
         except Exception:
             flash('Failed to save onboarding progress.', 'danger')
     else:
@@ -1932,8 +2389,9 @@ def analyze_video_bg(candidate_id, round_index, video_filename, round_name=None)
             if not candidate:
                 return
             candidate['interview_analysis'] = interview_analysis
-            with open(candidates_path, 'w', encoding='utf-8') as f:
-                json.dump(candidates, f, indent=4)
+            save_candidates(candidates)
+            change_events.publish(INTERVIEW_ANALYZED, candidate_id=candidate_id, candidate_name=candidate.get('name'),
+                                  round_index=round_index, round_name=round_name, performance_score=score)
             break
         except Exception:
             time.sleep(0.5)
@@ -1981,8 +2439,7 @@ def upload_interview_videos(candidate_id):
     candidate['interview_analysis'] = interview_analysis
     # Save back
     try:
-        with open(candidates_path, 'w', encoding='utf-8') as f:
-            json.dump(candidates, f, indent=4)
+        save_candidates(candidates)
     except Exception as e:
         flash(f'Error saving analysis: {e}', 'danger')
         return redirect(url_for('candidate_profile', candidate_id=candidate_id))
@@ -7,6 +7,8 @@ import json
 import re
 import datetime
 from collections import defaultdict
+from change_events import change_events, CANDIDATES_SAVED, JOBS_SAVED, CANDIDATE_STATUS_CHANGED, JOB_POSTED, CV_ANALYZED
+from data_version import cached_by_version
 
 # Ensure .env is loaded early
 load_dotenv(override=True)
@@ -229,8 +231,10 @@ def analyze_cv_with_jd_and_update_candidate(job_id, candidate_id, cv_path, uploa
 	# Auto-shortlisting logic
 	auto_shortlisting = job.get('auto_shortlisting', False)
 	threshold = int(job.get('match_score', 75))
+	shortlisted = False
 	if auto_shortlisting and match_score >= threshold:
 		prev_status = candidate.get('status', 'New')
+		shortlisted = True
 		candidate['status'] = 'Shortlisted'
 		candidate.setdefault('status_history', []).append({
 			'from_status': prev_status,
@@ -243,6 +247,14 @@ def analyze_cv_with_jd_and_update_candidate(job_id, candidate_id, cv_path, uploa
 	# Save candidates
 	with open(candidates_path, 'w', encoding='utf-8') as f:
 		json.dump(candidates, f, indent=4)
+	change_events.publish(CANDIDATES_SAVED, candidates=candidates)
+	change_events.publish(CV_ANALYZED, candidate_id=candidate.get('id'), candidate_name=candidate.get('name'),
+		job_id=job_id, match_score=match_score, uploaded_by=uploaded_by)
+	if shortlisted:
+		last = candidate['status_history'][-1]
+		change_events.publish(CANDIDATE_STATUS_CHANGED, candidate_id=candidate.get('id'),
+			candidate_name=candidate.get('name'), status='Shortlisted', previous_status=prev_status,
+			updated_by=uploaded_by, updated_at=last['updated_at'], update_type=last['update_type'])
 	return {'success': True, 'message': f'CV analyzed. Match score: {match_score}%.', 'match_score': match_score, 'debug_extract': debug_extract, **extracted}
 def save_job_post(form, file_storage, posted_by, auto_shortlisting=False, match_score=75):
 	# Prepare job data
@@ -280,10 +292,13 @@ def save_job_post(form, file_storage, posted_by, auto_shortlisting=False, match_
 	jobs.append(job)
 	with open(jobs_path, 'w') as f:
 		json.dump(jobs, f, indent=2)
+	change_events.publish(JOBS_SAVED, jobs=jobs)
+	change_events.publish(JOB_POSTED, job=job)
 	return job
 
 # (Imports moved to top; kept for backward compatibility with existing references)
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_dashboard_data():
 	# Load candidates and jobs
 	with open(os.path.join('db', 'candidates.json'), 'r') as f:
@@ -0,0 +1,104 @@
+"""
+Change Event Bus for AION HR System
+In-process publish/subscribe of storage mutations so derived structures update incrementally
+"""
+
+import datetime
+import threading
+from typing import Any, Callable, Dict, List
+
+from data_version import data_versions
+
+
+# Collection written (payload: the full list that was saved)
+CANDIDATES_SAVED = 'candidates_saved'
+JOBS_SAVED = 'jobs_saved'
+NOTIFICATIONS_SAVED = 'notifications_saved'
+USERS_SAVED = 'users_saved'
+
+# Domain events (payload: the changed entity and what happened to it)
+CANDIDATE_STATUS_CHANGED = 'candidate_status_changed'
+JOB_POSTED = 'job_posted'
+CV_ANALYZED = 'cv_analyzed'
+INTERVIEW_ANALYZED = 'interview_analyzed'
+
+EVENT_TYPES = {
+    CANDIDATES_SAVED, JOBS_SAVED, NOTIFICATIONS_SAVED, USERS_SAVED,
+    CANDIDATE_STATUS_CHANGED, JOB_POSTED, CV_ANALYZED, INTERVIEW_ANALYZED,
+}
+
+# Data version counter bumped by each collection write event
+SAVED_ENTITY = {
+    CANDIDATES_SAVED: 'candidates',
+    JOBS_SAVED: 'jobs',
+    NOTIFICATIONS_SAVED: 'notifications',
+    USERS_SAVED: 'users',
+}
+
+
+class ChangeEvent:
+    __slots__ = ('type', 'data', 'at')
+
+    def __init__(self, event_type: str, data: Dict[str, Any]):
+        self.type = event_type
+        self.data = data
+        self.at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    def __repr__(self):
+        return f"ChangeEvent({self.type!r}, at={self.at!r})"
+
+
+class ChangeEventBus:
+    """
+    Synchronous fan-out of change events to subscribers, in subscription order.
+
+    Writers publish after the data is on disk, so a subscriber may read the store back.
+    Collection write events bump the entity's shared data version before subscribers
+    run. A failing subscriber is logged and skipped; it never fails the write that emitted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: Dict[str, List[Callable[[ChangeEvent], None]]] = {}
+        self.published: Dict[str, int] = {}
+
+    def subscribe(self, event_type: str, handler: Callable[[ChangeEvent], None]):
+        """Call handler(event) for every event of this type ('*' for all types)"""
+        if event_type != '*' and event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown change event type: {event_type}")
+        with self.lock:
+            self.subscribers.setdefault(event_type, []).append(handler)
+        return handler
+
+    def unsubscribe(self, event_type: str, handler: Callable[[ChangeEvent], None]):
+        with self.lock:
+            handlers = self.subscribers.get(event_type, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def publish(self, event_type: str, **data) -> ChangeEvent:
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown change event type: {event_type}")
+        if event_type in SAVED_ENTITY:
+            data_versions.bump(SAVED_ENTITY[event_type])
+        event = ChangeEvent(event_type, data)
+        with self.lock:
+            handlers = list(self.subscribers.get(event_type, [])) + list(self.subscribers.get('*', []))
+            self.published[event_type] = self.published.get(event_type, 0) + 1
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f'Change event subscriber error ({event_type}):', e)
+        return event
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'subscribers': {t: len(h) for t, h in self.subscribers.items()},
+                'published': dict(self.published),
+            }
+
+
+# Global change event bus instance
+change_events = ChangeEventBus()
@@ -0,0 +1,455 @@
+"""
+Chat DB Context Retrieval for AION HR System
+Selects the records relevant to a chat turn instead of dumping the whole database into the prompt
+"""
+
+import bisect
+import contextvars
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from data_version import data_versions
+from facet_index import facet_index
+from search_index import search_index, tokenize
+from token_budget import budget_for, json_tokens
+
+
+# 'retrieval' (default) or 'full' (the previous behaviour: every record on every turn)
+CONTEXT_MODE = os.getenv('AION_CHAT_CONTEXT', 'retrieval').lower()
+
+# Prompt tokens the DB context may take (default: its share of the prompt budget)
+CONTEXT_TOKEN_BUDGET = int(os.getenv('AION_CHAT_CONTEXT_TOKENS') or budget_for('db'))
+
+# Relevance of each kind of reference; records are added to the context in descending score
+SCORE_ID = 10.0
+SCORE_FULL_NAME = 8.0
+SCORE_NAME_PART = 4.0      # split between all candidates sharing that first / last name
+SCORE_SEARCH = 3.0         # scaled by the BM25 score relative to the best hit
+SCORE_STATUS = 3.0
+SCORE_LINKED_JOB = 2.0     # a candidate's job ranks below the candidate (half its score, capped)
+
+# Earlier conversation turns count for less than the current question
+HISTORY_TURNS = 6
+HISTORY_WEIGHT = 0.5
+
+SEARCH_LIMIT = 10
+MAX_NOTIFICATIONS = 15
+MAX_ACTIVITIES = 15
+
+# Words too common in questions to identify a candidate on their own
+NAME_STOPWORDS = {'the', 'and', 'for', 'job', 'new', 'all', 'who', 'how', 'many', 'hired', 'status'}
+
+CANDIDATE_ID_RE = re.compile(r'\b(?:candidate|id)\s*(?:id)?\s*[#:]?\s*(\d+)\b', re.IGNORECASE)
+JOB_ID_RE = re.compile(r'\bjob\s*(?:id)?\s*[#:]?\s*(\d+)\b', re.IGNORECASE)
+
+
+# Access levels from the chatbot's role rules: a user sees their own details and those of lower levels
+ROLE_LEVELS = {
+    'CEO': 5,
+    'Admin': 5,
+    'Operation Manager': 4,
+    'Department Manager': 3,
+    'HR Manager': 3,
+    'Manager': 3,
+    'Discipline Manager': 2,
+    'HR': 1,
+}
+
+# Fields sent to the model, under shorter keys. Everything else (status history, transcripts,
+# interview reports, raw extraction output, file paths, profile links, offer blobs) is dropped.
+CANDIDATE_KEYS = {
+    'id': 'id', 'name': 'name', 'email': 'email', 'phone': 'phone', 'position': 'pos',
+    'status': 'status', 'previous_status': 'prev', 'status_updated_by': 'upd_by',
+    'status_updated_at': 'upd_at', 'job_id': 'job', 'department': 'dept',
+    'applied_date': 'applied', 'match_score': 'match', 'skills': 'skills',
+    'experience': 'exp', 'education': 'edu', 'certifications': 'certs', 'projects': 'projects',
+    'notes': 'notes', 'interview_date': 'int_date', 'interview_time': 'int_time',
+    'intervier': 'interviewer', 'interview_score': 'int_score', 'shortlisted_date': 'shortlisted',
+    'interview_scheduled_date': 'int_scheduled', 'interviewed_date': 'interviewed',
+    'selected_date': 'selected', 'hired_date': 'hired', 'onboarding_date': 'onboarded',
+    'offered_salary': 'offered', 'negotiated_salary': 'negotiated', 'final_salary': 'salary',
+    'benefits_package': 'benefits', 'total_compensation': 'total_comp', 'salary_currency': 'cur',
+    'salary_period': 'period', 'onboarding_status': 'onb_status',
+    'onboarding_completion_date': 'onb_done', 'probation_status': 'prob_status',
+    'probation_end_date': 'prob_end', 'performance_rating': 'rating',
+}
+JOB_KEYS = {
+    'job_id': 'job', 'job_title': 'title', 'department': 'dept', 'status': 'status',
+    'job_openings': 'openings', 'seniority_level': 'level', 'job_location': 'loc',
+    'job_type': 'type', 'salary_range': 'salary_range', 'job_lead_time': 'lead_days',
+    'job_posted_by': 'posted_by', 'posted_at': 'posted_at', 'job_requirements': 'reqs',
+    'job_description': 'desc',
+}
+NOTIFICATION_KEYS = {
+    'id': 'id', 'candidate_id': 'cand', 'candidate_name': 'name', 'position': 'pos',
+    'type': 'type', 'status': 'status', 'for_role': 'for_role', 'receiver_username': 'to',
+    'from_user': 'from', 'message': 'msg', 'timestamp': 'at', 'priority': 'priority',
+}
+ACTIVITY_KEYS = {'date': 'at', 'description': 'what', 'user': 'by', 'type': 'type'}
+
+# Long free-text job fields are cut to this many characters
+MAX_TEXT = 300
+
+# Values that carry no information ('None' / '[]' are how the CV extractor stores missing data)
+EMPTY_VALUES = (None, '', 'None', 'null', '[]', '{}', 'Not specified')
+
+KEY_LEGEND = ('upd_by/upd_at: last status change by/at; prev: previous status; job: job id; '
+              'int_*: interview; onb_*: onboarding; prob_*: probation; match: CV match score; '
+              'to/from: notification receiver/sender')
+
+
+def role_level(role: Optional[str]) -> int:
+    """Access level of a role (unknown or missing roles get the lowest level)"""
+    role = (role or '').strip()
+    if role in ROLE_LEVELS:
+        return ROLE_LEVELS[role]
+    # 'Department Manager (MOE)' etc.
+    base = role.split('(')[0].strip()
+    return ROLE_LEVELS.get(base, 1)
+
+
+def _is_empty(value: Any) -> bool:
+    if isinstance(value, (list, dict)):
+        return not value
+    return value in EMPTY_VALUES
+
+
+def _project(record: Dict, keys: Dict[str, str], truncate: tuple = ()) -> Dict[str, Any]:
+    out = {}
+    for field, short in keys.items():
+        value = record.get(field)
+        if _is_empty(value):
+            continue
+        if field in truncate and isinstance(value, str) and len(value) > MAX_TEXT:
+            value = value[:MAX_TEXT].rstrip() + '…'
+        out[short] = value
+    return out
+
+
+def compact_candidate(c: Dict) -> Dict[str, Any]:
+    return _project(c, CANDIDATE_KEYS)
+
+
+def compact_job(j: Dict) -> Dict[str, Any]:
+    return _project(j, JOB_KEYS, truncate=('job_requirements', 'job_description'))
+
+
+def compact_notification(n: Dict) -> Dict[str, Any]:
+    return _project(n, NOTIFICATION_KEYS)
+
+
+def compact_activity(a: Dict) -> Dict[str, Any]:
+    return _project(a, ACTIVITY_KEYS)
+
+
+def scoped_users(users: List[Dict], user_context: Optional[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Users as the current user may see them: contact details of themselves and lower-level
+    users, only username / role for peers and superiors. Passwords are never included.
+    """
+    username = (user_context or {}).get('username', '')
+    level = role_level((user_context or {}).get('role'))
+    out = []
+    for u in users:
+        if u.get('username') == username or role_level(u.get('role')) < level:
+            out.append(_project(u, {'username': 'username', 'role': 'role', 'department': 'dept',
+                                    'email': 'email', 'phone': 'phone'}))
+        else:
+            out.append(_project(u, {'username': 'username', 'role': 'role'}))
+    return out
+
+
+# User context ({'role', 'username', ...}) of the chat turn a tool call runs for
+chat_user_context: contextvars.ContextVar = contextvars.ContextVar('chat_user_context', default=None)
+
+
+def visible_notification(n: Dict, user_context: Optional[Dict[str, str]]) -> bool:
+    """Top-level roles see every notification; others those sent to / by them or to their role"""
+    username = (user_context or {}).get('username', '')
+    role = (user_context or {}).get('role', '')
+    if role_level(role) >= 5:
+        return True
+    for_role = n.get('for_role') or ''
+    return bool(
+        (username and username in (n.get('receiver_username'), n.get('from_user'), n.get('created_by')))
+        or (role and for_role and (role == for_role or role.startswith(for_role)))
+    )
+
+
+def project_db_context(db: Dict[str, List[Dict]], user_context: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Compact, role-scoped version of the full DB dump (data.fetch_all_db_data)"""
+    return {
+        'legend': KEY_LEGEND,
+        'candidates': [compact_candidate(c) for c in db.get('candidates', [])],
+        'jobs': [compact_job(j) for j in db.get('jobs', [])],
+        'users': scoped_users(db.get('users', []), user_context),
+        'notifications': [compact_notification(n) for n in db.get('notifications', [])
+                          if visible_notification(n, user_context)],
+        'activities': [compact_activity(a) for a in db.get('activities', [])],
+    }
+
+
+def _read(db_folder: str, filename: str) -> List[Dict]:
+    try:
+        with open(os.path.join(db_folder, filename), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return []
+
+
+class ChatContextRetriever:
+    """
+    Builds the DB_CONTEXT for one chat turn within a token budget.
+
+    Every turn gets a small overview (status / department counts, the job list and users).
+    Candidates and jobs are then ranked by how the question - and, with less weight, the
+    last few conversation turns - refers to them: explicit ids, full names, first / last
+    names, status names and full-text search hits. Related notifications and activities
+    follow the selected candidates. Name lookups are rebuilt only when the candidates or
+    jobs data version changes; the chatbot's lookup tools share them.
+    """
+
+    def __init__(self, db_folder: Optional[str] = None, token_budget: int = CONTEXT_TOKEN_BUDGET):
+        self.db_folder = db_folder or os.path.join(os.path.dirname(__file__), 'db')
+        self.token_budget = token_budget
+        self.lock = threading.Lock()
+        self._version = None
+        self.candidates: Dict[str, Dict] = {}
+        self.jobs: Dict[str, Dict] = {}
+        self.full_names: List[Tuple[str, str]] = []
+        self.name_parts: Dict[str, List[str]] = {}
+        self.job_titles: List[Tuple[str, str]] = []
+        self.statuses: Dict[str, str] = {}
+        self.interviews: List[Tuple[str, str, str]] = []  # (date, time, candidate id), sorted
+
+    def _load(self):
+        version = data_versions.snapshot('candidates', 'jobs')
+        with self.lock:
+            if version == self._version and self.candidates:
+                return
+            candidates = _read(self.db_folder, 'candidates.json')
+            jobs = _read(self.db_folder, 'jobs.json')
+            self.candidates = {str(c.get('id')): c for c in candidates}
+            self.jobs = {str(j.get('job_id')): j for j in jobs}
+            self.full_names = []
+            self.name_parts = {}
+            for cid, c in self.candidates.items():
+                name = (c.get('name') or '').strip().lower()
+                if not name:
+                    continue
+                self.full_names.append((name, cid))
+                for part in set(tokenize(name)):
+                    if len(part) >= 3 and part not in NAME_STOPWORDS:
+                        self.name_parts.setdefault(part, []).append(cid)
+            self.job_titles = [((j.get('job_title') or '').strip().lower().rstrip('.'), jid)
+                               for jid, j in self.jobs.items() if j.get('job_title')]
+            self.statuses = {(c.get('status') or '').lower(): c.get('status')
+                             for c in candidates if c.get('status')}
+            self.interviews = sorted(
+                (str(c['interview_date']), str(c.get('interview_time') or ''), cid)
+                for cid, c in self.candidates.items() if c.get('interview_date')
+            )
+            self._version = version
+
+    # ---------------- Lookups ----------------
+    def candidate(self, candidate_id) -> Optional[Dict]:
+        self._load()
+        return self.candidates.get(str(candidate_id).strip())
+
+    def candidates_named(self, name: str) -> List[Dict]:
+        """Candidates whose full name equals or contains `name`, or who share all of its name parts"""
+        self._load()
+        wanted = (name or '').strip().lower()
+        if not wanted:
+            return []
+        exact = [cid for full, cid in self.full_names if full == wanted]
+        if exact:
+            return [self.candidates[cid] for cid in exact]
+        partial = [cid for full, cid in self.full_names if self._contains(full, wanted)]
+        if not partial:
+            parts = [p for p in tokenize(wanted) if p in self.name_parts]
+            if parts:
+                common = set(self.name_parts[parts[0]]).intersection(*(self.name_parts[p] for p in parts[1:]))
+                partial = sorted(common, key=lambda c: (len(c), c))
+        return [self.candidates[cid] for cid in partial]
+
+    def job(self, job_id) -> Optional[Dict]:
+        self._load()
+        return self.jobs.get(str(job_id).strip())
+
+    def jobs_titled(self, title: str) -> List[Dict]:
+        self._load()
+        wanted = (title or '').strip().lower().rstrip('.')
+        exact = [jid for t, jid in self.job_titles if t == wanted]
+        matches = exact or [jid for t, jid in self.job_titles if wanted and wanted in t]
+        return [self.jobs[jid] for jid in matches]
+
+    def interviews_between(self, start: str, end: str) -> List[Dict]:
+        """Candidates with an interview dated start..end (YYYY-MM-DD, inclusive), in date / time order"""
+        self._load()
+        lo = bisect.bisect_left(self.interviews, (start,))
+        hi = bisect.bisect_right(self.interviews, (end, '\uffff'))
+        return [self.candidates[cid] for _, _, cid in self.interviews[lo:hi]]
+
+    @staticmethod
+    def _contains(text: str, phrase: str) -> bool:
+        return bool(phrase) and re.search(r'(?<![a-z0-9])' + re.escape(phrase) + r'(?![a-z0-9])', text) is not None
+
+    def _score_text(self, text: str, weight: float, cand: Dict[str, float], jobs: Dict[str, float]):
+        lowered = text.lower()
+        for cid in CANDIDATE_ID_RE.findall(text):
+            if cid in self.candidates:
+                cand[cid] = cand.get(cid, 0) + SCORE_ID * weight
+        for jid in JOB_ID_RE.findall(text):
+            if jid in self.jobs:
+                jobs[jid] = jobs.get(jid, 0) + SCORE_ID * weight
+        full_hits = set()
+        for name, cid in self.full_names:
+            if self._contains(lowered, name):
+                cand[cid] = cand.get(cid, 0) + SCORE_FULL_NAME * weight
+                full_hits.add(cid)
+        for term in set(tokenize(lowered)):
+            cids = [c for c in self.name_parts.get(term, []) if c not in full_hits]
+            for cid in cids:
+                cand[cid] = cand.get(cid, 0) + SCORE_NAME_PART * weight / len(self.name_parts[term])
+        for title, jid in self.job_titles:
+            if self._contains(lowered, title):
+                jobs[jid] = jobs.get(jid, 0) + SCORE_FULL_NAME * weight
+        for status_lower, status in self.statuses.items():
+            if self._contains(lowered, status_lower):
+                for cid, c in self.candidates.items():
+                    if c.get('status') == status:
+                        cand[cid] = cand.get(cid, 0) + SCORE_STATUS * weight
+
+    def rank(self, query: str, history: Optional[List[Dict]] = None) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """Relevance scores of candidates and jobs (by id) for a question and the recent conversation"""
+        self._load()
+        cand: Dict[str, float] = {}
+        jobs: Dict[str, float] = {}
+        self._score_text(query or '', 1.0, cand, jobs)
+        try:
+            hits = search_index.search(query or '', limit=SEARCH_LIMIT, prefix=False)
+        except Exception as e:
+            print(f"⚠️ Chat context search failed: {e}")
+            hits = []
+        if hits:
+            top = max(h.get('score', 0) for h in hits) or 1.0
+            for h in hits:
+                cid = str(h.get('id'))
+                if cid in self.candidates:
+                    cand[cid] = cand.get(cid, 0) + SCORE_SEARCH * h.get('score', 0) / top
+        # Follow-up questions ("what about her salary?") refer back to earlier turns
+        turns = [m for m in (history or []) if m.get('role') in ('user', 'assistant') and m.get('content')]
+        for age, m in enumerate(reversed(turns[-HISTORY_TURNS:]), start=1):
+            self._score_text(str(m['content']), HISTORY_WEIGHT / age, cand, jobs)
+        for cid, score in list(cand.items()):
+            jid = str(self.candidates[cid].get('job_id'))
+            if jid in self.jobs:
+                jobs[jid] = jobs.get(jid, 0) + min(score / 2, SCORE_LINKED_JOB)
+        return cand, jobs
+
+    def overview(self) -> Dict[str, Any]:
+        """Aggregate view included on every turn so counting questions work without the records"""
+        candidate_counts = facet_index.candidate_counts()
+        job_counts = facet_index.job_counts()
+        return {
+            'candidate_count': candidate_counts['total'],
+            'candidates_by_status': candidate_counts['facets'].get('status', {}),
+            'candidates_by_department': candidate_counts['facets'].get('department', {}),
+            'job_count': job_counts['total'],
+            'jobs_by_status': job_counts['facets'].get('status', {}),
+            'job_list': [
+                _project(j, {'job_id': 'job', 'job_title': 'title', 'department': 'dept',
+                             'status': 'status', 'job_openings': 'openings'})
+                for j in self.jobs.values()
+            ],
+        }
+
+    def build(self, query: str, history: Optional[List[Dict]] = None,
+              user_context: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """DB context for one chat turn: overview, users and the most relevant records within the budget"""
+        cand_scores, job_scores = self.rank(query, history)
+        context: Dict[str, Any] = {
+            'mode': 'retrieval',
+            'note': 'Only records relevant to this question are included; overview counts cover all data. Use the lookup tools (get_candidate, filter_candidates, list_upcoming_interviews, get_job_details, count_by) for anything else.',
+            'legend': KEY_LEGEND,
+            'overview': self.overview(),
+            'users': scoped_users(_read(self.db_folder, 'userdata.json'), user_context),
+            'candidates': [],
+            'jobs': [],
+            'notifications': [],
+            'activities': [],
+        }
+        used = json_tokens(context)
+
+        ranked = [(s, 'candidates', cid) for cid, s in cand_scores.items()]
+        ranked += [(s, 'jobs', jid) for jid, s in job_scores.items()]
+        ranked.sort(key=lambda r: -r[0])
+        selected = set()
+        for _, kind, key in ranked:
+            if kind == 'candidates':
+                record = compact_candidate(self.candidates[key])
+            else:
+                record = compact_job(self.jobs[key])
+            cost = json_tokens(record)
+            # A record that does not fit is skipped; a smaller, less relevant one may still fit
+            if used + cost > self.token_budget:
+                continue
+            context[kind].append(record)
+            used += cost
+            if kind == 'candidates':
+                selected.add(key)
+
+        username = (user_context or {}).get('username', '')
+        for n in sorted(_read(self.db_folder, 'notifications.json'),
+                        key=lambda n: n.get('timestamp') or '', reverse=True):
+            if len(context['notifications']) >= MAX_NOTIFICATIONS:
+                break
+            if not visible_notification(n, user_context):
+                continue
+            mine = username and n.get('receiver_username') == username and n.get('status') == 'Pending'
+            if str(n.get('candidate_id')) in selected or mine:
+                record = compact_notification(n)
+                cost = json_tokens(record)
+                if used + cost <= self.token_budget:
+                    context['notifications'].append(record)
+                    used += cost
+
+        from data import fetch_recent_activities
+        for a in fetch_recent_activities(show_all=True):
+            if len(context['activities']) >= MAX_ACTIVITIES:
+                break
+            related = str(a.get('entity_id')) in selected and a.get('entity_type') in ('candidate', 'interview', 'onboarding')
+            if related or len(context['activities']) < MAX_ACTIVITIES // 3:
+                record = compact_activity(a)
+                cost = json_tokens(record)
+                if used + cost <= self.token_budget:
+                    context['activities'].append(record)
+                    used += cost
+        return context
+
+
+# Global chat context retriever instance
+chat_context = ChatContextRetriever()
+
+
+def build_db_context(query: str, history: Optional[List[Dict]] = None,
+                     user_context: Optional[Dict[str, str]] = None, mode: Optional[str] = None) -> Dict[str, Any]:
+    """
+    DB context for a chat turn.
+
+    mode='full' (or AION_CHAT_CONTEXT=full) sends every record; retrieval failures also
+    fall back to the full dump so the chatbot keeps answering. Either way records are
+    projected for the current user's role before serialization.
+    """
+    from data import fetch_all_db_data
+    if (mode or CONTEXT_MODE) == 'full':
+        return project_db_context(fetch_all_db_data(), user_context)
+    try:
+        return chat_context.build(query, history, user_context)
+    except Exception as e:
+        print(f"⚠️ Chat context retrieval failed, sending full DB: {e}")
+        return project_db_context(fetch_all_db_data(), user_context)
@@ -0,0 +1,182 @@
+"""
+Rolling Conversation Summaries for AION HR System
+Opt-in folding of older chat turns and bulky tool results into a running summary
+"""
+
+import datetime
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import openai
+
+from token_budget import count_tokens, message_tokens, pack_messages, truncate_to_tokens
+
+
+# Off unless AION_CHAT_SUMMARY=1
+SUMMARY_ENABLED = os.getenv("AION_CHAT_SUMMARY", "0").lower() in ("1", "true", "yes", "on")
+SUMMARY_MODEL = os.getenv("AION_CHAT_SUMMARY_MODEL", "gpt-4o-mini")
+
+# Fold once the turns older than the kept ones reach this many tokens
+FOLD_TOKENS = int(os.getenv("AION_CHAT_SUMMARY_FOLD_TOKENS", "2000"))
+# Most recent user turns (with their answers and tool calls) that always stay verbatim
+KEEP_RECENT_TURNS = int(os.getenv("AION_CHAT_SUMMARY_KEEP_TURNS", "4"))
+SUMMARY_MAX_TOKENS = 500
+# Tool results longer than this are cut in prompts once a summary is in use, and in the summarizer input
+BULKY_TOOL_TOKENS = 600
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of an HR assistant conversation. Merge the previous "
+    "summary with the new turns into one concise summary (at most 250 words). Keep names, "
+    "candidate / job IDs, numbers, decisions, open questions and the user's preferences; "
+    "keep only the key figures of tool results. Write plain sentences, no preamble."
+)
+
+
+class ConversationSummary:
+    """Running summary of one conversation and the history file offset it covers up to"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.summary = ""
+        self.through = 0
+        self.updated_at: Optional[str] = None
+        self.generation = 0
+        self.folding = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # Summaries from before file offsets were used cannot be placed; they are rebuilt
+            if "through_offset" in data:
+                self.summary = data.get("summary", "")
+                self.through = int(data["through_offset"])
+                self.updated_at = data.get("updated_at")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Error loading conversation summary: {e}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary, "through_offset": self.through, "updated_at": self.updated_at},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _summary_of(history) -> ConversationSummary:
+    # Cached on the history object; reloaded after the history file is cleared / rewritten
+    current = getattr(history, "_summary", None)
+    if current is None or current.generation != history.generation:
+        current = ConversationSummary(history.summary_file)
+        current.generation = history.generation
+        history._summary = current
+    return current
+
+
+def _fold_split(messages: List[Dict[str, Any]]) -> int:
+    """Index before the KEEP_RECENT_TURNS-th last user message (0 if there are not that many)"""
+    seen = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].get("role") == "user":
+            seen += 1
+            if seen == KEEP_RECENT_TURNS:
+                return i
+    return 0
+
+
+def _transcript(messages: List[Dict[str, Any]]) -> str:
+    lines = []
+    for m in messages:
+        role = m.get("role")
+        if role == "tool":
+            lines.append(f"[tool {m.get('name', '')} result] {truncate_to_tokens(str(m.get('content') or ''), BULKY_TOOL_TOKENS)}")
+        elif m.get("tool_calls"):
+            calls = ", ".join(f"{c['function']['name']}({c['function'].get('arguments', '')})" for c in m["tool_calls"])
+            lines.append(f"[assistant called] {calls}")
+        elif m.get("content"):
+            lines.append(f"{role}: {m['content']}")
+    return "\n".join(lines)
+
+
+def prompt_history(history, max_tokens: int) -> List[Dict[str, Any]]:
+    """
+    History messages for the next prompt.
+
+    With summaries enabled and a summary present: one system message carrying the summary,
+    then the turns after what it covers (bulky tool results cut), packed into what is
+    left of max_tokens. Otherwise the plain packed history.
+    """
+    if not SUMMARY_ENABLED:
+        return history.get_recent_messages(max_tokens)
+    state = _summary_of(history)
+    if not state.summary:
+        return history.get_recent_messages(max_tokens)
+    summary_message = {"role": "system", "content": f"CONVERSATION_SUMMARY (earlier turns): {state.summary}"}
+    start = history.index_after(state.through)
+    recent = []
+    for m in history.messages[start:]:
+        if m.get("role") == "tool" and message_tokens.tokens(m) > BULKY_TOOL_TOKENS:
+            m = {**m, "content": truncate_to_tokens(str(m.get("content") or ""), BULKY_TOOL_TOKENS)}
+        recent.append(m)
+    remaining = max(0, max_tokens - count_tokens(summary_message["content"]))
+    return [summary_message] + pack_messages(recent, remaining)
+
+
+def fold(history) -> bool:
+    """
+    Fold unsummarized turns older than the last KEEP_RECENT_TURNS into the running
+    summary once they reach FOLD_TOKENS. Returns True when the summary was updated;
+    a failed summarization leaves the previous summary in place.
+    """
+    with history.lock:
+        state = _summary_of(history)
+        if state.folding:
+            return False
+        start = history.index_after(state.through)
+        unsummarized = history.messages[start:]
+        split = _fold_split(unsummarized)
+        older = unsummarized[:split]
+        if not older or sum(message_tokens.tokens(m) for m in older) < FOLD_TOKENS:
+            return False
+        # File offset just past the last folded message; unsaved messages are not folded yet
+        through = history.ends[start + split - 1]
+        if through is None:
+            return False
+        previous = state.summary
+        state.folding = True
+    try:
+        # The model call runs outside the session lock so the next turn is not held up
+        prompt = f"Previous summary:\n{previous or '(none)'}\n\nNew turns:\n{_transcript(older)}"
+        response = openai.ChatCompletion.create(
+            model=SUMMARY_MODEL,
+            messages=[{"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                      {"role": "user", "content": prompt}],
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
+        summary = (response["choices"][0]["message"]["content"] or "").strip()
+    except Exception as e:
+        print(f"⚠️ Conversation summary failed: {e}")
+        return False
+    finally:
+        state.folding = False
+    with history.lock:
+        # Cleared while summarizing: the old turns are gone, drop the result
+        if not summary or state.generation != history.generation:
+            return False
+        state.summary = summary
+        state.through = through
+        state.updated_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        state.save()
+    return True
+
+
+def schedule_fold(history):
+    """Fold in the background after a turn so the reply is not delayed"""
+    if SUMMARY_ENABLED:
+        threading.Thread(target=fold, args=(history,), daemon=True).start()
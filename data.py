@@ -239,6 +239,23 @@ def fetch_all_db_data():
         "users": users,
         "notifications": notifications
     }
+def _activity_usernames():
+    """Map of email / username -> username used to label derived activities"""
+    usernames = {}
+    user_file = os.path.join(os.path.dirname(__file__), 'db', 'userdata.json')
+    if os.path.exists(user_file):
+        with open(user_file, 'r') as f:
+            try:
+                users = json.load(f)
+            except json.JSONDecodeError:
+                users = []
+        for u in users:
+            if u.get('email'):
+                usernames[u['email']] = u.get('username', '')
+            if u.get('username'):
+                usernames[u['username']] = u.get('username', '')
+    return usernames
+
 # Enhanced Recent Activities fetcher with new activity logger integration
 def fetch_recent_activities(show_all=False):
     """
@@ -268,113 +285,14 @@ def fetch_recent_activities(show_all=False):
     except Exception as e:
         print(f"⚠️ Could not fetch from new activity logger: {e}")
     
-    # Fallback to legacy activity fetching from JSON files
-    db_folder = os.path.join(os.path.dirname(__file__), 'db')
-    candidate_file = os.path.join(db_folder, 'candidates.json')
-    job_file = os.path.join(db_folder, 'jobs.json')
-    
-    # Get username mapping
-    usernames = {}
-    user_file = os.path.join(db_folder, 'userdata.json')
-    if os.path.exists(user_file):
-        with open(user_file, 'r') as f:
-            try:
-                users = json.load(f)
-            except json.JSONDecodeError:
-                users = []
-        for u in users:
-            if u.get('email'):
-                usernames[u['email']] = u.get('username', '')
-            if u.get('username'):
-                usernames[u['username']] = u.get('username', '')
-    
-    # Legacy candidate activities
-    if os.path.exists(candidate_file):
-        with open(candidate_file, 'r') as f:
-            try:
-                candidates = json.load(f)
-            except json.JSONDecodeError:
-                candidates = []
-        
-        for c in candidates:
-            # Initial application
-            if c.get('applied_date'):
-                user_val = c.get('email', '')
-                user_val = usernames.get(user_val, user_val)
-                all_activities.append({
-                    'date': c.get('applied_date'),
-                    'description': f"Candidate {c.get('name', '')} (ID: {c.get('id', '')}) applied",
-                    'user': user_val if user_val else 'Unknown',
-                    'is_new': True,
-                    'type': 'candidate_applied',
-                    'entity_type': 'candidate',
-                    'entity_id': c.get('id', '')
-                })
-            
-            # Updates
-            if c.get('updated_at') and c.get('updated_by'):
-                user_val = c.get('updated_by', c.get('email', ''))
-                user_val = usernames.get(user_val, user_val)
-                date_val = c.get('updated_at')
-                candidate_name = c.get('name', '')
-                candidate_id = c.get('id', '')
-                
-                # Status changes
-                if c.get('status'):
-                    all_activities.append({
-                        'date': date_val,
-                        'description': f"Candidate {candidate_name} (ID: {candidate_id}) status changed to {c.get('status', '')}",
-                        'user': user_val if user_val else 'Unknown',
-                        'is_new': True,
-                        'type': 'candidate_status_updated',
-                        'entity_type': 'candidate',
-                        'entity_id': candidate_id
-                    })
-                
-                # Interview scheduling
-                if c.get('interview_date') and c.get('interview_time'):
-                    all_activities.append({
-                        'date': date_val,
-                        'description': f"Interview scheduled for {candidate_name} (ID: {candidate_id}) on {c.get('interview_date', '')} at {c.get('interview_time', '')}",
-                        'user': user_val if user_val else 'Unknown',
-                        'is_new': True,
-                        'type': 'interview_scheduled',
-                        'entity_type': 'interview',
-                        'entity_id': candidate_id
-                    })
-                
-                # Onboarding updates
-                if c.get('onboarding'):
-                    all_activities.append({
-                        'date': date_val,
-                        'description': f"Onboarding updated for {candidate_name} (ID: {candidate_id})",
-                        'user': user_val if user_val else 'Unknown',
-                        'is_new': True,
-                        'type': 'onboarding_updated',
-                        'entity_type': 'onboarding',
-                        'entity_id': candidate_id
-                    })
-    
-    # Legacy job activities
-    if os.path.exists(job_file):
-        with open(job_file, 'r') as f:
-            try:
-                jobs = json.load(f)
-            except json.JSONDecodeError:
-                jobs = []
-        
-        for job in jobs:
-            user_val = job.get('job_posted_by', '')
-            user_val = usernames.get(user_val, user_val)
-            all_activities.append({
-                'date': job.get('posted_at', ''),
-                'description': f"Job posted: {job.get('job_title', '')}",
-                'user': user_val,
-                'is_new': False,
-                'type': 'job_posted',
-                'entity_type': 'job',
-                'entity_id': job.get('id', '')
-            })
+    # Activities derived from candidate / job records (maintained incrementally from change events)
+    from activity_feed import activity_feed
+    usernames = _activity_usernames()
+    for a in activity_feed.activities():
+        user_val = usernames.get(a['user'], a['user'])
+        a['user'] = user_val if user_val or a['type'] == 'job_posted' else 'Unknown'
+        a['is_new'] = a['type'] != 'job_posted'
+        all_activities.append(a)
     
     # Remove duplicates based on description and date
     unique_activities = []
@@ -618,6 +536,8 @@ def edit_user_data(username, new_data):
     if updated:
         with open(user_file, 'w') as f:
             json.dump(user_data, f, indent=4)
+        from change_events import change_events, USERS_SAVED
+        change_events.publish(USERS_SAVED, users=user_data)
     return updated
 
 
@@ -877,6 +797,8 @@ def edit_candidate_data(candidate_id, new_data):
     if updated:
         with open(candidate_file, 'w') as f:
             json.dump(candidate_data, f, indent=4)
+        from change_events import change_events, CANDIDATES_SAVED
+        change_events.publish(CANDIDATES_SAVED, candidates=candidate_data)
     return updated
 
 def fetch_candidates_by_filter(**filters):
@@ -1082,121 +1004,13 @@ def fetch_todays_activities():
     except Exception as e:
         print(f"⚠️ Could not fetch today's activities from new activity logger: {e}")
     
-    # Fallback to legacy method
-    db_folder = os.path.join(os.path.dirname(__file__), 'db')
-    candidate_file = os.path.join(db_folder, 'candidates.json')
-    job_file = os.path.join(db_folder, 'jobs.json')
-    
-    # Get username mapping
-    usernames = {}
-    user_file = os.path.join(db_folder, 'userdata.json')
-    if os.path.exists(user_file):
-        with open(user_file, 'r') as f:
-            try:
-                users = json.load(f)
-            except json.JSONDecodeError:
-                users = []
-        for u in users:
-            if u.get('email'):
-                usernames[u['email']] = u.get('username', '')
-            if u.get('username'):
-                usernames[u['username']] = u.get('username', '')
-    
-    # Legacy candidate activities for today
-    if os.path.exists(candidate_file):
-        with open(candidate_file, 'r') as f:
-            try:
-                candidates = json.load(f)
-            except json.JSONDecodeError:
-                candidates = []
-        
-        for c in candidates:
-            # Check applied date
-            if c.get('applied_date'):
-                try:
-                    applied_dt = datetime.datetime.strptime(c.get('applied_date'), '%Y-%m-%d')
-                except Exception:
-                    applied_dt = None
-                if applied_dt and applied_dt.date() == today:
-                    user_val = c.get('email', '')
-                    user_val = usernames.get(user_val, user_val)
-                    todays_activities.append({
-                        'date': c.get('applied_date'),
-                        'description': f"Candidate {c.get('name', '')} (ID: {c.get('id', '')}) applied",
-                        'user': user_val if user_val else 'Unknown',
-                        'type': 'candidate_applied',
-                        'entity_type': 'candidate',
-                        'entity_id': c.get('id', '')
-                    })
-            
-            # Check updates today
-            if c.get('updated_at') and c.get('updated_by'):
-                try:
-                    updated_dt = datetime.datetime.strptime(c.get('updated_at'), '%Y-%m-%d %H:%M:%S')
-                except Exception:
-                    updated_dt = None
-                if updated_dt and updated_dt.date() == today:
-                    user_val = c.get('updated_by', c.get('email', ''))
-                    user_val = usernames.get(user_val, user_val)
-                    candidate_name = c.get('name', '')
-                    candidate_id = c.get('id', '')
-                    
-                    # Different types of updates
-                    if c.get('status'):
-                        todays_activities.append({
-                            'date': c.get('updated_at'),
-                            'description': f"Candidate {candidate_name} (ID: {candidate_id}) status changed to {c.get('status', '')}",
-                            'user': user_val if user_val else 'Unknown',
-                            'type': 'candidate_status_updated',
-                            'entity_type': 'candidate',
-                            'entity_id': candidate_id
-                        })
-                    
-                    if c.get('interview_date') and c.get('interview_time'):
-                        todays_activities.append({
-                            'date': c.get('updated_at'),
-                            'description': f"Interview scheduled for {candidate_name} (ID: {candidate_id}) on {c.get('interview_date', '')} at {c.get('interview_time', '')}",
-                            'user': user_val if user_val else 'Unknown',
-                            'type': 'interview_scheduled',
-                            'entity_type': 'interview',
-                            'entity_id': candidate_id
-                        })
-                    
-                    if c.get('onboarding'):
-                        todays_activities.append({
-                            'date': c.get('updated_at'),
-                            'description': f"Onboarding updated for {candidate_name} (ID: {candidate_id})",
-                            'user': user_val if user_val else 'Unknown',
-                            'type': 'onboarding_updated',
-                            'entity_type': 'onboarding',
-                            'entity_id': candidate_id
-                        })
-    
-    # Legacy job activities for today
-    if os.path.exists(job_file):
-        with open(job_file, 'r') as f:
-            try:
-                jobs = json.load(f)
-            except json.JSONDecodeError:
-                jobs = []
-        
-        for job in jobs:
-            posted_at = job.get('posted_at', '')
-            try:
-                posted_dt = datetime.datetime.strptime(posted_at, '%Y-%m-%d')
-            except Exception:
-                posted_dt = None
-            if posted_dt and posted_dt.date() == today:
-                user_val = job.get('job_posted_by', '')
-                user_val = usernames.get(user_val, user_val)
-                todays_activities.append({
-                    'date': posted_at,
-                    'description': f"Job posted: {job.get('job_title', '')}",
-                    'user': user_val,
-                    'type': 'job_posted',
-                    'entity_type': 'job',
-                    'entity_id': job.get('id', '')
-                })
+    # Activities derived from candidate / job records dated today
+    from activity_feed import activity_feed
+    usernames = _activity_usernames()
+    for a in activity_feed.on_date(today):
+        user_val = usernames.get(a['user'], a['user'])
+        a['user'] = user_val if user_val or a['type'] == 'job_posted' else 'Unknown'
+        todays_activities.append(a)
     
     # Remove duplicates
     unique_activities = []
@@ -0,0 +1,144 @@
+"""
+Data Version Counters for AION HR System
+Per-entity generation numbers bumped on every write and shared across processes
+"""
+
+import copy
+import datetime
+import functools
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+ENTITIES = ('candidates', 'jobs', 'notifications', 'users')
+
+VERSION_FILE = os.path.join(os.path.dirname(__file__), 'db', 'data_versions.bin')
+
+_SLOT = struct.Struct('<Q')
+
+
+class DataVersions:
+    """
+    One 64-bit counter per entity in a small memory-mapped file.
+
+    Every process maps the same file, so a bump in the app server is visible to the
+    chatbot process on its next read without any stat() or hashing. Bumps take an
+    exclusive flock around the read-modify-write; reads are a single aligned load.
+    Counters persist across restarts, so they only ever grow. Where flock / mmap is not
+    available the counters fall back to this process only.
+    """
+
+    def __init__(self, path: Optional[str] = None, entities: Tuple[str, ...] = ENTITIES):
+        self.path = path or VERSION_FILE
+        self.entities = entities
+        self.offsets = {e: i * _SLOT.size for i, e in enumerate(entities)}
+        self.lock = threading.Lock()
+        self.local: Dict[str, int] = {e: 0 for e in entities}
+        self.fd: Optional[int] = None
+        self.mm: Optional[mmap.mmap] = None
+        if fcntl is not None:
+            try:
+                self._open()
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Data versions not shared across processes: {e}")
+                self.fd = self.mm = None
+
+    def _open(self):
+        size = _SLOT.size * len(self.entities)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self.mm = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        self.fd = fd
+
+    @property
+    def shared(self) -> bool:
+        return self.mm is not None
+
+    def get(self, entity: str) -> int:
+        if self.mm is None:
+            return self.local[entity]
+        return _SLOT.unpack_from(self.mm, self.offsets[entity])[0]
+
+    def bump(self, entity: str) -> int:
+        """Advance an entity's generation after a write; returns the new value"""
+        offset = self.offsets[entity]
+        with self.lock:
+            if self.mm is None:
+                self.local[entity] += 1
+                return self.local[entity]
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            try:
+                value = _SLOT.unpack_from(self.mm, offset)[0] + 1
+                _SLOT.pack_into(self.mm, offset, value)
+            finally:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            return value
+
+    def snapshot(self, *entities: str) -> Tuple[int, ...]:
+        """Current generations of the given entities (all entities if none given), as a cache key"""
+        return tuple(self.get(e) for e in (entities or self.entities))
+
+    def all(self) -> Dict[str, int]:
+        return {e: self.get(e) for e in self.entities}
+
+
+# Global data version counters
+data_versions = DataVersions()
+
+
+def cached_by_version(*entities: str, daily: bool = False, maxsize: int = 64):
+    """
+    Memoize a function until one of the entities it reads is written.
+
+    daily=True also expires results at midnight, for functions that compare dates
+    against today. Results are deep-copied for dicts / lists so callers can mutate them.
+    Calls with unhashable arguments are not cached.
+    """
+    def decorator(fn: Callable) -> Callable:
+        cache: Dict[Any, Tuple[Tuple, Any]] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            version = data_versions.snapshot(*entities)
+            if daily:
+                version += (datetime.date.today().isoformat(),)
+            try:
+                key = (args, tuple(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:
+                return fn(*args, **kwargs)
+            with lock:
+                hit = cache.get(key)
+            if hit is not None and hit[0] == version:
+                value = hit[1]
+            else:
+                value = fn(*args, **kwargs)
+                with lock:
+                    cache.pop(key, None)
+                    cache[key] = (version, value)
+                    while len(cache) > maxsize:
+                        cache.pop(next(iter(cache)))
+            return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
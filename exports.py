@@ -0,0 +1,334 @@
+"""
+Streaming Exports for AION HR System
+Row generators for CSV / XLSX exports of candidates and jobs in bounded memory
+"""
+
+import csv
+import io
+import json
+import math
+import os
+import re
+import zipfile
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional
+from xml.sax.saxutils import escape
+
+
+DB_FOLDER = os.path.join(os.path.dirname(__file__), 'db')
+
+CANDIDATE_COLUMNS = [
+    'id', 'name', 'email', 'phone', 'job_id', 'job_title', 'department', 'position', 'status',
+    'match_score', 'applied_date', 'shortlisted_date', 'interview_date', 'hired_date',
+    'onboarding_status', 'probation_status', 'skills', 'experience', 'education',
+    'certifications', 'linkedin', 'github',
+]
+
+JOB_COLUMNS = [
+    'job_id', 'job_title', 'department', 'seniority_level', 'job_type', 'job_location',
+    'job_openings', 'job_lead_time', 'salary_range', 'status', 'posted_at', 'job_posted_by',
+    'auto_shortlisting', 'match_score',
+]
+
+# Fields never exported even when explicitly requested
+EXCLUDED_FIELDS = {'debug_extract', 'password'}
+
+ROWS_PER_CHUNK = 200
+READ_CHUNK_SIZE = 64 * 1024
+
+# End of a bare scalar element (number, true, false, null)
+_SCALAR_END = re.compile(r'[,\]\s]')
+
+
+def iter_json_array(path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Only the current element (plus one read chunk) is held in memory, so files far larger
+    than RAM-friendly json.load sizes can be walked.
+    """
+    if not os.path.exists(path):
+        return
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ''
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace and separators
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buf) or eof:
+                    break
+                buf, pos = f.read(chunk_size), 0
+                eof = not buf
+            if pos >= len(buf):
+                return
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError(f"{path} does not contain a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            # A bare scalar cut at the chunk end would decode as a shorter value ('12' of '1234')
+            if buf[pos] not in '{["':
+                while not _SCALAR_END.search(buf, pos):
+                    more = f.read(chunk_size)
+                    if not more:
+                        break
+                    buf, pos = buf[pos:] + more, 0
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError:
+                    more = f.read(chunk_size)
+                    if not more:
+                        raise
+                    buf = buf[pos:] + more
+                    pos = 0
+            yield item
+            buf, pos = buf[end:], 0
+
+
+# Leading characters that make Excel / Sheets evaluate a cell as a formula
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _plain_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return '; '.join(str(_plain_value(v)) for v in value if v not in (None, ''))
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _cell_value(value: Any) -> Any:
+    """Export cell for a stored value; text that would be read as a formula is quoted with '"""
+    value = _plain_value(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def resolve_columns(requested: Optional[str], default: List[str]) -> List[str]:
+    """Parse a comma separated projection (?fields=a,b,c); falls back to the default columns"""
+    if not requested:
+        return list(default)
+    columns = [c.strip() for c in requested.split(',') if c.strip()]
+    columns = [c for c in dict.fromkeys(columns) if c not in EXCLUDED_FIELDS]
+    return columns or list(default)
+
+
+def _load_jobs() -> Dict[str, Dict]:
+    return {str(j.get('job_id')): j for j in iter_json_array(os.path.join(DB_FOLDER, 'jobs.json'))}
+
+
+def _values(raw) -> List[str]:
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        raw = [raw]
+    return [v.strip().lower() for item in raw for v in str(item).split(',') if v.strip()]
+
+
+def iter_candidate_rows(columns: List[str], filters: Optional[Dict[str, Any]] = None) -> Iterator[List[Any]]:
+    """
+    Yield projected candidate rows matching the filters.
+
+    Supported filters: status, job_id, department (comma separated, case-insensitive),
+    min_score / max_score (match score bounds).
+    """
+    filters = filters or {}
+    statuses = set(_values(filters.get('status')))
+    job_ids = set(_values(filters.get('job_id')))
+    departments = set(_values(filters.get('department')))
+    min_score = filters.get('min_score')
+    max_score = filters.get('max_score')
+    job_by_id = _load_jobs()
+    for c in iter_json_array(os.path.join(DB_FOLDER, 'candidates.json')):
+        job = job_by_id.get(str(c.get('job_id')), {})
+        department = c.get('department') or job.get('department') or ''
+        if statuses and str(c.get('status', '')).lower() not in statuses:
+            continue
+        if job_ids and str(c.get('job_id', '')).lower() not in job_ids:
+            continue
+        if departments and department.lower() not in departments:
+            continue
+        try:
+            score = float(c.get('match_score') or 0)
+        except (TypeError, ValueError):
+            score = 0
+        if min_score is not None and score < min_score:
+            continue
+        if max_score is not None and score > max_score:
+            continue
+        row = []
+        for col in columns:
+            if col == 'department':
+                row.append(department)
+            elif col == 'job_title':
+                row.append(_cell_value(c.get('job_title') or job.get('job_title')))
+            else:
+                row.append(_cell_value(c.get(col)))
+        yield row
+
+
+def iter_job_rows(columns: List[str], filters: Optional[Dict[str, Any]] = None) -> Iterator[List[Any]]:
+    """Yield projected job rows. Supported filters: status, department (comma separated)."""
+    filters = filters or {}
+    statuses = set(_values(filters.get('status')))
+    departments = set(_values(filters.get('department')))
+    for j in iter_json_array(os.path.join(DB_FOLDER, 'jobs.json')):
+        if statuses and str(j.get('status', '')).lower() not in statuses:
+            continue
+        if departments and str(j.get('department', '')).lower() not in departments:
+            continue
+        yield [_cell_value(j.get(col)) for col in columns]
+
+
+# ---------------- CSV ----------------
+def stream_csv(columns: List[str], rows: Iterable[List[Any]], rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator[bytes]:
+    """Encode rows as CSV, yielding a chunk every rows_per_chunk rows"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM so Excel detects UTF-8
+    buf.write('﻿')
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate(0)
+            pending = 0
+    yield buf.getvalue().encode('utf-8')
+
+
+# ---------------- XLSX ----------------
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _workbook_xml(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_cell(value: Any) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # NaN / inf have no SpreadsheetML number form; Excel rejects <v>nan</v> as corrupt
+        if isinstance(value, float) and not math.isfinite(value):
+            return '<c/>'
+        return f'<c><v>{value}</v></c>'
+    text = _ILLEGAL_XML_CHARS.sub('', str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values: List[Any]) -> str:
+    return '<row>' + ''.join(_xlsx_cell(v) for v in values) + '</row>'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable stream that collects bytes until drained"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_xlsx(columns: List[str], rows: Iterable[List[Any]], sheet_name: str = 'Export',
+                rows_per_chunk: int = ROWS_PER_CHUNK) -> Iterator[bytes]:
+    """
+    Encode rows as a single-sheet XLSX workbook, streamed.
+
+    The zip is written to a non-seekable sink (entries use data descriptors) and the
+    worksheet uses inline strings, so nothing but the current batch is buffered.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _ROOT_RELS)
+        zf.writestr('xl/workbook.xml', _workbook_xml(sheet_name))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(columns)
+            ).encode('utf-8'))
+            pending = []
+            for row in rows:
+                pending.append(_xlsx_row(row))
+                if len(pending) >= rows_per_chunk:
+                    sheet.write(''.join(pending).encode('utf-8'))
+                    pending = []
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write((''.join(pending) + '</sheetData></worksheet>').encode('utf-8'))
+        data = sink.drain()
+        if data:
+            yield data
+    yield sink.drain()
+
+
+EXPORT_FORMATS: Dict[str, Dict[str, Any]] = {
+    'csv': {'mimetype': 'text/csv; charset=utf-8', 'writer': stream_csv},
+    'xlsx': {'mimetype': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'writer': stream_xlsx},
+}
+
+
+def export_stream(fmt: str, columns: List[str], rows: Iterable[List[Any]], sheet_name: str = 'Export') -> Iterator[bytes]:
+    writer: Callable = EXPORT_FORMATS[fmt]['writer']
+    if fmt == 'xlsx':
+        return writer(columns, rows, sheet_name=sheet_name)
+    return writer(columns, rows)
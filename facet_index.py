@@ -0,0 +1,261 @@
+"""
+Faceted Count Index for AION HR System
+Bitmap indexes over candidate and job attributes for filter UIs
+"""
+
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Any, Optional
+
+from change_events import change_events, CANDIDATES_SAVED, JOBS_SAVED
+
+
+# Match score bands (inclusive lower bound, label), checked top-down
+MATCH_SCORE_BANDS = [
+    (75, '75-100'),
+    (50, '50-74'),
+    (25, '25-49'),
+    (0, '0-24'),
+]
+
+
+def match_score_band(score) -> str:
+    try:
+        value = float(score)
+    except (TypeError, ValueError):
+        return 'Unscored'
+    for lower, label in MATCH_SCORE_BANDS:
+        if value >= lower:
+            return label
+    return MATCH_SCORE_BANDS[-1][1]
+
+
+class BitmapFacetIndex:
+    """
+    Keeps one integer bitmap per (facet, value). Every document owns a bit slot, so
+    filter combinations are bitwise AND/OR and counts are popcounts - the cost depends
+    on the number of facet values, not on walking the documents.
+    """
+
+    def __init__(self, facets: List[str], extractor: Callable[[Dict], Dict[str, str]], key: str):
+        self.facets = list(facets)
+        self.extractor = extractor
+        self.key = key
+        self.lock = threading.RLock()
+        self.bitmaps: Dict[str, Dict[str, int]] = {f: {} for f in self.facets}
+        self.slots: Dict[str, int] = {}            # document key -> bit slot
+        self.values: Dict[str, Dict[str, str]] = {}  # document key -> facet values
+        self.free_slots: List[int] = []
+        self.next_slot = 0
+        self.all_bits = 0
+
+    def _doc_key(self, doc: Dict) -> Optional[str]:
+        value = doc.get(self.key)
+        return None if value is None else str(value)
+
+    def _set_bit(self, facet: str, value: str, bit: int):
+        bucket = self.bitmaps[facet]
+        bucket[value] = bucket.get(value, 0) | bit
+
+    def _clear_bit(self, facet: str, value: str, bit: int):
+        bucket = self.bitmaps[facet]
+        remaining = bucket.get(value, 0) & ~bit
+        if remaining:
+            bucket[value] = remaining
+        else:
+            bucket.pop(value, None)
+
+    def upsert(self, doc: Dict):
+        doc_key = self._doc_key(doc)
+        if doc_key is None:
+            return
+        new_values = self.extractor(doc)
+        with self.lock:
+            old_values = self.values.get(doc_key)
+            if old_values == new_values:
+                return
+            slot = self.slots.get(doc_key)
+            if slot is None:
+                slot = self.free_slots.pop() if self.free_slots else self.next_slot
+                if slot == self.next_slot:
+                    self.next_slot += 1
+                self.slots[doc_key] = slot
+                self.all_bits |= (1 << slot)
+            bit = 1 << slot
+            for facet in self.facets:
+                old = old_values.get(facet) if old_values else None
+                new = new_values.get(facet)
+                if old == new:
+                    continue
+                if old is not None:
+                    self._clear_bit(facet, old, bit)
+                if new is not None:
+                    self._set_bit(facet, new, bit)
+            self.values[doc_key] = new_values
+
+    def remove(self, doc_key):
+        doc_key = str(doc_key)
+        with self.lock:
+            slot = self.slots.pop(doc_key, None)
+            if slot is None:
+                return
+            bit = 1 << slot
+            for facet, value in self.values.pop(doc_key, {}).items():
+                if value is not None:
+                    self._clear_bit(facet, value, bit)
+            self.all_bits &= ~bit
+            self.free_slots.append(slot)
+
+    def sync(self, docs: Iterable[Dict]):
+        with self.lock:
+            seen = set()
+            for doc in docs:
+                self.upsert(doc)
+                doc_key = self._doc_key(doc)
+                if doc_key is not None:
+                    seen.add(doc_key)
+            for doc_key in [k for k in self.slots if k not in seen]:
+                self.remove(doc_key)
+
+    def _facet_mask(self, facet: str, wanted: Iterable[str]) -> int:
+        bucket = self.bitmaps.get(facet, {})
+        mask = 0
+        for value in wanted:
+            mask |= bucket.get(str(value), 0)
+        return mask
+
+    def matching(self, filters: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        """Keys of the documents matching a filter combination (same semantics as counts)"""
+        filters = {f: v for f, v in (filters or {}).items() if f in self.bitmaps and v}
+        with self.lock:
+            matched = self.all_bits
+            for facet, wanted in filters.items():
+                matched &= self._facet_mask(facet, wanted)
+            return [doc_key for doc_key, slot in self.slots.items() if matched >> slot & 1]
+
+    def counts(self, filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """
+        Count documents per facet value under a filter combination.
+
+        Values inside one facet are OR-ed, facets are AND-ed. Each facet's own counts
+        ignore that facet's filter so the UI can show how many results every
+        alternative value would give.
+        """
+        filters = {f: v for f, v in (filters or {}).items() if f in self.bitmaps and v}
+        with self.lock:
+            masks = {f: self._facet_mask(f, v) for f, v in filters.items()}
+            matched = self.all_bits
+            for mask in masks.values():
+                matched &= mask
+            result = {'total': matched.bit_count(), 'facets': {}}
+            for facet in self.facets:
+                base = self.all_bits
+                for other, mask in masks.items():
+                    if other != facet:
+                        base &= mask
+                result['facets'][facet] = {
+                    value: (bits & base).bit_count()
+                    for value, bits in sorted(self.bitmaps[facet].items())
+                    if bits & base
+                }
+            return result
+
+
+class FacetService:
+    """Owns the candidate and job facet indexes and keeps them fresh from the JSON store"""
+
+    def __init__(self, db_folder: Optional[str] = None):
+        self.db_folder = db_folder or os.path.join(os.path.dirname(__file__), 'db')
+        self.candidate_file = os.path.join(self.db_folder, 'candidates.json')
+        self.job_file = os.path.join(self.db_folder, 'jobs.json')
+        self.lock = threading.RLock()
+        self.job_by_id: Dict[str, Dict] = {}
+        self.candidates = BitmapFacetIndex(
+            ['status', 'department', 'job', 'seniority_level', 'match_score_band'],
+            self._candidate_values, 'id')
+        self.jobs = BitmapFacetIndex(
+            ['status', 'department', 'seniority_level', 'job_type'],
+            self._job_values, 'job_id')
+        self._candidate_sig = None
+        self._job_sig = None
+
+    @staticmethod
+    def _file_sig(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read(path) -> List[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return []
+
+    def _candidate_values(self, c: Dict) -> Dict[str, str]:
+        job = self.job_by_id.get(str(c.get('job_id')), {})
+        return {
+            'status': c.get('status') or 'Unknown',
+            'department': c.get('department') or job.get('department') or 'Unknown',
+            'job': str(c.get('job_id')) if c.get('job_id') is not None else 'Unknown',
+            'seniority_level': job.get('seniority_level') or 'Unknown',
+            'match_score_band': match_score_band(c.get('match_score')),
+        }
+
+    @staticmethod
+    def _job_values(j: Dict) -> Dict[str, str]:
+        return {
+            'status': j.get('status') or 'Unknown',
+            'department': j.get('department') or 'Unknown',
+            'seniority_level': j.get('seniority_level') or 'Unknown',
+            'job_type': j.get('job_type') or 'Unknown',
+        }
+
+    def sync_jobs(self, jobs: List[Dict]):
+        with self.lock:
+            self.job_by_id = {str(j.get('job_id')): j for j in jobs}
+            self.jobs.sync(jobs)
+            self._job_sig = self._file_sig(self.job_file)
+            # Candidate department / seniority derive from jobs
+            self._candidate_sig = None
+
+    def sync_candidates(self, candidates: List[Dict]):
+        with self.lock:
+            self.candidates.sync(candidates)
+            self._candidate_sig = self._file_sig(self.candidate_file)
+
+    def refresh(self):
+        with self.lock:
+            job_sig = self._file_sig(self.job_file)
+            if job_sig != self._job_sig:
+                self.sync_jobs(self._read(self.job_file))
+            cand_sig = self._file_sig(self.candidate_file)
+            if cand_sig != self._candidate_sig:
+                self.sync_candidates(self._read(self.candidate_file))
+
+    def candidate_counts(self, filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        self.refresh()
+        return self.candidates.counts(filters)
+
+    def job_counts(self, filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        self.refresh()
+        return self.jobs.counts(filters)
+
+    def candidate_ids(self, filters: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        self.refresh()
+        return self.candidates.matching(filters)
+
+    def job_ids(self, filters: Optional[Dict[str, List[str]]] = None) -> List[str]:
+        self.refresh()
+        return self.jobs.matching(filters)
+
+
+# Global facet service instance
+facet_index = FacetService()
+
+change_events.subscribe(CANDIDATES_SAVED, lambda e: facet_index.sync_candidates(e.data['candidates']))
+change_events.subscribe(JOBS_SAVED, lambda e: facet_index.sync_jobs(e.data['jobs']))
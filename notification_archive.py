@@ -0,0 +1,206 @@
+"""
+Notification Archive for AION HR System
+Retention policy that moves settled notifications into compressed monthly segments
+"""
+
+import datetime
+import gzip
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from notification_store import is_pending, is_unread
+
+
+# Settled notifications (read / decided, nothing pending) older than this are archived
+RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+
+ARCHIVE_FOLDER = os.path.join(os.path.dirname(__file__), 'db', 'archive', 'notifications')
+
+SEGMENT_RE = re.compile(r'^(\d{4}-\d{2})\.jsonl\.gz$')
+
+# Highest notification id / seq ever archived; ids and seqs are never reissued below it
+HIGH_WATER_FILE = 'high_water.json'
+
+# Timestamps that mark activity on a notification; the latest one counts for retention
+ACTIVITY_FIELDS = ['timestamp', 'read_at', 'approved_at', 'auto_completed_at']
+
+
+def _parse(ts) -> Optional[datetime.datetime]:
+    try:
+        dt = datetime.datetime.fromisoformat(ts)
+    except (TypeError, ValueError):
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+def last_activity(notification: Dict[str, Any]) -> Optional[datetime.datetime]:
+    stamps = [_parse(notification.get(f)) for f in ACTIVITY_FIELDS]
+    stamps = [s for s in stamps if s]
+    return max(stamps) if stamps else None
+
+
+def is_archivable(notification: Dict[str, Any], cutoff: datetime.datetime) -> bool:
+    if is_unread(notification) or is_pending(notification):
+        return False
+    last = last_activity(notification)
+    return bool(last and last < cutoff)
+
+
+def segment_month(notification: Dict[str, Any]) -> str:
+    """Archive segment (YYYY-MM) a notification belongs to, by creation time"""
+    created = _parse(notification.get('timestamp')) or last_activity(notification)
+    return created.strftime('%Y-%m') if created else '0000-00'
+
+
+def segment_path(month: str, folder: Optional[str] = None) -> str:
+    return os.path.join(folder or ARCHIVE_FOLDER, f"{month}.jsonl.gz")
+
+
+def split_for_archive(notes: List[Dict[str, Any]], retention_days: int = RETENTION_DAYS,
+                      now: Optional[datetime.datetime] = None) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+    """Split notifications into (kept, {month: archivable})"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    cutoff = now - datetime.timedelta(days=retention_days)
+    kept: List[Dict] = []
+    by_month: Dict[str, List[Dict]] = {}
+    for n in notes:
+        if is_archivable(n, cutoff):
+            by_month.setdefault(segment_month(n), []).append(n)
+        else:
+            kept.append(n)
+    return kept, by_month
+
+
+def append_segments(by_month: Dict[str, List[Dict]], folder: Optional[str] = None) -> int:
+    """
+    Append notifications to their monthly segments.
+
+    Each call adds one gzip member to the segment file; gzip readers treat the members
+    as a single stream, so segments grow without being rewritten.
+    """
+    folder = folder or ARCHIVE_FOLDER
+    os.makedirs(folder, exist_ok=True)
+    written = 0
+    for month, items in sorted(by_month.items()):
+        payload = ''.join(json.dumps(n, ensure_ascii=False) + '\n' for n in items)
+        with gzip.open(segment_path(month, folder), 'at', encoding='utf-8') as f:
+            f.write(payload)
+        written += len(items)
+    return written
+
+
+def _high_water_of(notes: List[Dict[str, Any]]) -> Tuple[int, int]:
+    max_id = max((n.get('id') or 0 for n in notes if isinstance(n.get('id'), int)), default=0)
+    max_seq = max((n.get('seq', n.get('id')) or 0 for n in notes if isinstance(n.get('seq', n.get('id')), int)), default=0)
+    return max_id, max_seq
+
+
+def read_high_water(folder: Optional[str] = None) -> Tuple[int, int]:
+    """
+    (max id, max seq) of everything archived so far. Archives written before the mark
+    was recorded are scanned once and the result saved.
+    """
+    folder = folder or ARCHIVE_FOLDER
+    try:
+        with open(os.path.join(folder, HIGH_WATER_FILE), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return int(data.get('max_id', 0)), int(data.get('max_seq', 0))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read archive high-water mark, rescanning segments: {e}")
+    if not list_segments(folder):
+        return 0, 0
+    max_id, max_seq = _high_water_of(list(iter_archived(folder=folder)))
+    write_high_water(max_id, max_seq, folder)
+    return max_id, max_seq
+
+
+def write_high_water(max_id: int, max_seq: int, folder: Optional[str] = None):
+    """Raise the recorded mark (never lowers it)"""
+    folder = folder or ARCHIVE_FOLDER
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, HIGH_WATER_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        max_id = max(max_id, int(data.get('max_id', 0)))
+        max_seq = max(max_seq, int(data.get('max_seq', 0)))
+    except (OSError, ValueError):
+        pass
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'max_id': max_id, 'max_seq': max_seq}, f)
+    os.replace(tmp_path, path)
+
+
+def archive_notifications(load: Callable[[], List[Dict]], save: Callable[[List[Dict]], None],
+                          retention_days: int = RETENTION_DAYS, folder: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the retention policy: archive settled notifications past retention and compact
+    the hot store. Segments are written before the hot file so a crash can only leave
+    duplicates (ignored by readers), never lose notifications. The high-water mark is
+    recorded before the hot file shrinks, so a restart cannot reissue archived ids / seqs.
+    """
+    notes = load()
+    kept, by_month = split_for_archive(notes, retention_days)
+    archived = append_segments(by_month, folder) if by_month else 0
+    if archived:
+        write_high_water(*_high_water_of(notes), folder)
+        save(kept)
+    return {
+        'archived': archived,
+        'kept': len(kept),
+        'segments': sorted(by_month),
+        'retention_days': retention_days,
+    }
+
+
+def list_segments(folder: Optional[str] = None) -> List[Dict[str, Any]]:
+    folder = folder or ARCHIVE_FOLDER
+    if not os.path.isdir(folder):
+        return []
+    out = []
+    for name in sorted(os.listdir(folder)):
+        m = SEGMENT_RE.match(name)
+        if m:
+            out.append({'month': m.group(1), 'bytes': os.path.getsize(os.path.join(folder, name))})
+    return out
+
+
+def iter_archived(month: Optional[str] = None, since_month: Optional[str] = None,
+                  folder: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream archived notifications from one month, or all months (>= since_month), oldest first"""
+    seen = set()
+    for seg in list_segments(folder):
+        if month and seg['month'] != month:
+            continue
+        if since_month and seg['month'] < since_month:
+            continue
+        try:
+            with gzip.open(segment_path(seg['month'], folder), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    n = json.loads(line)
+                    if n.get('id') in seen:
+                        continue
+                    seen.add(n.get('id'))
+                    yield n
+        except (OSError, EOFError, ValueError) as e:
+            print(f"⚠️ Could not read archive segment {seg['month']}: {e}")
+
+
+def query_archive(predicate: Optional[Callable[[Dict[str, Any]], bool]] = None, month: Optional[str] = None,
+                  since_month: Optional[str] = None, limit: Optional[int] = None,
+                  folder: Optional[str] = None) -> List[Dict[str, Any]]:
+    out = []
+    for n in iter_archived(month=month, since_month=since_month, folder=folder):
+        if predicate and not predicate(n):
+            continue
+        out.append(n)
+        if limit and len(out) >= limit:
+            break
+    return out
@@ -0,0 +1,133 @@
+"""
+Notification Push Broker for AION HR System
+In-process fan-out of notification and candidate events to Server-Sent Events subscribers
+"""
+
+import json
+import queue
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from notification_store import notification_matches, role_matches
+
+
+# Events buffered per open stream before the client is told to resync
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_SECONDS = 20
+
+
+class Subscriber:
+    def __init__(self, username: str, role: str):
+        self.username = username
+        self.role = role
+        self.queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Client missed events; it will be asked to refetch once there is room
+            self.overflowed = True
+
+
+class NotificationBroker:
+    """Keeps the open notification streams and routes events to the matching users"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: Dict[int, Subscriber] = {}
+
+    def subscribe(self, username: str, role: str) -> Subscriber:
+        sub = Subscriber(username, role)
+        with self.lock:
+            self.subscribers[id(sub)] = sub
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self.lock:
+            self.subscribers.pop(id(sub), None)
+
+    def publish(self, event: str, notification: Dict[str, Any]):
+        """Push a notification event ('notification' or 'notification_updated') to its recipients"""
+        with self.lock:
+            targets = [s for s in self.subscribers.values()
+                       if notification_matches(notification, s.role, s.username)]
+        payload = {'event': event, 'data': notification}
+        for sub in targets:
+            sub.offer(payload)
+
+    def publish_routed(self, event: str, data: Dict[str, Any], for_roles: Iterable[str], usernames: Iterable[str]):
+        """
+        Push an event to the users a notification with one of these for_role / receiver
+        values would reach (e.g. candidate status changes for live pages)
+        """
+        for_roles = {r for r in for_roles if r}
+        usernames = {u for u in usernames if u}
+        with self.lock:
+            targets = [s for s in self.subscribers.values()
+                       if s.username in usernames or (s.role and any(role_matches(r, s.role) for r in for_roles))]
+        for sub in targets:
+            sub.offer({'event': event, 'data': data})
+
+    def publish_user(self, username: str, event: str, data: Dict[str, Any]):
+        """Push an event to every open stream of one user"""
+        with self.lock:
+            targets = [s for s in self.subscribers.values() if s.username == username]
+        for sub in targets:
+            sub.offer({'event': event, 'data': data})
+
+    def stream(self, sub: Subscriber, backlog: Optional[List[Dict[str, Any]]] = None,
+               keepalive: int = KEEPALIVE_SECONDS):
+        """
+        Yield SSE frames for a subscriber until the client disconnects.
+
+        backlog: {'event', 'data'} items the client missed while disconnected (replayed first)
+        """
+        try:
+            yield f"retry: 5000\nevent: ready\ndata: {json.dumps({'role': sub.role})}\n\n"
+            for item in backlog or []:
+                yield format_sse(item['event'], item['data'], item['data'].get('seq'))
+            while True:
+                if sub.overflowed:
+                    sub.overflowed = False
+                    with sub.queue.mutex:
+                        sub.queue.queue.clear()
+                    yield "event: resync\ndata: {}\n\n"
+                    continue
+                try:
+                    item = sub.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    break
+                data = item['data']
+                yield format_sse(item['event'], data, data.get('seq') if isinstance(data, dict) else None)
+        finally:
+            self.unsubscribe(sub)
+
+    def close_all(self):
+        with self.lock:
+            subs = list(self.subscribers.values())
+        for sub in subs:
+            sub.offer(None)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'subscribers': len(self.subscribers)}
+
+
+def format_sse(event: str, data: Any, event_id: Optional[Any] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+# Global broker instance
+notification_broker = NotificationBroker()
@@ -0,0 +1,331 @@
+"""
+Notification Store Index for AION HR System
+In-memory indexes over notifications.json keyed by routing role, receiver and candidate
+"""
+
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from change_events import change_events, NOTIFICATIONS_SAVED
+
+
+UNREAD_EXCLUDED = {'Read', 'read', 'Approved', 'Rejected'}
+# (role, username) pairs whose counts are kept up to date; the least recently read are dropped
+# (role and username come from cookies, so the set of pairs is not bounded by users.json)
+MAX_TRACKED_COUNTERS = int(os.getenv('NOTIFICATION_MAX_TRACKED_COUNTERS', '512'))
+FINAL_APPROVAL_TYPE = 'final_approval_complete'
+
+
+def base_role(role: Optional[str]) -> str:
+    return (role or '').split('(')[0].strip().lower()
+
+
+def role_matches(for_role: Optional[str], role: Optional[str]) -> bool:
+    """Routing rule between a notification's for_role and a user's role (prefix either way or same base role)"""
+    fr = for_role or ''
+    role = role or ''
+    return fr == role or role.startswith(fr) or fr.startswith(role) or base_role(fr) == base_role(role)
+
+
+def notification_matches(notification: Dict[str, Any], role: str, username: str) -> bool:
+    """Whether a notification is addressed to a user with the given role / username"""
+    return (role_matches(notification.get('for_role'), role) or
+            (username is not None and notification.get('receiver_username') == username))
+
+
+def is_pending(notification: Dict[str, Any]) -> bool:
+    """Awaiting a decision (approve / reject) from its recipient"""
+    return bool(notification.get('action_required')) and notification.get('status') not in ('Approved', 'Rejected')
+
+
+def is_unread(notification: Dict[str, Any]) -> bool:
+    """Unread rule of /api/notifications: final approvals show until read, others until read or decided"""
+    st = notification.get('status', 'Pending')
+    if notification.get('type') == FINAL_APPROVAL_TYPE:
+        return st not in ('Read', 'read')
+    return st not in UNREAD_EXCLUDED
+
+
+class NotificationStore:
+    """
+    Indexed, read-only view of notifications.json.
+
+    Routing keys are the distinct for_role strings; a user's role is resolved to the set
+    of keys it matches once (cached), so "notifications for this user" is a union of a few
+    id sets instead of string heuristics per notification. Also owns the id and change
+    sequence allocators so writers do not need max() scans.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(os.path.dirname(__file__), 'db', 'notifications.json')
+        self.lock = threading.RLock()
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_role_key: Dict[str, Set[int]] = {}
+        self.unread_by_role_key: Dict[str, Set[int]] = {}
+        self.by_receiver: Dict[str, Set[int]] = {}
+        self.unread_by_receiver: Dict[str, Set[int]] = {}
+        self.by_candidate: Dict[str, Set[int]] = {}
+        self.seq_log: List[Tuple[int, int]] = []   # (seq, id) ascending; stale rows skipped on read
+        self._role_key_cache: Dict[str, List[str]] = {}
+        # (role, username) -> {'unread', 'pending'}; created on first counts() call, then
+        # adjusted on every index change. LRU-bounded by MAX_TRACKED_COUNTERS
+        self.counters: "OrderedDict[Tuple[str, Optional[str]], Dict[str, int]]" = OrderedDict()
+        self.counter_listeners: List[Callable[[str, Optional[str], Dict[str, int]], None]] = []
+        self._changed_counters: Set[Tuple[str, Optional[str]]] = set()
+        self._max_id = 0
+        self._max_seq = 0
+        # Highest seq of notifications no longer in the hot file (archived); the cursor never goes below it
+        self._seq_floor = 0
+        self._file_sig = None
+
+    # ---------------- Maintenance ----------------
+    def _current_file_sig(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _add(index: Dict[str, Set[int]], key, nid: int):
+        index.setdefault(key, set()).add(nid)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[int]], key, nid: int):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(nid)
+            if not bucket:
+                del index[key]
+
+    def _adjust_counters(self, n: Dict[str, Any], sign: int):
+        if not self.counters:
+            return
+        unread = is_unread(n)
+        pending = is_pending(n)
+        if not (unread or pending):
+            return
+        for pair, counts in self.counters.items():
+            if notification_matches(n, pair[0], pair[1]):
+                counts['unread'] += sign * unread
+                counts['pending'] += sign * pending
+                self._changed_counters.add(pair)
+
+    def _unindex(self, nid: int):
+        old = self.by_id.pop(nid, None)
+        if old is None:
+            return
+        self._adjust_counters(old, -1)
+        key = old.get('for_role') or ''
+        self._discard(self.by_role_key, key, nid)
+        self._discard(self.unread_by_role_key, key, nid)
+        receiver = old.get('receiver_username')
+        if receiver:
+            self._discard(self.by_receiver, receiver, nid)
+            self._discard(self.unread_by_receiver, receiver, nid)
+        self._discard(self.by_candidate, str(old.get('candidate_id')), nid)
+
+    def _index(self, n: Dict[str, Any]):
+        nid = n.get('id')
+        if nid is None:
+            return
+        old_seq = self.by_id[nid].get('seq', nid) if nid in self.by_id else None
+        self._unindex(nid)
+        n = dict(n)
+        self.by_id[nid] = n
+        key = n.get('for_role') or ''
+        if key not in self.by_role_key:
+            self._role_key_cache.clear()
+        self._add(self.by_role_key, key, nid)
+        unread = is_unread(n)
+        if unread:
+            self._add(self.unread_by_role_key, key, nid)
+        receiver = n.get('receiver_username')
+        if receiver:
+            self._add(self.by_receiver, receiver, nid)
+            if unread:
+                self._add(self.unread_by_receiver, receiver, nid)
+        self._add(self.by_candidate, str(n.get('candidate_id')), nid)
+        self._adjust_counters(n, 1)
+        seq = n.get('seq', nid)
+        if seq != old_seq:
+            if not self.seq_log or seq >= self.seq_log[-1][0]:
+                self.seq_log.append((seq, nid))
+            else:
+                bisect.insort(self.seq_log, (seq, nid))
+        self._max_id = max(self._max_id, nid)
+        self._max_seq = max(self._max_seq, seq)
+
+    def sync(self, notes: Iterable[Dict[str, Any]]):
+        """Bring the indexes in line with the full notification list after a write"""
+        with self.lock:
+            seen = set()
+            for n in notes:
+                nid = n.get('id')
+                if nid is None:
+                    continue
+                seen.add(nid)
+                old = self.by_id.get(nid)
+                if old is None or old != n:
+                    self._index(n)
+            for nid in [i for i in self.by_id if i not in seen]:
+                self._unindex(nid)
+            if len(self.seq_log) > 2 * max(len(self.by_id), 64):
+                self.seq_log = sorted((n.get('seq', i), i) for i, n in self.by_id.items())
+            self._file_sig = self._current_file_sig()
+            changed, self._changed_counters = self._changed_counters, set()
+            for pair in changed:
+                if pair not in self.counters:
+                    continue
+                counts = dict(self.counters[pair])
+                for listener in self.counter_listeners:
+                    try:
+                        listener(pair[0], pair[1], counts)
+                    except Exception as e:
+                        print('Notification counter listener error:', e)
+
+    def refresh(self):
+        """Reload from disk if notifications.json changed outside sync()"""
+        sig = self._current_file_sig()
+        if sig == self._file_sig:
+            return
+        notes = []
+        if sig is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    notes = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Notification store could not read notifications: {e}")
+                return
+        for n in notes:
+            n.setdefault('seq', n.get('id', 0))
+        self.sync(notes)
+
+    # ---------------- Allocators ----------------
+    def allocate_id(self) -> int:
+        self.refresh()
+        with self.lock:
+            self._max_id += 1
+            return self._max_id
+
+    def allocate_seq(self, count: int = 1) -> int:
+        """Reserve `count` change sequence numbers; returns the first"""
+        self.refresh()
+        with self.lock:
+            first = self._max_seq + 1
+            self._max_seq += count
+            return first
+
+    def raise_high_water(self, max_id: int, max_seq: int):
+        """Never allocate ids / seqs at or below these (taken by archived notifications)"""
+        with self.lock:
+            self._max_id = max(self._max_id, max_id)
+            self._max_seq = max(self._max_seq, max_seq)
+            self._seq_floor = max(self._seq_floor, max_seq)
+
+    def cursor(self) -> int:
+        """Highest change sequence currently stored (or archived)"""
+        self.refresh()
+        with self.lock:
+            return max(self.seq_log[-1][0] if self.seq_log else 0, self._seq_floor)
+
+    # ---------------- Queries ----------------
+    def role_keys(self, role: str) -> List[str]:
+        """for_role values routed to `role` (computed once per role and key set)"""
+        self.refresh()
+        with self.lock:
+            keys = self._role_key_cache.get(role)
+            if keys is None:
+                keys = [k for k in self.by_role_key if role_matches(k, role)]
+                self._role_key_cache[role] = keys
+            return keys
+
+    def _ids_for(self, role: str, username: Optional[str], unread_only: bool) -> Set[int]:
+        role_index = self.unread_by_role_key if unread_only else self.by_role_key
+        receiver_index = self.unread_by_receiver if unread_only else self.by_receiver
+        ids: Set[int] = set()
+        for key in self.role_keys(role):
+            ids |= role_index.get(key, set())
+        if username:
+            ids |= receiver_index.get(username, set())
+        return ids
+
+    def for_user(self, role: str, username: Optional[str], unread_only: bool = True) -> List[Dict[str, Any]]:
+        """Notifications addressed to a user (copies), optionally only unread ones"""
+        self.refresh()
+        with self.lock:
+            return [dict(self.by_id[i]) for i in self._ids_for(role, username, unread_only)]
+
+    def changed_since(self, since: int, role: str, username: Optional[str]) -> List[Dict[str, Any]]:
+        """Notifications for a user inserted or changed after `since`, oldest change first"""
+        self.refresh()
+        with self.lock:
+            start = bisect.bisect_right(self.seq_log, (since, float('inf')))
+            out = []
+            for seq, nid in self.seq_log[start:]:
+                n = self.by_id.get(nid)
+                if n is None or n.get('seq', nid) != seq:
+                    continue
+                if notification_matches(n, role, username):
+                    out.append(dict(n))
+            return out
+
+    def counts(self, role: str, username: Optional[str]) -> Dict[str, int]:
+        """Unread and pending-decision counts for a user; O(1) while the pair is tracked"""
+        self.refresh()
+        with self.lock:
+            pair = (role, username)
+            counts = self.counters.get(pair)
+            if counts is None:
+                matched = [self.by_id[i] for i in self._ids_for(role, username, unread_only=False)]
+                counts = self.counters[pair] = {
+                    'unread': sum(1 for n in matched if is_unread(n)),
+                    'pending': sum(1 for n in matched if is_pending(n)),
+                }
+                while len(self.counters) > MAX_TRACKED_COUNTERS:
+                    evicted, _ = self.counters.popitem(last=False)
+                    self._changed_counters.discard(evicted)
+            else:
+                self.counters.move_to_end(pair)
+            return dict(counts)
+
+    def on_counts_changed(self, listener: Callable[[str, Optional[str], Dict[str, int]], None]):
+        """Register listener(role, username, counts), called after a sync changes a tracked counter"""
+        self.counter_listeners.append(listener)
+
+    def for_candidate(self, candidate_id) -> List[Dict[str, Any]]:
+        self.refresh()
+        with self.lock:
+            return [dict(self.by_id[i]) for i in self.by_candidate.get(str(candidate_id), ())]
+
+    def get(self, notif_id: int) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        with self.lock:
+            n = self.by_id.get(notif_id)
+            return dict(n) if n else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        with self.lock:
+            return [dict(n) for n in self.by_id.values()]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'notifications': len(self.by_id),
+                'role_keys': len(self.by_role_key),
+                'receivers': len(self.by_receiver),
+                'candidates': len(self.by_candidate),
+                'cursor': max(self.seq_log[-1][0] if self.seq_log else 0, self._seq_floor),
+                'tracked_counters': len(self.counters),
+            }
+
+
+# Global notification store instance
+notification_store = NotificationStore()
+
+change_events.subscribe(NOTIFICATIONS_SAVED, lambda e: notification_store.sync(e.data['notifications']))
@@ -0,0 +1,101 @@
+"""
+Due-Time Scheduler for AION HR System
+Background thread that fires a callback for each key exactly when its due time is reached
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class DueTimeScheduler:
+    """
+    Min-heap of (due time, key) entries served by one daemon thread.
+
+    schedule() replaces any earlier entry for the same key; replaced and cancelled
+    entries stay in the heap and are skipped when they surface, so every operation is
+    O(log n) and the thread sleeps until the earliest live entry is due.
+    """
+
+    def __init__(self, fire: Callable[[Any], None], name: str = 'due-time-scheduler'):
+        self.fire = fire
+        self.name = name
+        self.cond = threading.Condition()
+        self.heap: List[Tuple[float, int, Any]] = []
+        self.live: Dict[Any, Tuple[float, int]] = {}  # key -> (due, token) of its current entry
+        self.counter = itertools.count()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+    def schedule(self, key, due: float):
+        """Fire `key` at epoch time `due` (replacing a previous schedule for it)"""
+        with self.cond:
+            token = next(self.counter)
+            self.live[key] = (due, token)
+            heapq.heappush(self.heap, (due, token, key))
+            if self.heap[0][1] == token:
+                self.cond.notify()
+
+    def cancel(self, key):
+        with self.cond:
+            self.live.pop(key, None)
+
+    def due_time(self, key) -> Optional[float]:
+        with self.cond:
+            entry = self.live.get(key)
+            return entry[0] if entry else None
+
+    def _pop_due(self) -> Tuple[Optional[Any], Optional[float]]:
+        """Return (key, None) for a due entry or (None, seconds to wait); call with the lock held"""
+        while self.heap:
+            due, token, key = self.heap[0]
+            if self.live.get(key) != (due, token):
+                heapq.heappop(self.heap)
+                continue
+            wait = due - time.time()
+            if wait > 0:
+                return None, wait
+            heapq.heappop(self.heap)
+            del self.live[key]
+            return key, None
+        return None, None
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.running:
+                    return
+                key, wait = self._pop_due()
+                if key is None:
+                    self.cond.wait(wait)
+                    continue
+            try:
+                self.fire(key)
+            except Exception as e:
+                print(f'{self.name} error for {key!r}:', e)
+
+    def start(self) -> bool:
+        """Start the worker thread; returns False if it was already running"""
+        with self.cond:
+            if self.running:
+                return False
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cond:
+            upcoming = sorted(v[0] for v in self.live.values())
+            return {
+                'running': self.running,
+                'scheduled': len(self.live),
+                'next_due_in_seconds': round(upcoming[0] - time.time(), 1) if upcoming else None,
+            }
@@ -0,0 +1,284 @@
+"""
+Candidate Search Index for AION HR System
+Inverted index over candidate profiles with ranked search and prefix autocomplete
+"""
+
+import bisect
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Any, Optional
+
+from change_events import change_events, CANDIDATES_SAVED
+
+
+# Relative weight of a term depending on the candidate field it came from
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'email': 2.0,
+    'position': 2.0,
+    'job_title': 2.0,
+    'skills': 2.5,
+    'certifications': 1.5,
+    'experience': 1.0,
+    'education': 1.0,
+    'projects': 1.0,
+    'transcripts': 0.5,
+}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Maximum number of vocabulary terms a trailing prefix may expand to
+MAX_PREFIX_EXPANSION = 50
+
+TOKEN_RE = re.compile(r"[a-z0-9]+[+#]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms (keeps 'c++' / 'c#' style suffixes)"""
+    if not text:
+        return []
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_as_text(v) for v in value)
+    if isinstance(value, dict):
+        return ' '.join(_as_text(v) for v in value.values())
+    return str(value)
+
+
+def candidate_fields(candidate: Dict) -> Dict[str, str]:
+    """Return the searchable text of a candidate grouped by field"""
+    fields = {}
+    for field in FIELD_WEIGHTS:
+        if field == 'transcripts':
+            rounds = candidate.get('interview_analysis') or []
+            fields[field] = ' '.join(
+                _as_text(r.get('transcript')) for r in rounds if isinstance(r, dict)
+            )
+        else:
+            fields[field] = _as_text(candidate.get(field))
+    return fields
+
+
+class CandidateSearchIndex:
+    def __init__(self, candidate_file: Optional[str] = None):
+        self.candidate_file = candidate_file or os.path.join(os.path.dirname(__file__), 'db', 'candidates.json')
+        self.lock = threading.RLock()
+        self.postings: Dict[str, Dict[int, float]] = {}   # term -> {candidate_id: weighted tf}
+        self.doc_terms: Dict[int, Dict[str, float]] = {}  # candidate_id -> {term: weighted tf}
+        self.doc_len: Dict[int, float] = {}
+        self.doc_sig: Dict[int, str] = {}
+        self.doc_meta: Dict[int, Dict[str, Any]] = {}
+        self.total_len = 0.0
+        self._vocab: List[str] = []
+        self._vocab_dirty = False
+        self._file_sig = None
+
+    # ---------------- Maintenance ----------------
+    def _current_file_sig(self):
+        try:
+            st = os.stat(self.candidate_file)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _remove_doc(self, doc_id: int):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            plist = self.postings.get(term)
+            if plist is not None:
+                plist.pop(doc_id, None)
+                if not plist:
+                    del self.postings[term]
+                    self._vocab_dirty = True
+        self.total_len -= self.doc_len.pop(doc_id, 0.0)
+        self.doc_sig.pop(doc_id, None)
+        self.doc_meta.pop(doc_id, None)
+
+    def index_candidate(self, candidate: Dict):
+        """Add or re-index a single candidate"""
+        try:
+            doc_id = int(candidate.get('id'))
+        except (TypeError, ValueError):
+            return
+        fields = candidate_fields(candidate)
+        sig = hashlib.md5(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+        with self.lock:
+            meta = {
+                'id': doc_id,
+                'name': candidate.get('name', ''),
+                'position': candidate.get('position') or candidate.get('job_title', ''),
+                'status': candidate.get('status', ''),
+                'job_id': candidate.get('job_id'),
+                'match_score': candidate.get('match_score'),
+            }
+            if self.doc_sig.get(doc_id) == sig:
+                self.doc_meta[doc_id] = meta
+                return
+            self._remove_doc(doc_id)
+            terms: Dict[str, float] = {}
+            for field, text in fields.items():
+                weight = FIELD_WEIGHTS[field]
+                for term in tokenize(text):
+                    terms[term] = terms.get(term, 0.0) + weight
+            email = (candidate.get('email') or '').strip().lower()
+            if email:
+                terms[email] = terms.get(email, 0.0) + FIELD_WEIGHTS['email']
+            for term, tf in terms.items():
+                plist = self.postings.get(term)
+                if plist is None:
+                    plist = self.postings[term] = {}
+                    self._vocab_dirty = True
+                plist[doc_id] = tf
+            length = sum(terms.values())
+            self.doc_terms[doc_id] = terms
+            self.doc_len[doc_id] = length
+            self.doc_sig[doc_id] = sig
+            self.doc_meta[doc_id] = meta
+            self.total_len += length
+
+    def remove_candidate(self, candidate_id):
+        try:
+            doc_id = int(candidate_id)
+        except (TypeError, ValueError):
+            return
+        with self.lock:
+            self._remove_doc(doc_id)
+
+    def sync(self, candidates: List[Dict]):
+        """Bring the index in line with a full candidate list, re-indexing only changed candidates"""
+        with self.lock:
+            seen = set()
+            for c in candidates:
+                self.index_candidate(c)
+                try:
+                    seen.add(int(c.get('id')))
+                except (TypeError, ValueError):
+                    continue
+            for doc_id in [d for d in self.doc_terms if d not in seen]:
+                self._remove_doc(doc_id)
+            self._file_sig = self._current_file_sig()
+
+    def refresh(self):
+        """Re-sync from candidates.json if it changed since the last sync"""
+        sig = self._current_file_sig()
+        if sig == self._file_sig:
+            return
+        candidates = []
+        if sig is not None:
+            try:
+                with open(self.candidate_file, 'r', encoding='utf-8') as f:
+                    candidates = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Search index could not read candidates: {e}")
+                return
+        self.sync(candidates)
+
+    def _vocabulary(self) -> List[str]:
+        if self._vocab_dirty:
+            self._vocab = sorted(self.postings)
+            self._vocab_dirty = False
+        return self._vocab
+
+    def _expand_prefix(self, prefix: str, limit: int = MAX_PREFIX_EXPANSION) -> List[str]:
+        vocab = self._vocabulary()
+        start = bisect.bisect_left(vocab, prefix)
+        out = []
+        for term in vocab[start:]:
+            if not term.startswith(prefix) or len(out) >= limit:
+                break
+            out.append(term)
+        return out
+
+    # ---------------- Queries ----------------
+    def search(self, query: str, limit: int = 20, prefix: bool = True) -> List[Dict[str, Any]]:
+        """
+        Ranked (BM25) search over all indexed candidate fields.
+
+        Args:
+            query: Free text query
+            limit: Maximum number of results
+            prefix: Treat the last query term as a prefix (search-as-you-type)
+        """
+        self.refresh()
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self.lock:
+            n_docs = len(self.doc_terms)
+            if not n_docs:
+                return []
+            avg_len = (self.total_len / n_docs) or 1.0
+            scores: Dict[int, float] = {}
+            matched: Dict[int, set] = {}
+            for i, term in enumerate(terms):
+                expansions = [term]
+                if prefix and i == len(terms) - 1:
+                    expansions = self._expand_prefix(term) or [term]
+                for exp in expansions:
+                    plist = self.postings.get(exp)
+                    if not plist:
+                        continue
+                    idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+                    # Exact matches outrank prefix completions
+                    boost = 1.0 if exp == term else 0.7
+                    for doc_id, tf in plist.items():
+                        norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc_id] / avg_len))
+                        scores[doc_id] = scores.get(doc_id, 0.0) + boost * idf * norm
+                        matched.setdefault(doc_id, set()).add(i)
+            # Prefer candidates matching every query term, then by score
+            ranked = sorted(scores, key=lambda d: (-len(matched[d]), -scores[d], d))[:limit]
+            results = []
+            for doc_id in ranked:
+                item = dict(self.doc_meta.get(doc_id, {'id': doc_id}))
+                item['score'] = round(scores[doc_id], 4)
+                item['matched_terms'] = len(matched[doc_id])
+                results.append(item)
+            return results
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Return index terms starting with prefix, most common first"""
+        self.refresh()
+        terms = tokenize(prefix)
+        if not terms:
+            return []
+        head = ' '.join(terms[:-1])
+        with self.lock:
+            completions = self._expand_prefix(terms[-1], limit=max(limit * 5, MAX_PREFIX_EXPANSION))
+            completions.sort(key=lambda t: (-len(self.postings.get(t, {})), t))
+            return [
+                {'term': f"{head} {t}".strip(), 'doc_count': len(self.postings.get(t, {}))}
+                for t in completions[:limit]
+            ]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'documents': len(self.doc_terms), 'terms': len(self.postings)}
+
+
+# Global search index instance
+search_index = CandidateSearchIndex()
+
+# Re-index changed candidates on every candidate write
+change_events.subscribe(CANDIDATES_SAVED, lambda e: search_index.sync(e.data['candidates']))
+
+
+def search_candidates(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """Convenience wrapper around the global index"""
+    return search_index.search(query, limit=limit)
+
+
+def autocomplete(prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    return search_index.autocomplete(prefix, limit=limit)
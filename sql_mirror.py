@@ -0,0 +1,304 @@
+"""
+SQLite Analytics Mirror for AION HR System
+Read-only in-memory SQL copy of candidates, jobs, status history and notifications for ad-hoc queries
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from chat_context import visible_notification
+from data_version import data_versions
+
+
+# Column name -> (SQL type, source field). Free text (transcripts, reports, CV extraction
+# output) and user records are not mirrored.
+CANDIDATE_COLUMNS = {
+    'id': ('INTEGER PRIMARY KEY', 'id'),
+    'name': ('TEXT', 'name'),
+    'email': ('TEXT', 'email'),
+    'position': ('TEXT', 'position'),
+    'status': ('TEXT', 'status'),
+    'previous_status': ('TEXT', 'previous_status'),
+    'job_id': ('TEXT', 'job_id'),
+    'department': ('TEXT', 'department'),
+    'applied_date': ('TEXT', 'applied_date'),
+    'match_score': ('REAL', 'match_score'),
+    'status_updated_by': ('TEXT', 'status_updated_by'),
+    'status_updated_at': ('TEXT', 'status_updated_at'),
+    'interview_date': ('TEXT', 'interview_date'),
+    'interview_time': ('TEXT', 'interview_time'),
+    'interviewer': ('TEXT', 'intervier'),
+    'interview_score': ('REAL', 'interview_score'),
+    'shortlisted_date': ('TEXT', 'shortlisted_date'),
+    'interview_scheduled_date': ('TEXT', 'interview_scheduled_date'),
+    'interviewed_date': ('TEXT', 'interviewed_date'),
+    'selected_date': ('TEXT', 'selected_date'),
+    'hired_date': ('TEXT', 'hired_date'),
+    'onboarding_date': ('TEXT', 'onboarding_date'),
+    'offered_salary': ('REAL', 'offered_salary'),
+    'negotiated_salary': ('REAL', 'negotiated_salary'),
+    'final_salary': ('REAL', 'final_salary'),
+    'benefits_package': ('REAL', 'benefits_package'),
+    'total_compensation': ('REAL', 'total_compensation'),
+    'salary_currency': ('TEXT', 'salary_currency'),
+    'salary_period': ('TEXT', 'salary_period'),
+    'onboarding_status': ('TEXT', 'onboarding_status'),
+    'onboarding_completion_date': ('TEXT', 'onboarding_completion_date'),
+    'probation_status': ('TEXT', 'probation_status'),
+    'probation_end_date': ('TEXT', 'probation_end_date'),
+    'performance_rating': ('TEXT', 'performance_rating'),
+}
+JOB_COLUMNS = {
+    'job_id': ('TEXT PRIMARY KEY', 'job_id'),
+    'job_title': ('TEXT', 'job_title'),
+    'department': ('TEXT', 'department'),
+    'status': ('TEXT', 'status'),
+    'job_openings': ('INTEGER', 'job_openings'),
+    'seniority_level': ('TEXT', 'seniority_level'),
+    'job_location': ('TEXT', 'job_location'),
+    'job_type': ('TEXT', 'job_type'),
+    'salary_range': ('TEXT', 'salary_range'),
+    'job_lead_time': ('INTEGER', 'job_lead_time'),
+    'job_posted_by': ('TEXT', 'job_posted_by'),
+    'posted_at': ('TEXT', 'posted_at'),
+}
+STATUS_HISTORY_COLUMNS = {
+    'candidate_id': ('INTEGER', 'candidate_id'),
+    'seq': ('INTEGER', 'seq'),
+    'from_status': ('TEXT', 'from_status'),
+    'to_status': ('TEXT', 'to_status'),
+    'updated_by': ('TEXT', 'updated_by'),
+    'updated_by_role': ('TEXT', 'updated_by_role'),
+    'updated_at': ('TEXT', 'updated_at'),
+    'update_type': ('TEXT', 'update_type'),
+}
+NOTIFICATION_COLUMNS = {
+    'id': ('INTEGER', 'id'),
+    'candidate_id': ('INTEGER', 'candidate_id'),
+    'candidate_name': ('TEXT', 'candidate_name'),
+    'position': ('TEXT', 'position'),
+    'type': ('TEXT', 'type'),
+    'status': ('TEXT', 'status'),
+    'for_role': ('TEXT', 'for_role'),
+    'receiver_username': ('TEXT', 'receiver_username'),
+    'from_role': ('TEXT', 'from_role'),
+    'from_user': ('TEXT', 'from_user'),
+    'message': ('TEXT', 'message'),
+    'timestamp': ('TEXT', 'timestamp'),
+    'priority': ('TEXT', 'priority'),
+    'action_required': ('INTEGER', 'action_required'),
+    'read_at': ('TEXT', 'read_at'),
+    'approved_by': ('TEXT', 'approved_by'),
+}
+
+TABLES = {
+    'candidates': CANDIDATE_COLUMNS,
+    'jobs': JOB_COLUMNS,
+    'status_history': STATUS_HISTORY_COLUMNS,
+    'notifications': NOTIFICATION_COLUMNS,
+}
+
+# Notifications are stored in a hidden table and only readable through the `notifications`
+# view, which keeps the rows the querying user may see (chat_context.visible_notification)
+HIDDEN_NOTIFICATIONS = '_notifications'
+HIDDEN_NOTIFICATION_COLUMNS = {**NOTIFICATION_COLUMNS, 'created_by': ('TEXT', 'created_by')}
+VISIBILITY_FIELDS = ('for_role', 'receiver_username', 'from_user', 'created_by')
+
+INDEXES = [
+    'CREATE INDEX idx_candidates_status ON candidates(status)',
+    'CREATE INDEX idx_candidates_job ON candidates(job_id)',
+    'CREATE INDEX idx_history_candidate ON status_history(candidate_id, seq)',
+    f'CREATE INDEX idx_notifications_candidate ON {HIDDEN_NOTIFICATIONS}(candidate_id)',
+]
+
+MAX_ROWS = 200
+DEFAULT_TIMEOUT = 2.0
+
+# Statement kinds a query may use; everything else (writes, ATTACH, PRAGMA, ...) is denied
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION}
+if hasattr(sqlite3, 'SQLITE_RECURSIVE'):
+    _ALLOWED_ACTIONS.add(sqlite3.SQLITE_RECURSIVE)
+
+
+class SQLQueryError(Exception):
+    """Raised for rejected, failing or timed-out mirror queries"""
+
+
+def schema_description() -> str:
+    """Tables and columns, as shown to the model in the run_sql tool description"""
+    return '; '.join(
+        f"{table}({', '.join(f'{col} {sql_type.split()[0]}' for col, (sql_type, _) in columns.items())})"
+        for table, columns in TABLES.items()
+    )
+
+
+def _value(sql_type: str, value: Any) -> Any:
+    if value is None or value in ('', 'None', 'null', 'Not specified'):
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    if sql_type.startswith('INTEGER') or sql_type == 'REAL':
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return int(number) if sql_type.startswith('INTEGER') and number.is_integer() else number
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _row(record: Dict, columns: Dict[str, Tuple[str, str]]) -> Tuple:
+    return tuple(_value(sql_type, record.get(field)) for sql_type, field in columns.values())
+
+
+class SQLMirror:
+    """
+    In-memory SQLite copy of the JSON store, rebuilt when the candidates, jobs or
+    notifications data version changes.
+
+    Queries run against the current copy with an authorizer that only permits reads,
+    a progress-handler deadline and a row cap, so the chatbot can compute exact
+    aggregates server-side instead of reasoning over rows in the prompt. Notifications
+    are filtered to what the querying user's role may see.
+    """
+
+    def __init__(self, db_folder: Optional[str] = None):
+        self.db_folder = db_folder or os.path.join(os.path.dirname(__file__), 'db')
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self._version = None
+        self.builds = 0
+        # User context of the running query (queries are serialized by self.lock)
+        self._viewer: Optional[Dict[str, str]] = None
+
+    def _read(self, filename: str) -> List[Dict]:
+        try:
+            with open(os.path.join(self.db_folder, filename), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return []
+
+    def _build(self) -> sqlite3.Connection:
+        candidates = self._read('candidates.json')
+        jobs = self._read('jobs.json')
+        notifications = self._read('notifications.json')
+        job_departments = {str(j.get('job_id')): j.get('department') for j in jobs}
+
+        history = []
+        for c in candidates:
+            c.setdefault('department', job_departments.get(str(c.get('job_id'))))
+            for seq, h in enumerate(c.get('status_history') or []):
+                if isinstance(h, dict):
+                    history.append({**h, 'candidate_id': c.get('id'), 'seq': seq})
+
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        stored = {**TABLES, HIDDEN_NOTIFICATIONS: HIDDEN_NOTIFICATION_COLUMNS}
+        del stored['notifications']
+        for table, columns in stored.items():
+            conn.execute(f"CREATE TABLE {table} ({', '.join(f'{col} {t[0]}' for col, t in columns.items())})")
+        placeholders = {table: ', '.join('?' * len(columns)) for table, columns in stored.items()}
+        # Duplicate primary keys in the JSON keep the last record
+        conn.executemany(f"INSERT OR REPLACE INTO candidates VALUES ({placeholders['candidates']})",
+                         [_row(c, CANDIDATE_COLUMNS) for c in candidates])
+        conn.executemany(f"INSERT OR REPLACE INTO jobs VALUES ({placeholders['jobs']})",
+                         [_row(j, JOB_COLUMNS) for j in jobs])
+        conn.executemany(f"INSERT INTO status_history VALUES ({placeholders['status_history']})",
+                         [_row(h, STATUS_HISTORY_COLUMNS) for h in history])
+        conn.executemany(f"INSERT INTO {HIDDEN_NOTIFICATIONS} VALUES ({placeholders[HIDDEN_NOTIFICATIONS]})",
+                         [_row(n, HIDDEN_NOTIFICATION_COLUMNS) for n in notifications])
+        for statement in INDEXES:
+            conn.execute(statement)
+        conn.create_function('visible_to_viewer', len(VISIBILITY_FIELDS), self._visible)
+        conn.execute(f"CREATE VIEW notifications AS SELECT {', '.join(NOTIFICATION_COLUMNS)} "
+                     f"FROM {HIDDEN_NOTIFICATIONS} WHERE visible_to_viewer({', '.join(VISIBILITY_FIELDS)})")
+        conn.commit()
+        conn.execute('PRAGMA query_only = ON')
+        conn.set_authorizer(self._authorize)
+        return conn
+
+    def _visible(self, *values) -> int:
+        return int(visible_notification(dict(zip(VISIBILITY_FIELDS, values)), self._viewer))
+
+    @staticmethod
+    def _authorize(action, arg1, arg2, db_name, source):
+        if action not in _ALLOWED_ACTIONS:
+            return sqlite3.SQLITE_DENY
+        # The hidden notifications table is only read through its filtering view
+        if action == sqlite3.SQLITE_READ and arg1 == HIDDEN_NOTIFICATIONS and source != 'notifications':
+            return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK
+
+    def refresh(self):
+        version = data_versions.snapshot('candidates', 'jobs', 'notifications')
+        with self.lock:
+            if self.conn is not None and version == self._version:
+                return
+            old, self.conn = self.conn, self._build()
+            self._version = version
+            self.builds += 1
+        if old is not None:
+            old.close()
+
+    def query(self, sql: str, max_rows: int = 50, timeout: float = DEFAULT_TIMEOUT,
+              user_context: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Run one read-only SELECT / WITH statement. The notifications table only has the
+        rows user_context may see (none without a user context).
+
+        Returns {'columns', 'rows', 'truncated', 'elapsed_ms'}; raises SQLQueryError for
+        anything that is not a single read, fails, or runs past `timeout` seconds.
+        """
+        sql = (sql or '').strip().rstrip(';').strip()
+        if not sql:
+            raise SQLQueryError('Empty query')
+        if ';' in sql:
+            raise SQLQueryError('Only a single SQL statement is allowed')
+        if sql.split(None, 1)[0].upper() not in ('SELECT', 'WITH'):
+            raise SQLQueryError('Only SELECT queries are allowed')
+        max_rows = max(1, min(int(max_rows or 50), MAX_ROWS))
+
+        self.refresh()
+        with self.lock:
+            conn = self.conn
+            self._viewer = user_context
+            deadline = time.monotonic() + timeout
+            conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 1000)
+            started = time.perf_counter()
+            try:
+                cursor = conn.execute(sql)
+                rows = cursor.fetchmany(max_rows + 1)
+                columns = [d[0] for d in cursor.description or []]
+            except sqlite3.OperationalError as e:
+                if 'interrupted' in str(e):
+                    raise SQLQueryError(f'Query exceeded the {timeout:g}s time limit') from e
+                raise SQLQueryError(str(e)) from e
+            except sqlite3.DatabaseError as e:
+                raise SQLQueryError(str(e)) from e
+            finally:
+                conn.set_progress_handler(None, 0)
+                self._viewer = None
+        return {
+            'columns': columns,
+            'rows': rows[:max_rows],
+            'truncated': len(rows) > max_rows,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        self.refresh()
+        with self.lock:
+            self._viewer = {'role': 'Admin'}
+            try:
+                counts = {t: self.conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0] for t in TABLES}
+            finally:
+                self._viewer = None
+        return {'tables': counts, 'builds': self.builds, 'version': list(self._version or ())}
+
+
+# Global SQL mirror instance
+sql_mirror = SQLMirror()
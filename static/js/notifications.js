@@ -4,6 +4,12 @@ class NotificationSystem {
         this.notifications = [];
         this.container = null;
         this.checkInterval = null;
+        this.eventSource = null;
+        this.streamFailed = false;
+        this.cursor = null; // highest notification seq seen (delta sync)
+        this.badge = null;
+        this.etag = null;
+        this.streamConnects = 0;
     this.audioEnabled = false;
     this.audioCtx = null;
     this.customAudioElement = null;
@@ -33,11 +39,22 @@ class NotificationSystem {
     async fetchNotifications() {
         try {
             console.log('Fetching notifications...');
-            const response = await fetch('/api/notifications');
+            // After the first load only ask for what changed since our cursor
+            const delta = this.cursor !== null;
+            const url = delta ? `/api/notifications?since=${this.cursor}` : '/api/notifications';
+            const headers = this.etag ? { 'If-None-Match': this.etag } : {};
+            const response = await fetch(url, { headers, cache: 'no-store' });
             console.log('Response status:', response.status);
+            if (response.status === 304) {
+                return [];
+            }
             if (response.ok) {
                 const data = await response.json();
                 console.log('Notifications data:', data);
+                this.etag = response.headers.get('ETag');
+                this.advanceCursor(data.cursor);
+                (data.updated || []).forEach(n => { this.handleUpdated(n); this.emitLive('notification_updated', n); });
+                if (delta) (data.notifications || []).forEach(n => this.emitLive('notification', n));
                 return data.notifications || [];
             } else {
                 console.error('Failed to fetch notifications, status:', response.status);
@@ -48,6 +65,12 @@ class NotificationSystem {
         return [];
     }
 
+    advanceCursor(seq) {
+        if (typeof seq === 'number' && (this.cursor === null || seq > this.cursor)) {
+            this.cursor = seq;
+        }
+    }
+
     async markAsRead(notificationId) {
         try {
             await fetch(`/api/notifications/${notificationId}/mark_read`, {
@@ -146,6 +169,10 @@ class NotificationSystem {
         console.log('Checking for new notifications...');
         const newNotifications = await this.fetchNotifications();
         console.log('Fetched notifications:', newNotifications);
+        this.handleIncoming(newNotifications);
+    }
+
+    handleIncoming(newNotifications) {
         const toShow = [];
         const nowMs = Date.now();
         for (const notification of newNotifications) {
@@ -179,19 +206,113 @@ class NotificationSystem {
         this.lastFetchTime = nowMs;
     }
 
+    async refreshCounts() {
+        try {
+            const response = await fetch('/api/notifications/count', { cache: 'no-store' });
+            if (response.ok) this.updateBadge(await response.json());
+        } catch (error) {
+            console.error('Error fetching notification counts:', error);
+        }
+    }
+
+    updateBadge(counts) {
+        // Badge shows decisions waiting on this user; tooltip carries the unread total
+        if (!this.badge) {
+            this.badge = document.createElement('div');
+            this.badge.className = 'notification-badge';
+            this.badge.addEventListener('click', () => { window.location.href = '/my_approvals'; });
+            document.body.appendChild(this.badge);
+        }
+        const pending = counts.pending || 0;
+        this.badge.textContent = pending > 99 ? '99+' : String(pending);
+        this.badge.title = `${pending} pending approval${pending === 1 ? '' : 's'}, ${counts.unread || 0} unread`;
+        this.badge.style.display = pending > 0 ? 'flex' : 'none';
+    }
+
+    emitLive(event, data) {
+        // Re-dispatch pushed events so page fragments (approvals, candidate profile) can patch themselves
+        document.dispatchEvent(new CustomEvent('aion:live', { detail: { event, data } }));
+    }
+
+    handleUpdated(notification) {
+        // Read / decided elsewhere (another tab or approver): drop the popup here too
+        if (['Read', 'read', 'Approved', 'Rejected'].includes(notification.status)) {
+            const el = document.querySelector(`[data-notification-id="${notification.id}"]`);
+            if (el && el.parentNode) el.parentNode.removeChild(el);
+        }
+    }
+
     startPeriodicCheck() {
-        // Check for new notifications every 10 seconds
+        // Initial check
+        this.checkForNewNotifications();
+
+        // Prefer the push stream; poll every 10 seconds only when it is unavailable
+        if (window.EventSource && !this.streamFailed) {
+            this.connectStream();
+            return;
+        }
+        this.startPolling();
+    }
+
+    startPolling() {
+        if (this.checkInterval) return;
+        this.refreshCounts();
         this.checkInterval = setInterval(() => {
             this.checkForNewNotifications();
+            this.refreshCounts();
         }, 10000);
+    }
 
-        // Initial check
-        this.checkForNewNotifications();
+    connectStream() {
+        if (this.eventSource) return;
+        const source = new EventSource('/api/notifications/stream');
+        this.eventSource = source;
+        // Reopened after the tab was hidden: pages may have missed candidate events meanwhile
+        if (this.streamConnects++ > 0) this.emitLive('resync', {});
+        source.addEventListener('notification', (e) => {
+            try {
+                const n = JSON.parse(e.data);
+                this.handleIncoming([n]);
+                this.advanceCursor(n.seq);
+                this.emitLive('notification', n);
+            } catch (err) { console.error('Bad notification event', err); }
+        });
+        source.addEventListener('notification_updated', (e) => {
+            try {
+                const n = JSON.parse(e.data);
+                this.handleUpdated(n);
+                this.advanceCursor(n.seq);
+                this.emitLive('notification_updated', n);
+            } catch (err) { console.error('Bad notification update', err); }
+        });
+        source.addEventListener('candidate_status', (e) => {
+            try { this.emitLive('candidate_status', JSON.parse(e.data)); } catch (err) { console.error('Bad candidate event', err); }
+        });
+        source.addEventListener('counts', (e) => {
+            try { this.updateBadge(JSON.parse(e.data)); } catch (err) { console.error('Bad counts event', err); }
+        });
+        source.addEventListener('resync', () => {
+            this.checkForNewNotifications();
+            this.emitLive('resync', {});
+        });
+        source.onerror = () => {
+            // EventSource reconnects on its own; fall back to polling if the server refused the stream
+            if (source.readyState === EventSource.CLOSED) {
+                this.eventSource = null;
+                this.streamFailed = true;
+                this.startPolling();
+            }
+        };
     }
 
     stopPeriodicCheck() {
         if (this.checkInterval) {
             clearInterval(this.checkInterval);
+            this.checkInterval = null;
+        }
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
         }
     }
 
@@ -0,0 +1,355 @@
+"""
+Teams Webhook Outbox for AION HR System
+Persistent outbox delivered by a background worker with batching, retries and a circuit breaker
+"""
+
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# Wait this long after the first queued card so bursts (e.g. a Hired fan-out) go as one digest
+BATCH_WINDOW_SECONDS = 2.0
+MAX_BATCH_SIZE = 10
+
+# Retry schedule: BACKOFF_BASE * 2^(attempt-1), capped, with +/-20% jitter
+BACKOFF_BASE_SECONDS = 5.0
+BACKOFF_MAX_SECONDS = 15 * 60
+MAX_ATTEMPTS = 8
+
+# Dead letters are kept for inspection only; the oldest are dropped beyond this many
+MAX_DEAD_LETTERS = 200
+
+# Circuit breaker per channel: open after N consecutive failures, probe again after cooldown
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN_SECONDS = 60.0
+
+REQUEST_TIMEOUT_SECONDS = 5.0
+
+# Entries carry a channel name, never the webhook URL: the URL is a secret and is resolved
+# from the environment only when posting
+TEAMS_CHANNEL = 'teams'
+CHANNEL_URL_ENV = {TEAMS_CHANNEL: 'TEAMS_WEBHOOK_URL'}
+
+
+def teams_card(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Adaptive Card message for one or more outbox items.
+
+    Each item: {'title', 'message', 'facts': [{'title', 'value'}], 'url'}. A single item
+    renders as before; several are rendered as a digest with one section per item.
+    """
+    if len(items) == 1:
+        item = items[0]
+        body = [
+            {"type": "TextBlock", "size": "Large", "weight": "Bolder", "text": item.get('title', 'Notification')},
+            {"type": "TextBlock", "wrap": True, "text": item.get('message', '')},
+            {"type": "FactSet", "facts": item.get('facts', [])},
+        ]
+        actions = [{"type": "Action.OpenUrl", "title": "View Candidate", "url": item.get('url')}] if item.get('url') else []
+    else:
+        body = [{"type": "TextBlock", "size": "Large", "weight": "Bolder", "text": f"{len(items)} new notifications"}]
+        for item in items:
+            section = [
+                {"type": "TextBlock", "weight": "Bolder", "text": item.get('title', 'Notification'), "separator": True},
+                {"type": "TextBlock", "wrap": True, "text": item.get('message', '')},
+                {"type": "FactSet", "facts": item.get('facts', [])},
+            ]
+            if item.get('url'):
+                section.append({"type": "ActionSet", "actions": [
+                    {"type": "Action.OpenUrl", "title": "View Candidate", "url": item['url']}
+                ]})
+            body.append({"type": "Container", "items": section})
+        actions = []
+    content = {
+        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+        "type": "AdaptiveCard",
+        "version": "1.4",
+        "msteams": {"width": "Full"},
+        "body": body,
+    }
+    if actions:
+        content["actions"] = actions
+    return {
+        "type": "message",
+        "attachments": [
+            {"contentType": "application/vnd.microsoft.card.adaptive", "contentUrl": None, "content": content}
+        ]
+    }
+
+
+class DeliveryError(Exception):
+    """Webhook post failed (connection error or HTTP error status)"""
+
+
+class HttpPoster:
+    """Posts JSON over one kept-alive connection per host"""
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self.connections: Dict[Tuple[str, str, Optional[int]], http.client.HTTPConnection] = {}
+
+    def _connection(self, parts) -> http.client.HTTPConnection:
+        key = (parts.scheme, parts.hostname, parts.port)
+        conn = self.connections.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+            conn = self.connections[key] = cls(parts.hostname, parts.port, timeout=self.timeout)
+        return conn
+
+    def post(self, url: str, payload: Dict[str, Any]):
+        parts = urlsplit(url)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        body = json.dumps(payload).encode('utf-8')
+        for attempt in range(2):
+            conn = self._connection(parts)
+            try:
+                conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.HTTPException, OSError) as e:
+                # Stale keep-alive socket: reconnect once before reporting a failure
+                conn.close()
+                self.connections.pop((parts.scheme, parts.hostname, parts.port), None)
+                if attempt == 0:
+                    continue
+                raise DeliveryError(str(e))
+            if resp.status >= 400:
+                raise DeliveryError(f"HTTP {resp.status}: {data[:200]!r}")
+            return
+
+    def close(self):
+        for conn in self.connections.values():
+            conn.close()
+        self.connections.clear()
+
+
+class CircuitBreaker:
+    """Per-channel breaker: closed -> open after repeated failures -> half-open after cooldown"""
+
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def allow(self, now: float) -> bool:
+        # Closed, or open long enough that one probe (half-open) may go through
+        return self.opened_at is None or now - self.opened_at >= self.cooldown
+
+    def reopen_at(self) -> float:
+        return (self.opened_at or 0) + self.cooldown
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = now
+
+    def state(self, now: float) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self.allow(now) else 'open'
+
+
+class TeamsOutbox:
+    """
+    Durable queue of Teams webhook posts.
+
+    enqueue() only appends to the outbox file and wakes the worker, so request threads
+    never wait on the webhook. The worker groups due entries per channel into digests,
+    retries failures with exponential backoff and parks a failing channel behind a
+    circuit breaker. Entries that exhaust MAX_ATTEMPTS move to the dead letter list.
+
+    channels maps channel names to webhook URLs; names missing from it fall back to the
+    environment variable in CHANNEL_URL_ENV.
+    """
+
+    def __init__(self, path: Optional[str] = None, poster: Optional[HttpPoster] = None,
+                 batch_window: float = BATCH_WINDOW_SECONDS, max_batch: int = MAX_BATCH_SIZE,
+                 clock: Callable[[], float] = time.time, channels: Optional[Dict[str, str]] = None):
+        self.path = path or os.path.join(os.path.dirname(__file__), 'db', 'teams_outbox.json')
+        self.poster = poster or HttpPoster()
+        self.channels = dict(channels or {})
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.clock = clock
+        self.cond = threading.Condition()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.sent = 0
+        self.state = self._load()
+
+    # ---------------- Persistence ----------------
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {'pending': [], 'dead': []}
+        state = {'pending': state.get('pending', []), 'dead': state.get('dead', [])}
+        # Older outbox files stored the webhook URL as the channel
+        for entry in state['pending'] + state['dead']:
+            if '://' in str(entry.get('channel', '')):
+                entry['channel'] = TEAMS_CHANNEL
+        del state['dead'][:-MAX_DEAD_LETTERS]
+        return state
+
+    def _persist(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    # ---------------- Producer ----------------
+    def enqueue(self, channel: str, item: Dict[str, Any]) -> str:
+        now = self.clock()
+        entry = {
+            'id': uuid.uuid4().hex,
+            'channel': channel,
+            'item': item,
+            'created_at': now,
+            'attempts': 0,
+            'next_attempt_at': now + self.batch_window,
+            'last_error': None,
+        }
+        with self.cond:
+            self.state['pending'].append(entry)
+            self._persist()
+            self.cond.notify()
+        return entry['id']
+
+    # ---------------- Worker ----------------
+    def _breaker(self, channel: str) -> CircuitBreaker:
+        breaker = self.breakers.get(channel)
+        if breaker is None:
+            breaker = self.breakers[channel] = CircuitBreaker()
+        return breaker
+
+    def _next_batch(self, now: float) -> Tuple[Optional[str], List[Dict[str, Any]], Optional[float]]:
+        """(channel, due entries) to send now, or (None, [], seconds until something is due)"""
+        wake_at = None
+        ready = []
+        by_channel: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self.state['pending']:
+            due = entry['next_attempt_at']
+            breaker = self._breaker(entry['channel'])
+            if not breaker.allow(now):
+                due = max(due, breaker.reopen_at())
+            # Cards still inside their batch window ride along with a channel's due card
+            if due <= now + self.batch_window:
+                by_channel.setdefault(entry['channel'], []).append(entry)
+            if due <= now:
+                ready.append(entry['channel'])
+            elif wake_at is None or due < wake_at:
+                wake_at = due
+        for channel in ready:
+            entries = sorted(by_channel[channel], key=lambda e: e['created_at'])
+            # A half-open breaker lets a single probe through
+            limit = 1 if self._breaker(channel).state(now) == 'half-open' else self.max_batch
+            return channel, entries[:limit], None
+        return None, [], (None if wake_at is None else max(0.0, wake_at - now))
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _channel_url(self, channel: str) -> Optional[str]:
+        url = self.channels.get(channel)
+        if url is None and channel in CHANNEL_URL_ENV:
+            url = os.getenv(CHANNEL_URL_ENV[channel])
+        return url or None
+
+    def _deliver(self, channel: str, entries: List[Dict[str, Any]]):
+        error = None
+        try:
+            url = self._channel_url(channel)
+            if url is None:
+                raise DeliveryError(f"No webhook URL configured for channel {channel!r}")
+            self.poster.post(url, teams_card([e['item'] for e in entries]))
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        now = self.clock()
+        ids = {e['id'] for e in entries}
+        with self.cond:
+            breaker = self._breaker(channel)
+            if error is None:
+                breaker.record_success()
+                self.state['pending'] = [e for e in self.state['pending'] if e['id'] not in ids]
+                self.sent += len(entries)
+            else:
+                breaker.record_failure(now)
+                print(f'Teams webhook send failed ({len(entries)} card(s)):', error)
+                keep = []
+                for e in self.state['pending']:
+                    if e['id'] in ids:
+                        e['attempts'] += 1
+                        e['last_error'] = error
+                        if e['attempts'] >= MAX_ATTEMPTS:
+                            self.state['dead'].append(e)
+                            continue
+                        e['next_attempt_at'] = now + self._backoff(e['attempts'])
+                    keep.append(e)
+                self.state['pending'] = keep
+                del self.state['dead'][:-MAX_DEAD_LETTERS]
+            self._persist()
+
+    def run_once(self) -> bool:
+        """Send one due batch if there is one; returns whether anything was attempted"""
+        with self.cond:
+            channel, entries, _ = self._next_batch(self.clock())
+        if not entries:
+            return False
+        self._deliver(channel, entries)
+        return True
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.running:
+                    return
+                channel, entries, wait = self._next_batch(self.clock())
+                if not entries:
+                    self.cond.wait(wait)
+                    continue
+            self._deliver(channel, entries)
+
+    def start(self) -> bool:
+        with self.cond:
+            if self.running:
+                return False
+            self.running = True
+        self.thread = threading.Thread(target=self._run, name='teams-outbox', daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.poster.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        with self.cond:
+            return {
+                'running': self.running,
+                'pending': len(self.state['pending']),
+                'dead': len(self.state['dead']),
+                'sent': self.sent,
+                'breakers': {ch: b.state(now) for ch, b in self.breakers.items()},
+            }
+
+
+# Global Teams outbox instance
+teams_outbox = TeamsOutbox()
@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from exports import _cell_value, _xlsx_row, iter_json_array
+
+
+ITEMS = [1234, -5.25e3, True, False, None, "text, with ] chars", {"a": [1, 22, {"b": None}]}, [333, 4444], 0]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64 * 1024])
+def test_scalars_and_containers_survive_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(ITEMS, indent=2))
+    assert list(iter_json_array(str(path), chunk_size=chunk_size)) == ITEMS
+
+
+def test_compact_array_with_chunk_size_one(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps(ITEMS, separators=(',', ':')))
+    assert list(iter_json_array(str(path), chunk_size=1)) == ITEMS
+
+
+def test_missing_file_yields_nothing(tmp_path):
+    assert list(iter_json_array(str(tmp_path / "missing.json"))) == []
+
+
+def test_non_finite_floats_become_empty_xlsx_cells():
+    row = _xlsx_row([float('nan'), float('inf'), -float('inf'), 1.5])
+    assert row == '<row><c/><c/><c/><c><v>1.5</v></c></row>'
+
+
+def test_formula_like_text_is_quoted():
+    assert _cell_value('=HYPERLINK("http://x")') == '\'=HYPERLINK("http://x")'
+    assert [_cell_value(v) for v in ('+1', '-2', '@SUM(A1)', ['=a', 'b'])] == ["'+1", "'-2", "'@SUM(A1)", "'=a; b"]
+    assert [_cell_value(v) for v in (-3, 'a=b', None)] == [-3, 'a=b', '']
@@ -0,0 +1,71 @@
+import json
+import os
+
+import notification_archive
+from notification_store import NotificationStore
+
+
+def _settled(nid):
+    return {'id': nid, 'seq': nid + 100, 'type': 'info', 'status': 'Read', 'for_role': 'HR',
+            'timestamp': '2020-01-15T09:00:00+00:00', 'read_at': '2020-01-16T09:00:00+00:00'}
+
+
+def _pending(nid):
+    return {'id': nid, 'seq': nid + 100, 'type': 'info', 'status': 'Pending', 'for_role': 'HR',
+            'timestamp': '2020-01-15T09:00:00+00:00'}
+
+
+def _file_store(tmp_path, notes):
+    path = tmp_path / 'notifications.json'
+    path.write_text(json.dumps(notes))
+
+    def load():
+        return json.loads(path.read_text())
+
+    def save(items):
+        path.write_text(json.dumps(items))
+
+    return str(path), load, save
+
+
+def test_ids_and_seqs_are_not_reused_after_archive_and_restart(tmp_path):
+    folder = str(tmp_path / 'archive')
+    path, load, save = _file_store(tmp_path, [_pending(1), _settled(2), _settled(3)])
+    result = notification_archive.archive_notifications(load, save, retention_days=30, folder=folder)
+    assert result['archived'] == 2
+    assert [n['id'] for n in load()] == [1]
+
+    # Restart: a fresh store only sees the hot file until seeded from the archive
+    store = NotificationStore(path)
+    store.raise_high_water(*notification_archive.read_high_water(folder))
+    assert store.allocate_id() == 4
+    assert store.allocate_seq() == 104
+    assert store.cursor() >= 103
+
+    # A notification with the new id is not shadowed by an archived one
+    ids = [n['id'] for n in notification_archive.iter_archived(folder=folder)]
+    assert sorted(ids) == [2, 3]
+
+
+def test_high_water_is_rebuilt_from_segments_when_missing(tmp_path):
+    folder = str(tmp_path / 'archive')
+    notification_archive.append_segments({'2020-01': [_settled(7), _settled(5)]}, folder)
+    assert notification_archive.read_high_water(folder) == (7, 107)
+    assert os.path.exists(os.path.join(folder, notification_archive.HIGH_WATER_FILE))
+
+
+def test_high_water_never_decreases(tmp_path):
+    folder = str(tmp_path / 'archive')
+    notification_archive.write_high_water(10, 20, folder)
+    notification_archive.write_high_water(3, 4, folder)
+    assert notification_archive.read_high_water(folder) == (10, 20)
+
+
+def test_role_keys_see_notifications_written_outside_sync(tmp_path):
+    path, load, save = _file_store(tmp_path, [_pending(1)])
+    store = NotificationStore(path)
+    assert store.role_keys('HR') == ['HR']
+    note = dict(_pending(2), for_role='HR Manager')
+    save(load() + [note])
+    os.utime(path, ns=(1, 1))
+    assert sorted(store.role_keys('HR Manager')) == ['HR', 'HR Manager']
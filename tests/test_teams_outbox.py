@@ -0,0 +1,123 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import teams_outbox
+from teams_outbox import HttpPoster, TeamsOutbox
+
+
+class _Webhook(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(json.loads(body))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Webhook)
+    server.daemon_threads = True
+    server.received = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _outbox(tmp_path, webhook, clock):
+    url = f"http://127.0.0.1:{webhook.server_port}/hook?sig=secret"
+    return TeamsOutbox(path=str(tmp_path / 'outbox.json'), poster=HttpPoster(timeout=2),
+                       batch_window=0, clock=clock, channels={'teams': url})
+
+
+def _item(n):
+    return {'title': f'Card {n}', 'message': 'hello', 'facts': []}
+
+
+def test_success_posts_one_digest_and_clears_pending(tmp_path, webhook):
+    clock = _Clock()
+    outbox = _outbox(tmp_path, webhook, clock)
+    outbox.enqueue('teams', _item(1))
+    outbox.enqueue('teams', _item(2))
+    assert outbox.run_once()
+    assert len(webhook.received) == 1
+    assert webhook.received[0]['attachments'][0]['content']['body'][0]['text'] == '2 new notifications'
+    stats = outbox.stats()
+    assert (stats['pending'], stats['sent'], stats['breakers']) == (0, 2, {'teams': 'closed'})
+    assert 'secret' not in (tmp_path / 'outbox.json').read_text()
+    outbox.poster.close()
+
+
+def test_server_error_reschedules_with_backoff(tmp_path, webhook):
+    clock = _Clock()
+    outbox = _outbox(tmp_path, webhook, clock)
+    webhook.statuses = [503]
+    outbox.enqueue('teams', _item(1))
+    assert outbox.run_once()
+    entry = outbox.state['pending'][0]
+    assert entry['attempts'] == 1 and 'HTTP 503' in entry['last_error']
+    assert entry['next_attempt_at'] >= clock.now + teams_outbox.BACKOFF_BASE_SECONDS * 0.8
+    # Not due again until the backoff has passed
+    assert not outbox.run_once()
+    clock.now = entry['next_attempt_at']
+    assert outbox.run_once()
+    assert outbox.stats()['pending'] == 0 and len(webhook.received) == 2
+    outbox.poster.close()
+
+
+def test_breaker_opens_then_lets_one_probe_through(tmp_path, webhook):
+    clock = _Clock()
+    outbox = _outbox(tmp_path, webhook, clock)
+    webhook.statuses = [500] * teams_outbox.BREAKER_FAILURE_THRESHOLD
+    outbox.enqueue('teams', _item(1))
+    outbox.enqueue('teams', _item(2))
+    for _ in range(teams_outbox.BREAKER_FAILURE_THRESHOLD):
+        clock.now = max(e['next_attempt_at'] for e in outbox.state['pending'])
+        assert outbox.run_once()
+    assert outbox.stats()['breakers'] == {'teams': 'open'}
+    assert not outbox.run_once()
+
+    clock.now = outbox.breakers['teams'].reopen_at() + 1
+    assert outbox.stats()['breakers'] == {'teams': 'half-open'}
+    sent_before = len(webhook.received)
+    assert outbox.run_once()
+    # The probe carries a single card; success closes the breaker again
+    assert len(webhook.received) == sent_before + 1
+    assert webhook.received[-1]['attachments'][0]['content']['body'][0]['text'] == 'Card 1'
+    assert outbox.stats()['breakers'] == {'teams': 'closed'}
+    assert outbox.stats()['pending'] == 1
+    outbox.poster.close()
+
+
+def test_dead_letters_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(teams_outbox, 'MAX_DEAD_LETTERS', 2)
+    clock = _Clock()
+    outbox = TeamsOutbox(path=str(tmp_path / 'outbox.json'), poster=HttpPoster(timeout=2),
+                         batch_window=0, clock=clock, channels={})
+    for n in range(4):
+        outbox.enqueue('teams-unconfigured', _item(n))
+    while outbox.state['pending']:
+        clock.now = max(clock.now, min(e['next_attempt_at'] for e in outbox.state['pending']))
+        clock.now += teams_outbox.BREAKER_COOLDOWN_SECONDS
+        outbox.run_once()
+    assert [e['item']['title'] for e in outbox.state['dead']] == ['Card 2', 'Card 3']
@@ -0,0 +1,183 @@
+"""
+Token Counting and Prompt Budget for AION HR System
+Exact BPE token counts when tiktoken is installed, and the split of the prompt budget between parts
+"""
+
+import functools
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# tiktoken is a declared requirement (0.7+ knows gpt-4o); the estimate is only a safety net
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+CHAT_MODEL = os.getenv("AION_CHAT_MODEL", "gpt-4o")
+
+# Prompt tokens available per chat turn, excluding the system prompt
+PROMPT_TOKENS = int(os.getenv("AION_CHAT_PROMPT_TOKENS", "16000"))
+
+# Share of PROMPT_TOKENS for conversation history, DB context and tool results
+DEFAULT_SPLIT = "history=0.3,db=0.5,tools=0.2"
+
+# Fixed per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD = 4
+
+MESSAGE_CACHE_SIZE = 4096
+
+
+def _load_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(CHAT_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The BPE ranks are downloaded on first use; offline hosts fall back to estimates
+        print(f"⚠️ Tokenizer unavailable, estimating token counts: {e}")
+        return None
+
+
+_encoding = _load_encoding()
+
+
+def exact() -> bool:
+    """True when counts come from the model's BPE tokenizer rather than the chars/4 estimate"""
+    return _encoding is not None
+
+
+@functools.lru_cache(maxsize=MESSAGE_CACHE_SIZE)
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens tokens, marking the cut"""
+    text = text or ""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    marker = "\n…[truncated]"
+    keep = max(0, max_tokens - count_tokens(marker))
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text, disallowed_special=())[:keep]) + marker
+    return text[:keep * 4] + marker
+
+
+class MessageTokenCache:
+    """
+    Token counts of chat messages, computed once per message object.
+
+    Entries hold a reference to their message so an id() is never reused while cached;
+    the least recently used entries are dropped past `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = MESSAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+
+    @staticmethod
+    def _count(message: Dict[str, Any]) -> int:
+        tokens = MESSAGE_OVERHEAD + count_tokens(str(message.get("content") or ""))
+        if message.get("name"):
+            tokens += count_tokens(message["name"]) + 1
+        for call in message.get("tool_calls") or []:
+            function = call.get("function") or {}
+            tokens += count_tokens(function.get("name") or "") + count_tokens(function.get("arguments") or "") + MESSAGE_OVERHEAD
+        return tokens
+
+    def tokens(self, message: Dict[str, Any]) -> int:
+        key = id(message)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is message:
+                self.entries.move_to_end(key)
+                return entry[1]
+        count = self._count(message)
+        with self.lock:
+            self.entries[key] = (message, count)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return count
+
+
+# Global message token cache
+message_tokens = MessageTokenCache()
+
+
+def parse_split(spec: str) -> Dict[str, float]:
+    """'history=0.3,db=0.5,tools=0.2' -> shares normalized to sum to 1"""
+    shares = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        try:
+            shares[name.strip()] = max(0.0, float(value))
+        except ValueError:
+            continue
+    total = sum(shares.values())
+    if not total:
+        return parse_split(DEFAULT_SPLIT)
+    return {name: value / total for name, value in shares.items()}
+
+
+BUDGET_SPLIT = parse_split(os.getenv("AION_CHAT_BUDGET_SPLIT", DEFAULT_SPLIT))
+
+
+def budget_for(part: str, total: Optional[int] = None) -> int:
+    """Tokens of the prompt budget assigned to 'history', 'db' or 'tools'"""
+    return int((total or PROMPT_TOKENS) * BUDGET_SPLIT.get(part, 0))
+
+
+def json_tokens(value: Any) -> int:
+    """Tokens of a value serialized the way prompt context is (compact JSON)"""
+    return count_tokens(json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str))
+
+
+def pack_messages(messages: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+    """
+    Most recent messages that fit in max_tokens, oldest first.
+
+    Walks backwards once and stops at the first unit that does not fit. An assistant
+    message with tool calls and its tool responses form one unit and are kept or dropped
+    together; incomplete groups and orphaned tool messages are left out.
+    """
+    units: List[List[Dict[str, Any]]] = []
+    used = 0
+    responses: List[Dict[str, Any]] = []   # tool messages seen since the last non-tool message
+    for message in reversed(messages):
+        role = message.get("role")
+        if role == "tool":
+            responses.append(message)
+            continue
+        if role == "assistant" and message.get("tool_calls"):
+            ids = [call.get("id") for call in message["tool_calls"]]
+            by_id = {r.get("tool_call_id"): r for r in responses}
+            responses = []
+            if not all(i in by_id for i in ids):
+                continue
+            unit = [message] + [by_id[i] for i in ids]
+        else:
+            responses = []
+            unit = [message]
+        cost = sum(message_tokens.tokens(m) for m in unit)
+        if used + cost > max_tokens:
+            break
+        units.append(unit)
+        used += cost
+    return [m for unit in reversed(units) for m in unit]
@@ -4,6 +4,8 @@
 from typing import Dict, List, Any
 import os
 import json
+import functools
+import threading
 import numpy as np
 # Configure matplotlib to use non-interactive backend for web servers
 import matplotlib
@@ -12,13 +14,19 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from datetime import datetime, timedelta
 
+from search_index import search_index
+from data_version import cached_by_version
+from facet_index import facet_index
+from chat_context import chat_context, chat_user_context, compact_candidate, compact_job, KEY_LEGEND
+from sql_mirror import sql_mirror, schema_description, SQLQueryError
+
 # Import salary research module for market analysis
 try:
     from salary_research import salary_researcher
 except ImportError:
     salary_researcher = None
 
-def load_json_data(filename):
+def _load_json_data(filename):
     """Load JSON data from the db folder"""
     db_folder = os.path.join(os.path.dirname(__file__), 'db')
     file_path = os.path.join(db_folder, filename)
@@ -31,11 +39,14 @@ def load_json_data(filename):
     return []
 
 # ========== REAL DATA ANALYTICS FUNCTIONS ==========
+# Analytics below are pure functions of candidates / jobs (and today's date), so each
+# result is reused until either collection is written again.
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_onboarding_insights() -> str:
     """Analyzes onboarding process based on real candidate data"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         hired_candidates = [c for c in candidates if c.get('status') == 'Hired']
         
@@ -123,10 +134,11 @@ def get_onboarding_insights() -> str:
     except Exception as e:
         return f"⚠️ Error analyzing onboarding: {e}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_probation_insights() -> str:
     """Analyzes probation assessment performance based on real data"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         hired_candidates = [c for c in candidates if c.get('status') == 'Hired']
         
@@ -222,10 +234,11 @@ def get_probation_insights() -> str:
     except Exception as e:
         return f"⚠️ Error analyzing probation data: {e}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_salary_trend_insights() -> str:
     """Analyzes salary trends using real data with market comparison"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Extract salary data with dates
         salary_data = []
@@ -297,10 +310,11 @@ def get_salary_trend_insights() -> str:
     except Exception as e:
         return f"⚠️ Error analyzing salary trends: {e}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_market_salary_comparison() -> str:
     """Compares company salary offerings with market rates using internet research"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Extract real salary data from hired candidates
         salary_by_position = {}
@@ -429,10 +443,11 @@ def get_market_salary_comparison() -> str:
     except Exception as e:
         return f"⚠️ Error analyzing market salary comparison: {e}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_hiring_success_rate_insight() -> str:
     """Analyzes hiring success rate using real candidate data"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         if not candidates:
             return "📊 **Hiring Success Rate**: No candidate data available for analysis"
@@ -499,10 +514,11 @@ def get_hiring_success_rate_insight() -> str:
     except Exception as e:
         return f"⚠️ Error analyzing hiring success rate: {e}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_monthly_hiring_insights() -> str:
     """Analyzes monthly hiring patterns using real data"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         monthly_stats = {}
         for candidate in candidates:
@@ -562,10 +578,11 @@ def get_monthly_hiring_insights() -> str:
     except Exception as e:
         return f"⚠️ Error analyzing monthly insights: {e}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_department_interview_insights() -> str:
     """Analyzes department interview efficiency using real data"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         dept_stats = {}
         
@@ -625,10 +642,11 @@ def get_department_interview_insights() -> str:
     except Exception as e:
         return f"⚠️ Error analyzing department efficiency: {e}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_top_performers_insights() -> str:
     """Identifies top performers using real data"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Analyze interviewers/recruiters performance
         interviewer_stats = {}
@@ -703,6 +721,20 @@ def get_top_performers_insights() -> str:
 
 # ========== CHART CREATION FUNCTIONS ==========
 
+# pyplot draws on one implicit current figure per process; tool calls run in parallel,
+# so charts are rendered one at a time
+_plot_lock = threading.Lock()
+
+
+def _plotting(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _plot_lock:
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+@_plotting
 def create_line_chart(data: dict, filename: str, title: str, xlabel: str, ylabel: str) -> str:
     """Creates a line chart and saves it to the db folder"""
     try:
@@ -728,6 +760,7 @@ def create_line_chart(data: dict, filename: str, title: str, xlabel: str, ylabel
     except Exception as e:
         return f"Error creating chart: {e}"
 
+@_plotting
 def create_pie_chart(data: Any) -> str:
     """Creates a pie chart based on the provided data"""
     try:
@@ -767,12 +800,178 @@ def get_time(city: str = "UTC") -> str:
     except Exception:
         return "Unable to get current time"
 
+# ========== CANDIDATE SEARCH FUNCTIONS ==========
+
+def search_candidates(query: str, limit: int = 10) -> str:
+    """Full-text search for candidates by name, email, skills, experience, education, certifications, projects or interview transcript content. Returns the best matching candidates ranked by relevance."""
+    try:
+        results = search_index.search(query, limit=max(1, min(int(limit or 10), 50)))
+        if not results:
+            return f"No candidates matched '{query}'"
+        lines = [
+            f"• {r['name']} (ID: {r['id']}) - {r.get('position') or 'N/A'}, status: {r.get('status') or 'N/A'}, match score: {r.get('match_score', 'N/A')}"
+            for r in results
+        ]
+        return f"Candidates matching '{query}' ({len(results)} found):\n" + "\n".join(lines)
+    except Exception as e:
+        return f"⚠️ Error searching candidates: {e}"
+
+# ========== CANDIDATE & JOB LOOKUP FUNCTIONS ==========
+# Parameterized lookups over the in-memory id / name / interview indexes and the facet
+# bitmaps, so the model can fetch the records a question needs instead of the whole DB.
+
+def _facet_filter(index, facet: str, value: str) -> List[str]:
+    """Existing facet values matching a comma separated, case-insensitive filter value"""
+    wanted = {v.strip().lower() for v in str(value or '').split(',') if v.strip()}
+    if not wanted:
+        return []
+    known = list(index.bitmaps.get(facet, {}).keys())
+    # Unknown values still filter (to nothing) rather than being ignored
+    return [v for v in known if v.lower() in wanted] or ['__none__']
+
+
+def _candidate_line(c: dict) -> str:
+    return (f"• {c.get('name')} (ID: {c.get('id')}) - {c.get('position') or 'N/A'}, status: {c.get('status') or 'N/A'}, "
+            f"job: {c.get('job_id') or 'N/A'}, match score: {c.get('match_score', 'N/A')}")
+
+
+def get_candidate(candidate_id: int = 0, name: str = "") -> str:
+    """Looks up a candidate by ID or by full / partial name and returns their profile: status and who changed it, position, job, application / interview / hiring dates, interviewer and score, salary, onboarding and probation details."""
+    try:
+        if candidate_id:
+            found = [c for c in [chat_context.candidate(candidate_id)] if c]
+        elif name:
+            found = chat_context.candidates_named(name)
+        else:
+            return "⚠️ Please provide a candidate ID or name"
+        if not found:
+            return f"No candidate found for {'ID ' + str(candidate_id) if candidate_id else repr(name)}"
+        if len(found) > 5:
+            return f"{len(found)} candidates match '{name}', please be more specific:\n" + "\n".join(_candidate_line(c) for c in found[:20])
+        profiles = [json.dumps(compact_candidate(c), ensure_ascii=False) for c in found]
+        header = f"{len(found)} candidates match '{name}':" if len(found) > 1 else "Candidate profile:"
+        return f"{header} (keys: {KEY_LEGEND})\n" + "\n".join(profiles)
+    except Exception as e:
+        return f"⚠️ Error looking up candidate: {e}"
+
+
+def filter_candidates(status: str = "", department: str = "", job_id: str = "", seniority_level: str = "", min_match_score: int = 0, limit: int = 20) -> str:
+    """Lists candidates matching all given filters: status (e.g. 'Hired', 'Interview Scheduled'; comma separated for several), department, job_id, seniority_level and minimum CV match score. Returns the total and up to `limit` candidates."""
+    try:
+        index = facet_index.candidates
+        facet_index.refresh()
+        filters = {
+            'status': _facet_filter(index, 'status', status),
+            'department': _facet_filter(index, 'department', department),
+            'job': _facet_filter(index, 'job', job_id),
+            'seniority_level': _facet_filter(index, 'seniority_level', seniority_level),
+        }
+        found = [c for c in (chat_context.candidate(cid) for cid in facet_index.candidate_ids(filters)) if c]
+        if min_match_score:
+            def score(c):
+                try:
+                    return float(c.get('match_score'))
+                except (TypeError, ValueError):
+                    return -1
+            found = [c for c in found if score(c) >= float(min_match_score)]
+        found.sort(key=lambda c: int(c.get('id') or 0))
+        if not found:
+            return "No candidates match these filters"
+        limit = max(1, min(int(limit or 20), 100))
+        lines = [_candidate_line(c) for c in found[:limit]]
+        more = f"\n... and {len(found) - limit} more" if len(found) > limit else ""
+        return f"{len(found)} candidates match:\n" + "\n".join(lines) + more
+    except Exception as e:
+        return f"⚠️ Error filtering candidates: {e}"
+
+
+def list_upcoming_interviews(days: int = 14, interviewer: str = "") -> str:
+    """Lists interviews scheduled from today through the next `days` days, optionally only those of one interviewer (username), in date and time order."""
+    try:
+        today = datetime.now().date()
+        end = today + timedelta(days=max(0, int(days or 0)))
+        found = chat_context.interviews_between(today.isoformat(), end.isoformat())
+        if interviewer:
+            found = [c for c in found if str(c.get('intervier') or '').lower() == interviewer.strip().lower()]
+        if not found:
+            return f"No interviews scheduled between {today} and {end}"
+        lines = [
+            f"• {c.get('interview_date')} {c.get('interview_time') or ''} - {c.get('name')} (ID: {c.get('id')}), "
+            f"{c.get('position') or 'N/A'}, interviewer: {c.get('intervier') or 'N/A'}, status: {c.get('status') or 'N/A'}"
+            for c in found
+        ]
+        return f"Upcoming interviews {today} to {end} ({len(found)}):\n" + "\n".join(lines)
+    except Exception as e:
+        return f"⚠️ Error listing interviews: {e}"
+
+
+def get_job_details(job_id: str = "", title: str = "") -> str:
+    """Returns a job posting by job ID or title (department, openings, seniority, location, salary range, requirements, poster, status) with its candidate pipeline counts per status."""
+    try:
+        if job_id:
+            found = [j for j in [chat_context.job(job_id)] if j]
+        elif title:
+            found = chat_context.jobs_titled(title)
+        else:
+            return "⚠️ Please provide a job ID or title"
+        if not found:
+            return f"No job found for {'ID ' + str(job_id) if job_id else repr(title)}"
+        out = []
+        for j in found[:5]:
+            pipeline = facet_index.candidate_counts({'job': [str(j.get('job_id'))]})
+            out.append(json.dumps({**compact_job(j),
+                                   'candidates': pipeline['total'],
+                                   'by_status': pipeline['facets'].get('status', {})}, ensure_ascii=False))
+        more = f"\n... and {len(found) - 5} more jobs match" if len(found) > 5 else ""
+        return "Job details:\n" + "\n".join(out) + more
+    except Exception as e:
+        return f"⚠️ Error looking up job: {e}"
+
+
+def count_by(field: str = "status", entity: str = "candidates", status: str = "", department: str = "") -> str:
+    """Counts candidates (or jobs with entity='jobs') grouped by a field - candidates: status, department, job, seniority_level, match_score_band; jobs: status, department, seniority_level, job_type - optionally filtered by status and department."""
+    try:
+        jobs = str(entity).lower().startswith('job')
+        index = facet_index.jobs if jobs else facet_index.candidates
+        facet_index.refresh()
+        if field not in index.facets:
+            return f"⚠️ Cannot count {'jobs' if jobs else 'candidates'} by '{field}'. Available: {', '.join(index.facets)}"
+        filters = {
+            'status': _facet_filter(index, 'status', status),
+            'department': _facet_filter(index, 'department', department),
+        }
+        result = facet_index.job_counts(filters) if jobs else facet_index.candidate_counts(filters)
+        counts = sorted(result['facets'].get(field, {}).items(), key=lambda kv: -kv[1])
+        label = 'Jobs' if jobs else 'Candidates'
+        return f"{label} by {field} (total {result['total']}): " + ", ".join(f"{k}: {v}" for k, v in counts)
+    except Exception as e:
+        return f"⚠️ Error counting: {e}"
+
+def run_sql(query: str, max_rows: int = 50) -> str:
+    """Runs one read-only SQLite SELECT over the HR data and returns the result rows, for exact counts, averages, durations and cross-table questions no other tool answers. Dates are ISO text (use date() / julianday()); status_history has one row per status change (seq orders them). Tables: """
+    try:
+        # Notifications are limited to those the chatting user may see
+        result = sql_mirror.query(query, max_rows=max_rows, user_context=chat_user_context.get())
+    except SQLQueryError as e:
+        return f"⚠️ SQL error: {e}"
+    except Exception as e:
+        return f"⚠️ Error running SQL: {e}"
+    if not result['rows']:
+        return "Query returned no rows"
+    lines = [" | ".join(result['columns'])]
+    lines += [" | ".join('' if v is None else str(v) for v in row) for row in result['rows']]
+    note = f"\n(first {len(result['rows'])} rows only)" if result['truncated'] else ""
+    return "\n".join(lines) + note
+
+run_sql.__doc__ += schema_description()
+
 # ========== ENHANCED ANALYTICS FUNCTIONS ==========
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_hiring_success_rate() -> str:
     """Get comprehensive hiring success rate analysis with detailed breakdown"""
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Status breakdown
         status_counts = {}
@@ -803,12 +1002,13 @@ def get_enhanced_hiring_success_rate() -> str:
     except Exception as e:
         return f"Error calculating hiring success rate: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_monthly_insights() -> str:
     """Get detailed monthly hiring trends and patterns"""
     from collections import defaultdict
     
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Monthly hiring breakdown
         monthly_hired = defaultdict(int)
@@ -843,13 +1043,14 @@ def get_enhanced_monthly_insights() -> str:
     except Exception as e:
         return f"Error analyzing monthly insights: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_department_insights() -> str:
     """Get department-specific interview efficiency and performance metrics"""
     from collections import defaultdict
     
     try:
-        candidates = load_json_data("candidates.json")
-        jobs = load_json_data("jobs.json")
+        candidates = _load_json_data("candidates.json")
+        jobs = _load_json_data("jobs.json")
         
         # Create job lookup
         job_lookup = {job['job_id']: job for job in jobs}
@@ -895,14 +1096,15 @@ def get_enhanced_department_insights() -> str:
     except Exception as e:
         return f"Error analyzing department insights: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_hiring_predictions() -> str:
     """Get predictive insights for future hiring needs and timelines"""
     from collections import defaultdict
     from datetime import timedelta
     
     try:
-        candidates = load_json_data("candidates.json")
-        jobs = load_json_data("jobs.json")
+        candidates = _load_json_data("candidates.json")
+        jobs = _load_json_data("jobs.json")
         
         # Calculate average time to hire
         hiring_times = []
@@ -932,12 +1134,13 @@ def get_enhanced_hiring_predictions() -> str:
     except Exception as e:
         return f"Error generating hiring predictions: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_top_performers() -> str:
     """Get insights on top performing team members and peak hiring periods"""
     from collections import defaultdict
     
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Track performance by status updaters
         updater_performance = defaultdict(lambda: {'hires': 0, 'updates': 0})
@@ -960,12 +1163,13 @@ def get_enhanced_top_performers() -> str:
     except Exception as e:
         return f"Error analyzing top performers: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_salary_trends() -> str:
     """Get comprehensive salary trend analysis with market positioning"""
     from statistics import mean, median
     
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Collect salary data for hired candidates
         salaries = []
@@ -1003,12 +1207,13 @@ def get_enhanced_salary_trends() -> str:
     except Exception as e:
         return f"Error analyzing salary trends: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_onboarding_insights() -> str:
     """Get detailed onboarding process analysis and bottleneck identification"""
     from collections import defaultdict
     
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Onboarding status analysis
         onboarding_status = defaultdict(int)
@@ -1040,13 +1245,14 @@ def get_enhanced_onboarding_insights() -> str:
     except Exception as e:
         return f"Error analyzing onboarding insights: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_probation_insights() -> str:
     """Get probation period performance analysis and improvement areas"""
     from collections import defaultdict
     
     try:
-        candidates = load_json_data("candidates.json")
-        jobs = load_json_data("jobs.json")
+        candidates = _load_json_data("candidates.json")
+        jobs = _load_json_data("jobs.json")
         
         # Create job lookup
         job_lookup = {job['job_id']: job for job in jobs}
@@ -1093,12 +1299,13 @@ def get_enhanced_probation_insights() -> str:
     except Exception as e:
         return f"Error analyzing probation insights: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def get_enhanced_market_salary_comparison() -> str:
     """Get comprehensive market salary comparison with competitiveness analysis"""
     from statistics import mean
     
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Analyze market positioning
         our_salaries = []
@@ -1142,6 +1349,7 @@ def get_enhanced_market_salary_comparison() -> str:
     except Exception as e:
         return f"Error analyzing market salary comparison: {str(e)}"
 
+@cached_by_version('candidates', 'jobs', daily=True)
 def comprehensive_hiring_analysis() -> str:
     """Get complete hiring analysis including all metrics, visualizations, and market insights"""
     try:
@@ -1177,6 +1385,7 @@ def comprehensive_hiring_analysis() -> str:
     except Exception as e:
         return f"Error generating comprehensive analysis: {str(e)}"
 
+@_plotting
 def create_hiring_trend_chart() -> str:
     """Create hiring trend visualization"""
     import matplotlib.pyplot as plt
@@ -1184,7 +1393,7 @@ def create_hiring_trend_chart() -> str:
     from datetime import timedelta
     
     try:
-        candidates = load_json_data("candidates.json")
+        candidates = _load_json_data("candidates.json")
         
         # Monthly hiring data
         monthly_data = defaultdict(int)
@@ -0,0 +1,110 @@
+"""
+Unit of Work for AION HR System
+Request-scoped identity map and staged writes over the JSON collections
+"""
+
+import contextlib
+import functools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import g, has_request_context
+
+
+class UnitOfWork:
+    """
+    Loads each collection at most once and writes each changed collection at most once.
+
+    `stores` maps a collection name to (loader, saver). load() returns the same list
+    object for the lifetime of the unit, so every helper in the request mutates one
+    shared copy; stage() marks it for writing and commit() flushes in registration order
+    before running after-commit callbacks (e.g. external notification delivery).
+    """
+
+    def __init__(self, stores: Dict[str, Tuple[Callable[[], List], Optional[Callable[[List], None]]]]):
+        self.stores = stores
+        self.loaded: Dict[str, List] = {}
+        self.dirty: Dict[str, bool] = {}
+        self.callbacks: List[Callable[[], Any]] = []
+        self.reads = 0
+        self.writes = 0
+
+    def load(self, name: str) -> List:
+        if name not in self.loaded:
+            self.loaded[name] = self.stores[name][0]()
+            self.reads += 1
+        return self.loaded[name]
+
+    def stage(self, name: str, items: List):
+        if self.stores[name][1] is None:
+            raise ValueError(f"Collection '{name}' is read-only in a unit of work")
+        self.loaded[name] = items
+        self.dirty[name] = True
+
+    def after_commit(self, callback: Callable[[], Any]):
+        self.callbacks.append(callback)
+
+    def commit(self):
+        for name in self.stores:
+            if self.dirty.pop(name, False):
+                self.stores[name][1](self.loaded[name])
+                self.writes += 1
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print('Unit of work callback error:', e)
+
+    def rollback(self):
+        self.loaded.clear()
+        self.dirty.clear()
+        self.callbacks = []
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    """The unit of work of the active request, if its view opted in with @unit_of_work"""
+    if not has_request_context():
+        return None
+    return g.get('unit_of_work')
+
+
+@contextlib.contextmanager
+def unit_of_work_scope(stores, lock=None):
+    """
+    Run a block inside a unit of work and commit when it exits (joins the active unit
+    if there is one). Lets a view hold `lock` only around its read-modify-write part.
+    """
+    current = current_unit_of_work()
+    if current is not None:
+        yield current
+        return
+    if lock is not None:
+        lock.acquire()
+    uow = g.unit_of_work = UnitOfWork(stores)
+    try:
+        yield uow
+        uow.commit()
+    except Exception:
+        uow.rollback()
+        raise
+    finally:
+        g.pop('unit_of_work', None)
+        if lock is not None:
+            lock.release()
+
+
+def unit_of_work(stores, lock=None):
+    """
+    View decorator: run the view inside a unit of work and commit once it returns.
+
+    If the view raises, staged writes are discarded. When `lock` is given it is held
+    from the first read to the commit, so other writers sharing it cannot interleave.
+    Views that mostly read should use unit_of_work_scope around their writes instead.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with unit_of_work_scope(stores, lock):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator